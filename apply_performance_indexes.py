@@ -1,46 +1,49 @@
-import psycopg2
+import sys
 import os
+sys.path.append(os.getcwd())
+sys.path.append(os.path.join(os.getcwd(), "backend"))
+
 from dotenv import load_dotenv
 
 load_dotenv("backend/.env")
-database_url = os.getenv("DATABASE_URL")
 
-def apply_indexes():
+# Usage: python apply_performance_indexes.py [--status]
+# The indexes (and every other schema change) now live in the versioned
+# migration ledger, app/services/migration_service.py, which the API also runs
+# on startup. This applies whatever is pending without starting the API.
+
+from sqlalchemy import text
+from app.database import engine
+from app.services import migration_service
+
+def main():
     try:
-        conn = psycopg2.connect(database_url, sslmode='require')
-        cursor = conn.cursor()
-        
-        print("🚀 Aplicando índices de performance...")
-        
-        indexes = [
-            # Tabela leads_crm - Crucial para o Dashboard
-            "CREATE INDEX IF NOT EXISTS idx_leads_tenant_status ON public.leads_crm (tenant_id, funil_stage);",
-            "CREATE INDEX IF NOT EXISTS idx_leads_tenant_created ON public.leads_crm (tenant_id, created_at DESC);",
-            
-            # Tabela finance_entries - Crucial para Reports e Fluxo de Caixa
-            "CREATE INDEX IF NOT EXISTS idx_finance_tenant_type_status ON public.finance_entries (tenant_id, type, status);",
-            "CREATE INDEX IF NOT EXISTS idx_finance_due_date ON public.finance_entries (due_date DESC);",
-            
-            # Tabela users - Importante para autenticação e verificação de tenant
-            "CREATE INDEX IF NOT EXISTS idx_users_tenant_id ON public.users (tenant_id);",
-            
-            # Tabela customers - Ranking e busca
-            "CREATE INDEX IF NOT EXISTS idx_customers_tenant_id ON public.customers (tenant_id);"
-        ]
-        
-        for sql in indexes:
-            print(f"Executando: {sql}")
-            cursor.execute(sql)
-            
-        conn.commit()
-        print("\n✅ Índices aplicados com sucesso! A busca de dados agora será muito mais rápida.")
-        
-        cursor.close()
-        conn.close()
+        with engine.connect() as conn:
+            version = migration_service.current_version(conn)
+            applied = {}
+            if version:
+                applied = dict(conn.execute(text("SELECT version, applied_at FROM public.schema_migrations")).all())
+                conn.rollback()
+
+        if "--status" in sys.argv:
+            for migration_version, name, _ in migration_service.MIGRATIONS:
+                state = f"applied {applied[migration_version]}" if migration_version in applied else "pending"
+                print(f"{migration_version:03d} {name:35} {state}")
+            return 0
+
+        print(f"🚀 Schema version {version}, latest {migration_service.LATEST_VERSION}")
+        migration_service.migrate(engine)
+
+        with engine.connect() as conn:
+            version = migration_service.current_version(conn)
+        if version < migration_service.LATEST_VERSION:
+            print(f"❌ Schema stopped at version {version}")
+            return 1
+        print(f"✅ Schema is current (version {version})")
+        return 0
     except Exception as e:
-        print(f"❌ Erro ao aplicar índices: {e}")
-        if 'conn' in locals():
-            conn.rollback()
+        print(f"❌ Erro ao aplicar migrações: {e}")
+        return 1
 
 if __name__ == "__main__":
-    apply_indexes()
+    sys.exit(main())
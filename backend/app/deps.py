@@ -1,13 +1,28 @@
+import hashlib
+import os
+import time
+from dataclasses import dataclass
 from typing import Optional
 from fastapi import Request, HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
+from sqlalchemy.orm import Session
+from app.database import get_db
 from app.services.auth_service import SECRET_KEY, ALGORITHM
+from app.services.cache_service import TTLCache
+from app.services import tenant_service
 from app.models.schemas import TokenData
 
 # Using auto_error=False to allow fallback to query parameter or manual handling
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login-tenant", auto_error=False)
 
+# Verified tokens, keyed by SHA-256 of the token: a hit skips jwt.decode. Entries
+# never outlive the token's own `exp`. Cached TokenData is shared: treat it as read-only.
+token_cache = TTLCache(
+    ttl_seconds=float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300")),
+    maxsize=int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+)
+
 async def get_current_user_token_data(request: Request, token: Optional[str] = Depends(oauth2_scheme)) -> TokenData:
     # Fallback to query parameter if not in Header (useful for direct file downloads)
     if not token:
@@ -26,6 +41,11 @@ async def get_current_user_token_data(request: Request, token: Optional[str] = D
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    cache_key = hashlib.sha256(token.encode()).hexdigest()
+    cached = token_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
@@ -37,7 +57,7 @@ async def get_current_user_token_data(request: Request, token: Optional[str] = D
         role_local = payload.get("role_local")
         tenant_id = payload.get("tenant_id")
         
-        return TokenData(
+        token_data = TokenData(
             email=email, 
             role_global=role_global,
             tenant_slug=tenant_slug,
@@ -47,6 +67,12 @@ async def get_current_user_token_data(request: Request, token: Optional[str] = D
     except JWTError:
         raise credentials_exception
 
+    exp = payload.get("exp")
+    ttl = token_cache.ttl_seconds if exp is None else min(token_cache.ttl_seconds, exp - time.time())
+    if ttl > 0:
+        token_cache.set(cache_key, token_data, ttl_seconds=ttl)
+    return token_data
+
 async def get_current_master(token_data: TokenData = Depends(get_current_user_token_data)):
     if token_data.role_global != "master":
         raise HTTPException(
@@ -62,3 +88,31 @@ async def get_current_tenant_user(token_data: TokenData = Depends(get_current_us
             detail="No tenant context"
         )
     return token_data
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated caller for one request, with its tenant resolved once."""
+    token: TokenData
+    tenant: Optional[tenant_service.TenantInfo] = None
+
+    @property
+    def is_master(self) -> bool:
+        return self.token.role_global == "master"
+
+def get_current_principal(token_data: TokenData = Depends(get_current_user_token_data), db: Session = Depends(get_db)) -> Principal:
+    # FastAPI caches dependencies per request, and the tenant comes from the registry cache
+    tenant = None
+    if token_data.tenant_id or token_data.tenant_slug:
+        tenant = tenant_service.get_tenant_info(db, tenant_id=token_data.tenant_id, slug=token_data.tenant_slug)
+    return Principal(token=token_data, tenant=tenant)
+
+def get_tenant_principal(principal: Principal = Depends(get_current_principal)) -> Principal:
+    if not principal.token.tenant_slug:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, 
+            detail="No tenant context"
+        )
+    if principal.tenant is None:
+        raise HTTPException(status_code=404, detail="Environment not found")
+    return principal
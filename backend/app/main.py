@@ -1,59 +1,58 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from typing import Optional
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import auth, master, tenant_users
 from fastapi.staticfiles import StaticFiles
 import os
+import secrets
 from dotenv import load_dotenv
 
 load_dotenv()
 
+from anyio import to_thread
+from app import database, router_registry
 from app.database import engine, Base
 import app.models.sql_models as sql_models
 
-from sqlalchemy import text
+from app.services import scheduler_service, migration_service, tenant_service, password_service, metrics_service
+from app.services.billing_service import BillingService
+from app.services import import_job_service, outbox_service
 
-# Database initialization moved to startup event for better resilience on serverless
-def run_migrations(conn):
-    """Ensure missing columns are added to existing tables without breaking data."""
-    print("🚀 Running automatic schema migrations...")
-    
-    migrations = [
-        # Finance Entries migrations
-        "ALTER TABLE public.finance_entries ADD COLUMN IF NOT EXISTS supplier_id UUID;",
-        "ALTER TABLE public.finance_entries ADD COLUMN IF NOT EXISTS appointment_id UUID;",
-        "ALTER TABLE public.finance_entries ADD COLUMN IF NOT EXISTS subscription_id UUID;",
-        "ALTER TABLE public.finance_entries ADD COLUMN IF NOT EXISTS service_id UUID;",
-        "ALTER TABLE public.finance_entries ADD COLUMN IF NOT EXISTS installment_number INTEGER DEFAULT 1;",
-        "ALTER TABLE public.finance_entries ADD COLUMN IF NOT EXISTS total_installments INTEGER DEFAULT 1;",
-        
-        # Leads CRM migrations
-        "ALTER TABLE public.leads_crm ADD COLUMN IF NOT EXISTS origin VARCHAR;",
-        "ALTER TABLE public.leads_crm ADD COLUMN IF NOT EXISTS observations TEXT;",
-        "ALTER TABLE public.leads_crm ADD COLUMN IF NOT EXISTS responsible_user VARCHAR;"
-    ]
-    
-    for sql in migrations:
-        try:
-            conn.execute(text(sql))
-            conn.commit()
-        except Exception as e:
-            print(f"⚠️ Migration note: {sql} -> {e}")
+# Periodic jobs (in-process on long-lived workers, Vercel Cron on serverless)
+scheduler_service.register_job(
+    "overdue_sweep",
+    BillingService.run_overdue_sweep,
+    int(os.getenv("OVERDUE_SWEEP_INTERVAL_SECONDS", "3600"))
+)
+scheduler_service.register_job(
+    "import_jobs_resume",
+    import_job_service.resume_stale_jobs,
+    int(os.getenv("IMPORT_JOB_SWEEP_INTERVAL_SECONDS", "60"))
+)
+scheduler_service.register_job(
+    "webhook_outbox",
+    outbox_service.dispatch_pending,
+    int(os.getenv("OUTBOX_DISPATCH_INTERVAL_SECONDS", "5"))
+)
 
+# Database initialization moved to startup event for better resilience on serverless
 def init_db():
     try:
-        # 1. Create tables that don't exist
-        sql_models.Base.metadata.create_all(bind=engine)
-        
-        # 2. Run migrations for existing tables columns
-        with engine.connect() as conn:
-            run_migrations(conn)
-            
-        print("✅ Database tables and schema verified/migrated")
+        # Versioned migrations: a single version check when the schema is current
+        applied = migration_service.migrate(engine)
+        if applied:
+            print(f"✅ Database schema migrated ({applied} migrations applied)")
     except Exception as e:
         print(f"CRITICAL: Could not connect to database: {e}")
 
 app = FastAPI(title="CRM SaaS Multi-tenant")
 
+# Routers (see router_registry.ROUTERS) are included on first request to their
+# prefix on serverless, where every cold start pays for imports; long-lived
+# workers include them all at startup. LAZY_ROUTERS overrides either default.
+LAZY_ROUTERS = os.getenv("LAZY_ROUTERS", "true" if os.environ.get("VERCEL") else "false").lower() == "true"
+app.add_middleware(router_registry.LazyRouterMiddleware, fastapi_app=app)
+
 # Diagnostic Middleware to catch 500s and return them with CORS headers
 @app.middleware("http")
 async def db_session_middleware(request, call_next):
@@ -79,9 +78,34 @@ async def db_session_middleware(request, call_next):
             }
         )
 
+# Password hashing pool full (see password_service): shed the login instead of queueing it
+@app.exception_handler(password_service.PasswordHashBusy)
+async def password_hash_busy_handler(request, exc):
+    from fastapi.responses import JSONResponse
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Muitos logins simultâneos. Tente novamente em instantes."},
+        headers={"Retry-After": "1"}
+    )
+
 @app.on_event("startup")
 async def startup_event():
+    # Handlers on the sync Session are plain `def` and run in this threadpool
+    to_thread.current_default_thread_limiter().total_tokens = int(os.getenv("THREADPOOL_SIZE", "40"))
+    if not LAZY_ROUTERS:
+        router_registry.include_all(app)
     init_db()
+    scheduler_service.start_scheduler()
+    tenant_service.start_listener()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await scheduler_service.stop_scheduler()
+    tenant_service.stop_listener()
+    from app.services import http_client_service
+    await to_thread.run_sync(http_client_service.close)
+    if database._async_engine is not None:
+        await database._async_engine.dispose()
 
 # CORS
 app.add_middleware(
@@ -90,6 +114,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Static files for logos
@@ -111,42 +136,22 @@ except Exception as e:
     # In some serverless environments, internal writes might be restricted
     pass
 
-app.include_router(auth.router)
-app.include_router(master.router)
-app.include_router(tenant_users.router)
-from app.routers import tenant_data
-app.include_router(tenant_data.router)
-from app.routers import niches
-app.include_router(niches.router)
-from app.routers import appointments
-app.include_router(appointments.router)
-from app.routers import finances
-app.include_router(finances.router)
-from app.routers import products
-app.include_router(products.router)
-from app.routers import subscriptions
-app.include_router(subscriptions.router)
-from app.routers import services
-app.include_router(services.router)
-from app.routers import professionals
-app.include_router(professionals.router)
-from app.routers import suppliers
-app.include_router(suppliers.router)
-from app.routers import uploads
-app.include_router(uploads.router)
-from app.routers import financial_reports
-app.include_router(financial_reports.router)
-from app.routers import commissions
-app.include_router(commissions.router)
-from app.routers import ai_insights
-app.include_router(ai_insights.router)
-from app.routers import bot
-app.include_router(bot.router)
-from app.routers import automations
-app.include_router(automations.router)
-from app.routers import notifications
-app.include_router(notifications.router)
-
 @app.get("/")
 def root():
     return {"message": "CRM SaaS API is running"}
+
+# Per-route latency, DB statements/time and response bytes (see metrics_service).
+# Outermost, so the time spent in the other middlewares is included.
+if metrics_service.METRICS_ENABLED:
+    app.add_middleware(metrics_service.MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics(authorization: Optional[str] = Header(None)):
+        # Scrapers send `Authorization: Bearer $METRICS_TOKEN`; without a configured
+        # token the endpoint doesn't exist (the API is public on Vercel)
+        token = os.getenv("METRICS_TOKEN")
+        if not token:
+            raise HTTPException(status_code=404, detail="Not Found")
+        if not secrets.compare_digest(authorization or "", f"Bearer {token}"):
+            raise HTTPException(status_code=401, detail="Invalid metrics credentials")
+        return PlainTextResponse(metrics_service.render(), media_type="text/plain; version=0.0.4")
@@ -1,6 +1,6 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Text, Numeric, Date, JSON, Float
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Text, Numeric, Date, JSON, Float, Index
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from app.database import Base
 import uuid
 from sqlalchemy.dialects.postgresql import UUID
@@ -162,14 +162,44 @@ class Automation(Base):
     tenant = relationship("Tenant")
 
 
+class OutboxEvent(Base):
+    """A webhook delivery owed to one automation, written with the business change that caused it."""
+    __tablename__ = "automation_outbox"
+    __table_args__ = (
+        Index("idx_automation_outbox_due", "next_attempt_at", postgresql_where=text("status = 'pending'")),
+        Index("idx_automation_outbox_tenant_created", "tenant_id", "created_at"),
+        {'schema': 'public'},
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
+    tenant_id = Column(UUID(as_uuid=True), ForeignKey("public.tenants.id", ondelete="CASCADE"), nullable=False)
+    automation_id = Column(UUID(as_uuid=True), ForeignKey("public.automations.id", ondelete="CASCADE"), nullable=True)
+    event_type = Column(String, nullable=False) # lead_created, appointment_completed, subscription_signed
+    url = Column(Text, nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(String, nullable=False, default="pending") # pending, delivered, dead
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    last_status_code = Column(Integer, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    delivered_at = Column(DateTime(timezone=True), nullable=True)
+
+
 class BotSession(Base):
     __tablename__ = "bot_sessions"
-    __table_args__ = {'schema': 'public'}
+    __table_args__ = (
+        # Telemetry upsert target (see bot_telemetry_service)
+        Index("uq_bot_sessions_key", "tenant_id", "session_key", unique=True),
+        {'schema': 'public'},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
     tenant_id = Column(UUID(as_uuid=True), ForeignKey("public.tenants.id", ondelete="CASCADE"), nullable=False)
     lead_id = Column(UUID(as_uuid=True), ForeignKey("public.leads_crm.id", ondelete="SET NULL"), nullable=True)
     customer_name = Column(String)
+    # Held while the session is active, NULL once it ends: ext:<n8n id>, lead:<lead_id> or name:<customer_name>
+    session_key = Column(String, nullable=True)
     status = Column(String, default="active") # active, completed, failed, paused
     current_step = Column(String)
     step_progress = Column(Integer, default=0) # 0-100
@@ -183,7 +213,10 @@ class BotSession(Base):
 
 class Customer(Base):
     __tablename__ = "customers"
-    __table_args__ = {'schema': 'public'}
+    __table_args__ = (
+        Index("idx_customers_tenant_updated", "tenant_id", "updated_at"),
+        {'schema': 'public'},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
     tenant_id = Column(UUID(as_uuid=True), ForeignKey("public.tenants.id", ondelete="CASCADE"), nullable=False)
@@ -205,7 +238,10 @@ class Customer(Base):
 
 class Product(Base):
     __tablename__ = "products"
-    __table_args__ = {'schema': 'public'}
+    __table_args__ = (
+        Index("idx_products_tenant_updated", "tenant_id", "updated_at"),
+        {'schema': 'public'},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
     tenant_id = Column(UUID(as_uuid=True), ForeignKey("public.tenants.id", ondelete="CASCADE"), nullable=False)
@@ -217,6 +253,7 @@ class Product(Base):
     duration_minutes = Column(Integer, default=30)
     active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     tenant = relationship("Tenant", back_populates="products")
     plan_items = relationship("PlanItem", back_populates="product")
@@ -283,7 +320,13 @@ class PaymentMethod(Base):
 
 class FinanceEntry(Base):
     __tablename__ = "finance_entries"
-    __table_args__ = {'schema': 'public'}
+    __table_args__ = (
+        # Overdue sweep: UPDATE ... WHERE status = 'pendente' AND due_date < today
+        Index("idx_finance_pending_due", "due_date", postgresql_where=text("status = 'pendente'")),
+        # Ledger listing: keyset pagination on (due_date, id) per tenant
+        Index("idx_finance_tenant_due_id", "tenant_id", "due_date", "id"),
+        {'schema': 'public'},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
     tenant_id = Column(UUID(as_uuid=True), ForeignKey("public.tenants.id", ondelete="CASCADE"), nullable=False)
@@ -318,6 +361,31 @@ class FinanceEntry(Base):
     subscription = relationship("Subscription")
 
 
+class FinanceRollup(Base):
+    """Pre-aggregated finance_entries, maintained by the finance_rollup_trg trigger."""
+    __tablename__ = "finance_rollups"
+    __table_args__ = (
+        Index(
+            "uq_finance_rollups_key",
+            "tenant_id", "grain", "period_start", "type", "status", "category_id", "customer_id", "supplier_id",
+            unique=True, postgresql_nulls_not_distinct=True
+        ),
+        {'schema': 'public'},
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
+    tenant_id = Column(UUID(as_uuid=True), ForeignKey("public.tenants.id", ondelete="CASCADE"), nullable=False)
+    grain = Column(String, nullable=False) # day, month
+    period_start = Column(Date, nullable=False)
+    type = Column(String, nullable=False)
+    status = Column(String)
+    category_id = Column(UUID(as_uuid=True), nullable=True)
+    customer_id = Column(UUID(as_uuid=True), nullable=True)
+    supplier_id = Column(UUID(as_uuid=True), nullable=True)
+    total_amount = Column(Numeric(14, 2), nullable=False, default=0)
+    entry_count = Column(Integer, nullable=False, default=0)
+
+
 class PipelineStage(Base):
     __tablename__ = "pipeline_stages"
     __table_args__ = {'schema': 'public'}
@@ -395,7 +463,11 @@ class Notification(Base):
 
 class Appointment(Base):
     __tablename__ = "appointments"
-    __table_args__ = {'schema': 'public'}
+    __table_args__ = (
+        # Keyset pagination over the calendar window: (tenant_id, start_time, id)
+        Index("idx_appointments_tenant_start", "tenant_id", "start_time", "id"),
+        {'schema': 'public'},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
     tenant_id = Column(UUID(as_uuid=True), ForeignKey("public.tenants.id", ondelete="CASCADE"), nullable=False)
@@ -514,6 +586,23 @@ class Commission(Base):
     service = relationship("Product")
 
 
+class CommissionRollup(Base):
+    """Commissions per professional and month, maintained by the commission_rollup_trg trigger."""
+    __tablename__ = "commission_rollups"
+    __table_args__ = (
+        Index("uq_commission_rollups_key", "tenant_id", "professional_id", "period_start", unique=True),
+        {'schema': 'public'},
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
+    tenant_id = Column(UUID(as_uuid=True), ForeignKey("public.tenants.id", ondelete="CASCADE"), nullable=False)
+    professional_id = Column(UUID(as_uuid=True), ForeignKey("public.professionals.id", ondelete="CASCADE"), nullable=False)
+    period_start = Column(Date, nullable=False) # first day of the month (UTC)
+    service_count = Column(Integer, nullable=False, default=0)
+    total_revenue = Column(Numeric(14, 2), nullable=False, default=0)
+    total_commission = Column(Numeric(14, 2), nullable=False, default=0)
+
+
 class ProfessionalPerformance(Base):
     __tablename__ = "professional_performance"
     __table_args__ = {'schema': 'public'}
@@ -543,3 +632,34 @@ class PushSubscription(Base):
     subscription_json = Column(JSON, nullable=False)
     device_type = Column(String)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+    __table_args__ = (
+        Index("idx_import_jobs_status_updated", "status", "updated_at"),
+        {'schema': 'public'},
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
+    tenant_id = Column(UUID(as_uuid=True), ForeignKey("public.tenants.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String, nullable=False) # leads, products
+    filename = Column(String, nullable=False)
+    local_path = Column(String) # spooled copy on this instance's disk
+    storage_path = Column(String, nullable=True) # copy in Supabase Storage, for resuming elsewhere
+    user_email = Column(String)
+    status = Column(String, default="pending") # pending, running, completed, failed
+
+    total_rows = Column(Integer, nullable=True) # data rows, when the file reports it
+    processed_rows = Column(Integer, default=0) # data rows committed so far (resume point)
+    created_count = Column(Integer, default=0)
+    updated_count = Column(Integer, default=0)
+    error_count = Column(Integer, default=0)
+    error_details = Column(JSON, default=list) # [{ "row": 12, "error": "..." }]
+    message = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,100 @@
+import importlib
+import threading
+from typing import Dict, List, Tuple
+from fastapi import FastAPI
+
+# Every API router, in registration order, with the prefix its APIRouter declares.
+# With lazy loading a router module is imported and included the first time a
+# request falls under its prefix (longest prefix wins; routers sharing a prefix
+# load together), so a cold start only imports what its first request needs.
+ROUTERS: List[Tuple[str, str]] = [
+    ("app.routers.auth", "/auth"),
+    ("app.routers.master", "/master"),
+    ("app.routers.tenant_users", "/tenant"),
+    ("app.routers.tenant_data", "/tenant"),
+    ("app.routers.niches", "/niches"),
+    ("app.routers.appointments", "/tenant/appointments"),
+    ("app.routers.finances", "/tenant"),
+    ("app.routers.products", "/tenant"),
+    ("app.routers.subscriptions", "/tenant"),
+    ("app.routers.services", "/tenant/services"),
+    ("app.routers.professionals", "/tenant/professionals"),
+    ("app.routers.suppliers", "/tenant/suppliers"),
+    ("app.routers.uploads", "/uploads"),
+    ("app.routers.financial_reports", "/tenant/financial-reports"),
+    ("app.routers.commissions", "/tenant/commissions"),
+    ("app.routers.ai_insights", "/tenant/ai"),
+    ("app.routers.bot", "/tenant/bot"),
+    ("app.routers.automations", "/tenant/automations"),
+    ("app.routers.notifications", "/tenant/notifications"),
+    ("app.routers.imports", "/tenant/imports"),
+    ("app.routers.cron", "/cron"),
+]
+
+# Paths that describe the whole API
+LOAD_ALL_PATHS = ("/openapi.json", "/docs", "/redoc")
+
+_loaded: Dict[str, int] = {}
+_route_order: Dict[int, int] = {}
+_lock = threading.Lock()
+
+
+def _matching_prefix(path: str):
+    best = None
+    for _, prefix in ROUTERS:
+        if (path == prefix or path.startswith(prefix + "/")) and (best is None or len(prefix) > len(best)):
+            best = prefix
+    return best
+
+
+def _include(app: FastAPI, modules: List[str]):
+    with _lock:
+        pending = [(i, name) for i, (name, _) in enumerate(ROUTERS) if name in modules and name not in _loaded]
+        if not pending:
+            return
+        for index, name in pending:
+            router = importlib.import_module(name).router
+            if router.prefix != ROUTERS[index][1]:
+                print(f"⚠️ {name} declares prefix '{router.prefix}', registry has '{ROUTERS[index][1]}'")
+            before = len(app.router.routes)
+            app.include_router(router)
+            for route in app.router.routes[before:]:
+                _route_order[id(route)] = index
+            _loaded[name] = index
+
+        # Keep the eager registration order so overlapping paths resolve the same way
+        app.router.routes.sort(key=lambda route: _route_order.get(id(route), -1))
+        app.openapi_schema = None
+
+
+def include_for_path(app: FastAPI, path: str):
+    """Includes the routers that can serve `path` (all of them for the OpenAPI docs)."""
+    if len(_loaded) == len(ROUTERS):
+        return
+    if path in LOAD_ALL_PATHS:
+        include_all(app)
+        return
+    prefix = _matching_prefix(path)
+    if prefix:
+        _include(app, [name for name, router_prefix in ROUTERS if router_prefix == prefix])
+
+
+def include_all(app: FastAPI):
+    _include(app, [name for name, _ in ROUTERS])
+
+
+def loaded_routers() -> List[str]:
+    return sorted(_loaded, key=_loaded.get)
+
+
+class LazyRouterMiddleware:
+    """ASGI middleware that includes a request's routers before routing it."""
+
+    def __init__(self, app, fastapi_app: FastAPI):
+        self.app = app
+        self.fastapi_app = fastapi_app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            include_for_path(self.fastapi_app, scope["path"])
+        await self.app(scope, receive, send)
@@ -10,7 +10,7 @@ from typing import Dict, Any, List
 router = APIRouter(prefix="/tenant/ai", tags=["AI Insights"])
 
 @router.get("/insights")
-async def get_ai_insights(
+def get_ai_insights(
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
@@ -1,14 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import RedirectResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Query, BackgroundTasks
+from fastapi.responses import RedirectResponse, JSONResponse
 from typing import List, Optional
 import uuid
 import json
 import os
-from datetime import datetime, timedelta
+import base64
+import hashlib
+from datetime import datetime, timedelta, timezone
 from app.models.schemas import Appointment as AppointmentSchema, AppointmentCreate, TokenData
 from app.deps import get_current_tenant_user
 from app.database import get_db
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import tuple_, select, func, cast, BigInteger, Text
+from sqlalchemy.dialects.postgresql import BIT
 from app.models.sql_models import (
     Appointment as SQLAppointment, 
     Product as SQLProduct,
@@ -110,24 +114,211 @@ def get_credentials(tenant_slug: str):
         print(f"--- Debug: Error in get_credentials: {e} ---")
         return None, None
 
+# --- Calendar window / keyset pagination ---
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 2000
+
+def _parse_iso(value: str, field: str) -> datetime:
+    try:
+        dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Formato de data inválido em '{field}'")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+def encode_cursor(start_time: datetime, appt_id) -> str:
+    """Opaque cursor for the (start_time, id) keyset."""
+    raw = f"{start_time.isoformat()}|{appt_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        start_str, id_str = raw.split("|", 1)
+        return datetime.fromisoformat(start_str), uuid.UUID(id_str)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def resolve_window(start: Optional[str] = None, end: Optional[str] = None):
+    """
+    Resolves the [start, end) calendar window. A missing bound is left open (None),
+    so callers that don't send a range still get the tenant's whole history, one
+    page at a time; the agenda sends its visible range and its cost stays flat.
+    """
+    dt_start = _parse_iso(start, "start") if start else None
+    dt_end = _parse_iso(end, "end") if end else None
+    if dt_start and dt_end and dt_end <= dt_start:
+        raise HTTPException(status_code=400, detail="'end' deve ser posterior a 'start'")
+    return dt_start, dt_end
+
+def _window_filters(tenant_id, dt_start: Optional[datetime], dt_end: Optional[datetime], professional_id: Optional[str] = None):
+    filters = [SQLAppointment.tenant_id == tenant_id]
+    if dt_start:
+        filters.append(SQLAppointment.start_time >= dt_start)
+    if dt_end:
+        filters.append(SQLAppointment.start_time < dt_end)
+    if professional_id:
+        filters.append(SQLAppointment.professional_id == professional_id)
+    return filters
+
+def query_appointments_window(
+    db: Session,
+    tenant_id,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    professional_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE
+):
+    """
+    Returns one page of the tenant's appointments inside [start, end), ordered by
+    (start_time, id), plus the cursor for the next page (None on the last page).
+    """
+    dt_start, dt_end = resolve_window(start, end)
+
+    # Eager-load the many-to-one names used by the serializers (customer_name /
+    # professional_name) in the same SELECT instead of one lazy load per row.
+    query = db.query(SQLAppointment).options(
+        joinedload(SQLAppointment.customer),
+        joinedload(SQLAppointment.professional)
+    ).filter(*_window_filters(tenant_id, dt_start, dt_end, professional_id))
+    if cursor:
+        cursor_start, cursor_id = decode_cursor(cursor)
+        query = query.filter(
+            tuple_(SQLAppointment.start_time, SQLAppointment.id) > tuple_(cursor_start, cursor_id)
+        )
+
+    rows = query.order_by(SQLAppointment.start_time, SQLAppointment.id).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].start_time, rows[-1].id)
+    return rows, next_cursor
+
+# --- Calendar bundle incremental sync ---
+
+# updated_at is stamped with now(), the *start* of the writing transaction, so a
+# transaction still open at a sync can commit rows stamped before it. Deltas
+# reach back this far past the previous sync, and a snapshot only counts as
+# unchanged once its newest change is this old (clients merge deltas by id).
+SYNC_SAFETY_MARGIN = timedelta(seconds=30)
+
+def _sync_sources(tenant_id, window_filters):
+    """(name, model, filters) for each collection in the bundle."""
+    from app.models.sql_models import Professional as SQLProfessional
+    return [
+        ("appointments", SQLAppointment, window_filters),
+        ("customers", SQLCustomer, [SQLCustomer.tenant_id == tenant_id]),
+        ("professionals", SQLProfessional, [SQLProfessional.tenant_id == tenant_id]),
+        ("services", SQLProduct, [SQLProduct.tenant_id == tenant_id]),
+    ]
+
+def _id_digest(model):
+    """
+    Order-independent digest of the ids in a collection: the sum of a 60-bit
+    slice of md5(id). Unlike count(*), it changes when one row leaves and
+    another enters. _row_digest computes a single row's share in Python.
+    """
+    slice_ = func.concat("x", func.substr(func.md5(cast(model.id, Text)), 1, 15))
+    return func.coalesce(func.sum(cast(cast(slice_, BIT(60)), BigInteger)), 0)
+
+def _row_digest(row_id) -> int:
+    return int(hashlib.md5(str(row_id).encode()).hexdigest()[:15], 16)
+
+def _sync_state(db: Session, sources):
+    """
+    max(updated_at), count(*) and id digest of every bundle collection, plus the
+    database clock (synced_at), in a single round trip.
+    """
+    columns = [func.now()]
+    for _, model, filters in sources:
+        columns.append(select(func.max(model.updated_at)).where(*filters).scalar_subquery())
+        columns.append(select(func.count()).select_from(model).where(*filters).scalar_subquery())
+        columns.append(select(_id_digest(model)).where(*filters).scalar_subquery())
+    row = db.execute(select(*columns)).one()
+    state = {
+        name: [row[1 + i * 3].isoformat() if row[1 + i * 3] else None, row[2 + i * 3], int(row[3 + i * 3])]
+        for i, (name, _, _) in enumerate(sources)
+    }
+    return state, row[0].isoformat()
+
+def _settled(collection_state: list, synced_at: str) -> bool:
+    """True when no transaction open at synced_at can still commit a change behind this state."""
+    token_max = collection_state[0]
+    return token_max is None or \
+        datetime.fromisoformat(token_max) <= datetime.fromisoformat(synced_at) - SYNC_SAFETY_MARGIN
+
+def encode_sync_token(window: list, state: dict, synced_at: str) -> str:
+    raw = json.dumps({"window": window, "state": state, "synced_at": synced_at}, sort_keys=True)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_sync_token(token: str):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+        return data["window"], data["state"], data["synced_at"]
+    except Exception:
+        return None, None, None
+
+def sync_token_etag(window: list, state: dict) -> str:
+    raw = json.dumps({"window": window, "state": state}, sort_keys=True)
+    return '"' + hashlib.sha1(raw.encode()).hexdigest() + '"'
+
+def _serialize_bundle_appointment(l):
+    return {
+        "id": str(l.id),
+        "title": l.title,
+        "start_time": l.start_time.isoformat() if hasattr(l.start_time, 'isoformat') else str(l.start_time),
+        "end_time": l.end_time.isoformat() if l.end_time else None,
+        "description": l.description,
+        "status": l.status,
+        "customer_id": str(l.customer_id),
+        "professional_id": str(l.professional_id),
+        "professional_name": l.professional.name if l.professional else None
+    }
+
 @router.get("/bundle")
-async def get_calendar_bundle(
+def get_calendar_bundle(
+    request: Request,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    professional_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    since: Optional[str] = None,
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
-    """Retorna todos os dados necessários para a Agenda de uma só vez para otimizar a rede."""
-    from app.models.sql_models import (
-        Professional as SQLProfessional, 
-        Product as SQLService,
-        Customer as SQLCustomer
-    )
-    
-    # 1. Appointments
-    local_appts_models = db.query(SQLAppointment).filter(
-        SQLAppointment.tenant_id == current_user.tenant_id
-    ).all()
-    
-    # Google Appts logic
+    """
+    Retorna todos os dados necessários para a Agenda de uma só vez para otimizar a rede.
+
+    Sincronização incremental: a resposta completa traz um `sync_token` (e o header ETag).
+    Enviando-o de volta em `since` (ou If-None-Match), a API responde 304 quando nada mudou,
+    ou apenas as linhas alteradas desde então. Coleções com exclusões voltam completas,
+    sinalizadas em `full`. Deltas podem repetir linhas já enviadas (alterações dos últimos
+    segundos antes da sincronização): o cliente mescla por `id`.
+
+    Com `cursor` (vindo de `next_cursor`), retorna só a página seguinte de `appointments`
+    e o próximo `next_cursor`; as demais coleções e o `sync_token` vêm na primeira página.
+    """
+    from app.models.sql_models import Professional as SQLProfessional
+    tenant_id = current_user.tenant_id
+
+    if cursor:
+        # Next page of the first page's snapshot: that page already carried the
+        # other collections, the Google events and the sync token.
+        appt_rows, next_cursor = query_appointments_window(
+            db, tenant_id, start, end, professional_id, cursor, limit
+        )
+        return {
+            "appointments": [_serialize_bundle_appointment(l) for l in appt_rows],
+            "next_cursor": next_cursor
+        }
+
+    # Google events are not tracked by updated_at, so a connected calendar always
+    # gets the full (non-incremental) bundle.
     google_appts = []
     service_google = None
     try:
@@ -138,13 +329,13 @@ async def get_calendar_bundle(
                                                 maxResults=100, singleEvents=True,
                                                 orderBy='startTime').execute()
             for event in events_result.get('items', []):
-                start = event['start'].get('dateTime', event['start'].get('date'))
-                end = event['end'].get('dateTime', event['end'].get('date'))
+                g_start = event['start'].get('dateTime', event['start'].get('date'))
+                g_end = event['end'].get('dateTime', event['end'].get('date'))
                 google_appts.append({
                     "id": f"google_{event['id']}",
                     "title": event.get('summary', '(Sem Título)'),
-                    "start_time": start,
-                    "end_time": end,
+                    "start_time": g_start,
+                    "end_time": g_end,
                     "description": event.get('description', ''),
                     "status": 'scheduled',
                     "customer_id": 'google_event'
@@ -152,6 +343,74 @@ async def get_calendar_bundle(
     except Exception as e:
         print(f"Error fetching Google Calendar: {e}")
 
+    incremental = service_google is None
+    dt_start, dt_end = resolve_window(start, end)
+    window = [dt_start.isoformat() if dt_start else None, dt_end.isoformat() if dt_end else None, professional_id]
+    sources = _sync_sources(tenant_id, _window_filters(tenant_id, dt_start, dt_end, professional_id))
+
+    state = None
+    client_state = None
+    etag = None
+    if incremental:
+        state, synced_at = _sync_state(db, sources)
+        current_token = encode_sync_token(window, state, synced_at)
+        # Only a settled snapshot may be answered with 304 later on
+        if all(_settled(s, synced_at) for s in state.values()):
+            etag = sync_token_etag(window, state)
+        if etag and request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        if since:
+            token_window, token_state, token_synced_at = decode_sync_token(since)
+            if token_window == window and token_synced_at:
+                if token_state == state and all(_settled(s, token_synced_at) for s in token_state.values()):
+                    return Response(status_code=304, headers={"ETag": etag} if etag else None)
+                client_state = token_state
+
+    def changed_since(name, model):
+        """Rows changed since the client's token, or None when a full reload is needed."""
+        if client_state is None or len(client_state.get(name) or ()) != 3:
+            return None
+        token_max, token_count, token_digest = client_state[name]
+        if state[name] == client_state[name] and _settled(client_state[name], token_synced_at):
+            return []
+        if token_max is None:
+            return None
+        token_dt = datetime.fromisoformat(token_max)
+        # Rows committed after the client's sync may be stamped up to the margin before it
+        floor = min(token_dt, datetime.fromisoformat(token_synced_at) - SYNC_SAFETY_MARGIN)
+        return [model.updated_at > floor], token_dt, token_count, token_digest
+
+    full = {}
+
+    def load(name, model, filters, columns):
+        delta = changed_since(name, model)
+        if delta == []:
+            full[name] = False
+            return []
+        query = db.query(*columns, model.created_at).filter(*filters) if columns else \
+            db.query(model).options(joinedload(SQLAppointment.professional)).filter(*filters)
+        if delta is not None:
+            delta_filters, token_dt, token_count, token_digest = delta
+            rows = query.filter(*delta_filters).all()
+            created = [r for r in rows if r.created_at and r.created_at > token_dt]
+            # The delta holds only if the client's rows are all still here and the
+            # only additions are rows created since: anything deleted, moved out of
+            # (or into) the window, or inserted behind the token forces a reload.
+            if state[name][1] == token_count + len(created) and \
+                    state[name][2] == token_digest + sum(_row_digest(r.id) for r in created):
+                full[name] = False
+                return rows
+        full[name] = True
+        return query.all() if columns else None
+
+    # 1. Appointments (windowed, keyset-paginated)
+    appt_rows = load("appointments", SQLAppointment, sources[0][2], None)
+    next_cursor = None
+    if appt_rows is None:
+        appt_rows, next_cursor = query_appointments_window(
+            db, tenant_id, start, end, professional_id, None, limit
+        )
+
     # Deduplicate
     final_appts = []
     seen_keys = set()
@@ -160,33 +419,24 @@ async def get_calendar_bundle(
         seen_keys.add(key)
         final_appts.append(g)
 
-    for l in local_appts_models:
-        l_start = l.start_time.isoformat() if hasattr(l.start_time, 'isoformat') else str(l.start_time)
-        key = (l.title.strip().lower(), l_start)
+    for l in appt_rows:
+        item = _serialize_bundle_appointment(l)
+        key = (l.title.strip().lower(), item["start_time"])
         if key not in seen_keys:
-            # Manually convert to dict for the bundle
-            final_appts.append({
-                "id": str(l.id),
-                "title": l.title,
-                "start_time": l_start,
-                "end_time": l.end_time.isoformat() if l.end_time else None,
-                "description": l.description,
-                "status": l.status,
-                "customer_id": str(l.customer_id),
-                "professional_id": str(l.professional_id),
-                "professional_name": l.professional.name if l.professional else None
-            })
-
-    # 2. Customers
-    customers = db.query(SQLCustomer).filter(SQLCustomer.tenant_id == current_user.tenant_id).all()
+            final_appts.append(item)
+
+    # 2. Customers (projected columns only, no ORM entities)
+    customers = load("customers", SQLCustomer, sources[1][2], [SQLCustomer.id, SQLCustomer.name])
     customers_list = [{"id": str(c.id), "name": c.name} for c in customers]
 
     # 3. Professionals
-    professionals = db.query(SQLProfessional).filter(SQLProfessional.tenant_id == current_user.tenant_id).all()
+    professionals = load("professionals", SQLProfessional, sources[2][2], [SQLProfessional.id, SQLProfessional.name])
     professionals_list = [{"id": str(p.id), "name": p.name} for p in professionals]
 
     # 4. Services
-    services = db.query(SQLService).filter(SQLService.tenant_id == current_user.tenant_id).all()
+    services = load("services", SQLProduct, sources[3][2], [
+        SQLProduct.id, SQLProduct.name, SQLProduct.duration_minutes, SQLProduct.price
+    ])
     services_list = [{"id": str(s.id), "name": s.name, "duration_minutes": s.duration_minutes, "value": float(s.price or 0)} for s in services]
 
     # 5. Connection Info
@@ -202,26 +452,42 @@ async def get_calendar_bundle(
         except:
             pass
 
-    return {
+    payload = {
         "appointments": final_appts,
         "customers": customers_list,
         "professionals": professionals_list,
         "services": services_list,
-        "connectionInfo": conn_info
+        "connectionInfo": conn_info,
+        "next_cursor": next_cursor,
+        "full": full,
+        "sync_token": None
     }
 
+    # The token describes the window as of this first page: a client paging through
+    # next_cursor keeps it until the last page; changes made in between come back
+    # in its next delta (or force a reload), never lost.
+    if incremental:
+        payload["sync_token"] = current_token
+        return JSONResponse(content=payload, headers={"ETag": etag} if etag else None)
+    return payload
+
 @router.get("/", response_model=List[AppointmentSchema])
-async def get_appointments(
+def get_appointments(
+    response: Response,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    professional_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
-    # 1. Get Local Appointments from SQL
-    from app.models.sql_models import Professional as SQLProfessional
-    local_appts_models = db.query(SQLAppointment).outerjoin(
-        SQLProfessional, SQLAppointment.professional_id == SQLProfessional.id
-    ).filter(
-        SQLAppointment.tenant_id == current_user.tenant_id
-    ).all()
+    # 1. Get Local Appointments from SQL (windowed, keyset-paginated)
+    local_appts_models, next_cursor = query_appointments_window(
+        db, current_user.tenant_id, start, end, professional_id, cursor, limit
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
     local_appts = []
     for a in local_appts_models:
@@ -236,7 +502,7 @@ async def get_appointments(
     service = None
     try:
         creds, service = get_credentials(current_user.tenant_slug)
-        if service:
+        if service and not cursor:
             now = datetime.utcnow().isoformat() + 'Z'
             events_result = service.events().list(calendarId='primary', timeMin=now,
                                                 maxResults=100, singleEvents=True,
@@ -282,7 +548,7 @@ async def get_appointments(
     return final_appts
 
 @router.post("/", response_model=AppointmentSchema)
-async def create_appointment(
+def create_appointment(
     appt_in: AppointmentCreate, 
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
@@ -438,7 +704,7 @@ async def create_appointment(
     return new_appt
 
 @router.get("/customer-plans/{customer_id}")
-async def get_customer_plans(
+def get_customer_plans(
     customer_id: str,
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
@@ -468,7 +734,7 @@ async def get_customer_plans(
     ]
 
 @router.put("/{appt_id}", response_model=AppointmentSchema)
-async def update_appointment(
+def update_appointment(
     appt_id: str,
     appt_in: AppointmentCreate,
     current_user: TokenData = Depends(get_current_tenant_user),
@@ -517,8 +783,9 @@ async def update_appointment(
     return appt
 
 @router.post("/{appt_id}/complete", response_model=AppointmentSchema)
-async def complete_appointment(
+def complete_appointment(
     appt_id: str,
+    background_tasks: BackgroundTasks,
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
@@ -546,13 +813,25 @@ async def complete_appointment(
     
     if finance_entry:
         finance_entry.status = "pago" # When completed, assume payment if linked
+
+    from app.services import outbox_service
+    queued = outbox_service.enqueue(db, current_user.tenant_id, "appointment_completed", {
+        "appointment_id": str(appt.id),
+        "customer_id": str(appt.customer_id) if appt.customer_id else None,
+        "professional_id": str(appt.professional_id) if appt.professional_id else None,
+        "service_id": str(appt.service_id) if appt.service_id else None,
+        "service_value": float(appt.service_value or 0),
+        "start_time": appt.start_time.isoformat() if appt.start_time else None
+    })
     
     db.commit()
     db.refresh(appt)
+    if queued:
+        background_tasks.add_task(outbox_service.dispatch_pending, current_user.tenant_id)
     return appt
 
 @router.delete("/{appt_id}")
-async def delete_appointment(
+def delete_appointment(
     appt_id: str,
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
@@ -575,7 +854,7 @@ async def delete_appointment(
     db.commit()
     return {"message": "Deletado com sucesso"}
 @router.get("/auth-url")
-async def get_auth_url(current_user: TokenData = Depends(get_current_tenant_user)):
+def get_auth_url(current_user: TokenData = Depends(get_current_tenant_user)):
     """Generate the Google OAuth authorization URL."""
     config = get_google_config(current_user.tenant_slug)
     if not config:
@@ -608,7 +887,7 @@ async def get_auth_url(current_user: TokenData = Depends(get_current_tenant_user
     return {"url": auth_url}
 
 @router.post("/callback")
-async def google_callback(data: dict, current_user: TokenData = Depends(get_current_tenant_user)):
+def google_callback(data: dict, current_user: TokenData = Depends(get_current_tenant_user)):
     """Handle the OAuth callback and exchange code for tokens."""
     code = data.get("code")
     state = data.get("state")
@@ -665,7 +944,7 @@ async def google_callback(data: dict, current_user: TokenData = Depends(get_curr
         raise HTTPException(status_code=500, detail=f"Erro na troca do código: {str(e)}")
 
 @router.get("/calendar-info")
-async def get_calendar_info(current_user: TokenData = Depends(get_current_tenant_user)):
+def get_calendar_info(current_user: TokenData = Depends(get_current_tenant_user)):
     """Retrieve info about the connected Google account."""
     try:
         creds, service = get_credentials(current_user.tenant_slug)
@@ -684,7 +963,7 @@ async def get_calendar_info(current_user: TokenData = Depends(get_current_tenant
     return {"connected": False}
 
 @router.post("/config")
-async def save_google_calendar_config(config: dict, current_user: TokenData = Depends(get_current_tenant_user)):
+def save_google_calendar_config(config: dict, current_user: TokenData = Depends(get_current_tenant_user)):
     """Save and VALIDATE Google Calendar API credentials."""
     # Strip whitespace from inputs (common user error)
     client_id = config.get("client_id", "").strip()
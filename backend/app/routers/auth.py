@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from app.models.schemas import MasterLogin, TenantLogin, Token, SelectTenant, TokenData, UserPasswordChange
 from app.services.auth_service import authenticate_master, authenticate_tenant_user, create_access_token, get_tenant_by_slug, change_user_password
-from app.deps import get_current_user_token_data, get_current_master
+from app.deps import get_current_user_token_data, get_current_master, get_current_principal, Principal
 from app.database import get_db, SessionLocal # Use SessionLocal for simple one-offs if dependency injection not passed
 from sqlalchemy.orm import Session
 from app.models.sql_models import Tenant, User # Direct access for 'me' endpoint
@@ -9,7 +9,7 @@ from app.models.sql_models import Tenant, User # Direct access for 'me' endpoint
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 @router.post("/login-master", response_model=Token)
-async def login_master(user_in: MasterLogin, db: Session = Depends(get_db)):
+def login_master(user_in: MasterLogin, db: Session = Depends(get_db)):
     user = authenticate_master(db, user_in.email, user_in.password)
     if not user:
         raise HTTPException(
@@ -25,7 +25,7 @@ async def login_master(user_in: MasterLogin, db: Session = Depends(get_db)):
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/select-tenant", response_model=Token)
-async def select_tenant(payload: SelectTenant, current_user: TokenData = Depends(get_current_master), db: Session = Depends(get_db)):
+def select_tenant(payload: SelectTenant, current_user: TokenData = Depends(get_current_master), db: Session = Depends(get_db)):
     # Check if tenant exists via auth_service helper (now DB backed)
     tenant_obj = get_tenant_by_slug(db, payload.tenant_slug, allow_inactive=True)
     if not tenant_obj:
@@ -43,7 +43,7 @@ async def select_tenant(payload: SelectTenant, current_user: TokenData = Depends
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/login-tenant", response_model=Token)
-async def login_tenant(user_in: TenantLogin, db: Session = Depends(get_db)):
+def login_tenant(user_in: TenantLogin, db: Session = Depends(get_db)):
     user = authenticate_tenant_user(db, user_in.tenant_slug, user_in.email, user_in.password)
     if not user:
          raise HTTPException(
@@ -67,7 +67,8 @@ async def login_tenant(user_in: TenantLogin, db: Session = Depends(get_db)):
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me")
-async def read_users_me(current_user: TokenData = Depends(get_current_user_token_data), db: Session = Depends(get_db)):
+def read_users_me(principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
+    current_user = principal.token
     nome_empresa = None
     logo_url = None
     nicho_nome = None
@@ -80,7 +81,7 @@ async def read_users_me(current_user: TokenData = Depends(get_current_user_token
     
     # 2. Tenant Context Logic
     if current_user.tenant_slug:
-        env = db.query(Tenant).filter(Tenant.slug == current_user.tenant_slug).first()
+        env = principal.tenant
         if env:
             nome_empresa = env.name
             logo_url = env.logo_url
@@ -88,7 +89,7 @@ async def read_users_me(current_user: TokenData = Depends(get_current_user_token
             payment_status = env.payment_status
             
             # Tenant-wide enabled modules
-            tenant_modules = env.modulos_habilitados or []
+            tenant_modules = list(env.modulos_habilitados)
             
             # Intersection Logic
             if current_user.role_global == "master" or current_user.role_local == "admin":
@@ -99,8 +100,8 @@ async def read_users_me(current_user: TokenData = Depends(get_current_user_token
                 user_modules = user_obj.modules_allowed if user_obj and user_obj.modules_allowed else []
                 modulos_habilitados = [mod for mod in tenant_modules if mod in user_modules]
 
-            if env.niche:
-                nicho_nome = env.niche.name
+            if env.niche_id:
+                nicho_nome = env.niche_name
             
     return {
         "email": current_user.email,
@@ -117,14 +118,14 @@ async def read_users_me(current_user: TokenData = Depends(get_current_user_token
     }
 
 @router.post("/exit-tenant", response_model=Token)
-async def exit_tenant(current_user: TokenData = Depends(get_current_master)):
+def exit_tenant(current_user: TokenData = Depends(get_current_master)):
     access_token = create_access_token(
         data={"sub": current_user.email, "role_global": "master"}
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/change-password")
-async def change_password(payload: UserPasswordChange, current_user: TokenData = Depends(get_current_user_token_data), db: Session = Depends(get_db)):
+def change_password(payload: UserPasswordChange, current_user: TokenData = Depends(get_current_user_token_data), db: Session = Depends(get_db)):
     success = change_user_password(
         db=db,
         email=current_user.email, 
@@ -1,16 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.deps import get_current_tenant_user
 from app.models.schemas import TokenData
-from app.models.sql_models import Automation
-from typing import List, Dict, Any
+from app.models.sql_models import Automation, OutboxEvent
+from app.services import outbox_service, webhook_guard_service
+from typing import List, Dict, Any, Optional
+from datetime import datetime, timedelta, timezone
 import uuid
 
 router = APIRouter(prefix="/tenant/automations", tags=["Automations"])
 
 @router.get("/", response_model=List[Dict[str, Any]])
-async def get_automations(
+def get_automations(
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
@@ -27,7 +30,7 @@ async def get_automations(
     ]
 
 @router.post("/")
-async def create_automation(
+def create_automation(
     data: Dict[str, Any],
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
@@ -42,10 +45,11 @@ async def create_automation(
     )
     db.add(new_auto)
     db.commit()
+    outbox_service.invalidate_automations(current_user.tenant_id)
     return {"status": "success", "id": str(new_auto.id)}
 
 @router.delete("/{auto_id}")
-async def delete_automation(
+def delete_automation(
     auto_id: str,
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
@@ -55,4 +59,91 @@ async def delete_automation(
         Automation.tenant_id == current_user.tenant_id
     ).delete()
     db.commit()
+    outbox_service.invalidate_automations(current_user.tenant_id)
     return {"status": "deleted"}
+
+@router.get("/deliveries", response_model=List[Dict[str, Any]])
+def get_deliveries(
+    status: Optional[str] = None, # pending, delivered, dead
+    limit: int = 50,
+    current_user: TokenData = Depends(get_current_tenant_user),
+    db: Session = Depends(get_db)
+):
+    """Webhook deliveries from the outbox, newest first"""
+    query = db.query(OutboxEvent).filter(OutboxEvent.tenant_id == current_user.tenant_id)
+    if status:
+        query = query.filter(OutboxEvent.status == status)
+    rows = query.order_by(OutboxEvent.created_at.desc()).limit(min(max(limit, 1), 200)).all()
+    return [outbox_service.serialize_event(row) for row in rows]
+
+@router.get("/destinations", response_model=List[Dict[str, Any]])
+def get_destinations(
+    current_user: TokenData = Depends(get_current_tenant_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Delivery state per webhook URL: outbox counts for the last 24h, plus the
+    circuit breaker and rate limit as seen by the instance answering.
+    """
+    autos = db.query(Automation.name, Automation.action_config, Automation.active).filter(
+        Automation.tenant_id == current_user.tenant_id,
+        Automation.action_type == "webhook"
+    ).all()
+
+    since = datetime.now(timezone.utc) - timedelta(hours=24)
+    counts = db.query(
+        OutboxEvent.url,
+        OutboxEvent.status,
+        func.count(OutboxEvent.id),
+        func.max(OutboxEvent.delivered_at)
+    ).filter(
+        OutboxEvent.tenant_id == current_user.tenant_id,
+        OutboxEvent.created_at >= since
+    ).group_by(OutboxEvent.url, OutboxEvent.status).all()
+
+    destinations: Dict[str, Dict[str, Any]] = {}
+    def destination(url):
+        if url not in destinations:
+            destinations[url] = {
+                "url": url,
+                "automations": [],
+                "last_24h": {"pending": 0, "delivered": 0, "dead": 0},
+                "last_delivered_at": None
+            }
+        return destinations[url]
+
+    for a in autos:
+        url = (a.action_config or {}).get("url")
+        if url:
+            destination(url)["automations"].append({"name": a.name, "active": a.active})
+    for url, status, count, last_delivered in counts:
+        entry = destination(url)
+        entry["last_24h"][status] = count
+        # One row per status: keep the latest across them
+        if last_delivered and (entry["last_delivered_at"] is None or last_delivered > entry["last_delivered_at"]):
+            entry["last_delivered_at"] = last_delivered
+
+    return [
+        {
+            **entry,
+            "last_delivered_at": entry["last_delivered_at"].isoformat() if entry["last_delivered_at"] else None,
+            **webhook_guard_service.destination_state(url)
+        }
+        for url, entry in destinations.items()
+    ]
+
+@router.post("/deliveries/{delivery_id}/redeliver")
+def redeliver(
+    delivery_id: str,
+    background_tasks: BackgroundTasks,
+    current_user: TokenData = Depends(get_current_tenant_user),
+    db: Session = Depends(get_db)
+):
+    try:
+        delivery_uuid = uuid.UUID(delivery_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Entrega não encontrada")
+    if not outbox_service.redeliver(db, delivery_uuid, current_user.tenant_id):
+        raise HTTPException(status_code=404, detail="Entrega não encontrada ou ainda pendente")
+    background_tasks.add_task(outbox_service.dispatch_pending, current_user.tenant_id)
+    return {"status": "queued"}
@@ -1,96 +1,93 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Header
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Dict, Any, Optional
-import uuid
-from app.database import get_db
+import os
+import secrets
+from app.database import get_async_db
 from app.deps import get_current_tenant_user
 from app.models.sql_models import BotSession as SQLBotSession, Lead as SQLLead
 from app.models.schemas import BotSession, BotSessionBase, TokenData
+from app.services import bot_telemetry_service
 
 router = APIRouter(prefix="/tenant/bot", tags=["bot"])
 
+def verify_telemetry_secret(authorization: Optional[str]):
+    """n8n sends `Authorization: Bearer $BOT_TELEMETRY_SECRET`; events name their tenant, so unset means closed."""
+    secret = os.getenv("BOT_TELEMETRY_SECRET")
+    if not secret or not secrets.compare_digest(authorization or "", f"Bearer {secret}"):
+        raise HTTPException(status_code=401, detail="Invalid telemetry credentials")
+
 @router.get("/sessions", response_model=List[BotSession])
 async def get_bot_sessions(
     current_user: TokenData = Depends(get_current_tenant_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """List active bot sessions for the tenant."""
-    sessions = db.query(SQLBotSession).filter(
-        SQLBotSession.tenant_id == current_user.tenant_id
-    ).order_by(SQLBotSession.updated_at.desc()).limit(20).all()
-    return sessions
+    result = await db.execute(
+        select(SQLBotSession).filter(
+            SQLBotSession.tenant_id == current_user.tenant_id
+        ).order_by(SQLBotSession.updated_at.desc()).limit(20)
+    )
+    return result.scalars().all()
 
 @router.post("/telemetry")
 async def update_bot_telemetry(
     data: Dict[str, Any],
-    db: Session = Depends(get_db)
+    authorization: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Endpoint for n8n to report bot telemetry.
-    Expects: { "tenant_id": "...", "customer_id": "...", "customer_name": "...", "status": "...", "current_step": "...", "progress": 50, "message": "..." }
+    Expects: { "tenant_id": "...", "session_key": "...", "lead_id": "...", "customer_name": "...", "status": "...", "current_step": "...", "progress": 50, "message": "..." }
+    Several events per conversation turn: send them together to /telemetry/batch.
     """
-    tenant_id = data.get("tenant_id")
-    if not tenant_id:
+    verify_telemetry_secret(authorization)
+    if not data.get("tenant_id"):
         raise HTTPException(status_code=400, detail="Missing tenant_id")
-    
-    # Generate common ID based on lead_id or customer_name to track session
-    lead_id = data.get("lead_id")
-    customer_name = data.get("customer_name")
-    
-    # Try to find existing active session for this lead/customer
-    session = None
-    if lead_id:
-        session = db.query(SQLBotSession).filter(
-            SQLBotSession.tenant_id == tenant_id,
-            SQLBotSession.lead_id == lead_id,
-            SQLBotSession.status == "active"
-        ).first()
-    
-    if not session and customer_name:
-        session = db.query(SQLBotSession).filter(
-            SQLBotSession.tenant_id == tenant_id,
-            SQLBotSession.customer_name == customer_name,
-            SQLBotSession.status == "active"
-        ).first()
-
-    if not session:
-        session = SQLBotSession(
-            id=uuid.uuid4(),
-            tenant_id=tenant_id,
-            lead_id=lead_id,
-            customer_name=customer_name
-        )
-        db.add(session)
-    
-    # Update fields
-    if "status" in data: session.status = data["status"]
-    if "current_step" in data: session.current_step = data["current_step"]
-    if "progress" in data: session.step_progress = data["progress"]
-    if "message" in data: session.last_message = data["message"]
-    
-    db.commit()
+    try:
+        await bot_telemetry_service.ingest(db, [data])
+    except bot_telemetry_service.InvalidTelemetry as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return {"status": "success"}
 
+@router.post("/telemetry/batch")
+async def ingest_bot_telemetry_batch(
+    events: List[Dict[str, Any]],
+    authorization: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    A JSON array of telemetry events (same fields as /telemetry), applied in
+    order in one transaction. Any invalid event, or one naming an unknown tenant,
+    rejects the whole batch (400); an unknown lead_id is ignored.
+    """
+    verify_telemetry_secret(authorization)
+    try:
+        result = await bot_telemetry_service.ingest(db, events)
+    except bot_telemetry_service.InvalidTelemetry as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "success", **result}
+
 @router.get("/health")
 async def check_bot_health(
     current_user: TokenData = Depends(get_current_tenant_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Mock health check - in real scenario, could ping n8n webhook."""
     # Check if there was any telemetry in the last hour
     from datetime import datetime, timedelta
     one_hour_ago = datetime.utcnow() - timedelta(hours=1)
     
-    recent_activity = db.query(SQLBotSession).filter(
-        SQLBotSession.tenant_id == current_user.tenant_id,
-        SQLBotSession.updated_at >= one_hour_ago
-    ).count()
+    recent_activity, active_sessions = (await db.execute(
+        select(
+            func.count().filter(SQLBotSession.updated_at >= one_hour_ago),
+            func.count().filter(SQLBotSession.status == "active")
+        ).where(SQLBotSession.tenant_id == current_user.tenant_id)
+    )).one()
     
     return {
         "status": "online" if recent_activity > 0 else "idle",
         "last_activity": "Recent" if recent_activity > 0 else "None in last hour",
-        "active_sessions": db.query(SQLBotSession).filter(
-            SQLBotSession.tenant_id == current_user.tenant_id,
-            SQLBotSession.status == "active"
-        ).count()
+        "active_sessions": active_sessions
     }
@@ -6,8 +6,10 @@ from app.database import get_db
 from app.deps import get_current_tenant_user
 from app.models import schemas
 from app.models.schemas import TokenData
-from app.models.sql_models import Commission, Professional, ProfessionalPerformance, Appointment
+from app.models.sql_models import Commission, CommissionRollup, Professional, ProfessionalPerformance, Appointment
+from app.services import commission_rollup_service
 from datetime import datetime, timedelta
+from decimal import Decimal
 
 router = APIRouter(prefix="/tenant/commissions", tags=["commissions"])
 
@@ -18,38 +20,36 @@ def get_commission_dashboard(
     period: str = None # YYYY-MM
 ):
     """Retorna métricas gerais de comissão do tenant"""
-    if not period:
-        period = datetime.now().strftime("%Y-%m")
-    
-    # Global stats for the period
-    stats = db.query(
-        func.count(Commission.id).label("total_services"),
-        func.sum(Commission.service_value).label("total_revenue"),
-        func.sum(Commission.commission_value).label("total_commission")
-    ).filter(
-        Commission.tenant_id == current_user.tenant_id,
-        func.to_char(Commission.created_at, 'YYYY-MM') == period
-    ).first()
+    try:
+        month_start = commission_rollup_service.parse_period(period)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Período inválido, use o formato AAAA-MM")
 
-    # Ranking of professionals
+    # Ranking of professionals, one rollup row each; the summary is their sum
     ranking = db.query(
         Professional.name,
         Professional.id,
-        func.sum(Commission.commission_value).label("total_commission"),
-        func.count(Commission.id).label("services_count")
+        CommissionRollup.total_revenue,
+        CommissionRollup.total_commission,
+        CommissionRollup.service_count.label("services_count")
     ).join(
-        Commission, Commission.professional_id == Professional.id
+        CommissionRollup, CommissionRollup.professional_id == Professional.id
     ).filter(
-        Commission.tenant_id == current_user.tenant_id,
-        func.to_char(Commission.created_at, 'YYYY-MM') == period
-    ).group_by(Professional.id).order_by(desc("total_commission")).all()
+        CommissionRollup.tenant_id == current_user.tenant_id,
+        CommissionRollup.period_start == month_start,
+        CommissionRollup.service_count > 0
+    ).order_by(desc(CommissionRollup.total_commission)).all()
+
+    total_services = sum(r.services_count for r in ranking)
+    total_revenue = sum((r.total_revenue for r in ranking), Decimal(0))
+    total_commission = sum((r.total_commission for r in ranking), Decimal(0))
 
     return {
         "summary": {
-            "total_services": stats.total_services or 0,
-            "total_revenue": float(stats.total_revenue or 0),
-            "total_commission": float(stats.total_commission or 0),
-            "avg_commission": float((stats.total_commission or 0) / (stats.total_services or 1))
+            "total_services": total_services,
+            "total_revenue": float(total_revenue),
+            "total_commission": float(total_commission),
+            "avg_commission": float(total_commission / (total_services or 1))
         },
         "ranking": [
             {
@@ -76,15 +76,14 @@ def get_professional_stats(
     if not prof:
         raise HTTPException(status_code=404, detail="Profissional não encontrado")
 
-    # Aggregated metrics
+    # Aggregated metrics (all months)
     metrics = db.query(
-        func.count(Commission.id).label("total_services"),
-        func.count(func.distinct(Commission.appointment_id)).label("unique_appointments"),
-        func.sum(Commission.service_value).label("total_revenue"),
-        func.sum(Commission.commission_value).label("total_commission")
+        func.sum(CommissionRollup.service_count).label("total_services"),
+        func.sum(CommissionRollup.total_revenue).label("total_revenue"),
+        func.sum(CommissionRollup.total_commission).label("total_commission")
     ).filter(
-        Commission.professional_id == professional_id,
-        Commission.tenant_id == current_user.tenant_id
+        CommissionRollup.professional_id == professional_id,
+        CommissionRollup.tenant_id == current_user.tenant_id
     ).first()
 
     # Recent commissions
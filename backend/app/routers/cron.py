@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional
+import os
+from app.services import scheduler_service
+
+router = APIRouter(prefix="/cron", tags=["cron"])
+
+def verify_cron_secret(authorization: Optional[str]):
+    """Vercel Cron sends `Authorization: Bearer $CRON_SECRET`."""
+    secret = os.getenv("CRON_SECRET")
+    if not secret or authorization != f"Bearer {secret}":
+        raise HTTPException(status_code=401, detail="Invalid cron credentials")
+
+@router.get("/overdue-sweep")
+async def overdue_sweep(authorization: Optional[str] = Header(None)):
+    verify_cron_secret(authorization)
+    updated = await run_in_threadpool(scheduler_service.run_job, "overdue_sweep")
+    return {"status": "success", "updated": updated}
+
+@router.get("/webhook-outbox")
+async def dispatch_webhook_outbox(authorization: Optional[str] = Header(None)):
+    verify_cron_secret(authorization)
+    delivered = await run_in_threadpool(scheduler_service.run_job, "webhook_outbox")
+    return {"status": "success", "delivered": delivered}
+
+@router.get("/import-jobs")
+async def resume_import_jobs(authorization: Optional[str] = Header(None)):
+    verify_cron_secret(authorization)
+    resumed = await run_in_threadpool(scheduler_service.run_job, "import_jobs_resume")
+    return {"status": "success", "resumed": resumed}
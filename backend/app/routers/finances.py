@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from typing import List, Optional, Dict, Any
 import uuid
-from openpyxl import Workbook
+import base64
 from io import BytesIO
 from datetime import datetime, date
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
+from sqlalchemy import func, case, or_, and_, tuple_
 from app.database import get_db
 from app.deps import get_current_tenant_user
 from app.models.schemas import TokenData
@@ -71,63 +72,175 @@ class FinanceCategory(BaseModel):
         from_attributes = True
 
 
+# --- Listing: filters, keyset pagination and totals ---
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+def encode_finance_cursor(due_date: date, entry_id) -> str:
+    raw = f"{due_date.isoformat()}|{entry_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_finance_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        date_str, id_str = raw.split("|", 1)
+        return date.fromisoformat(date_str), uuid.UUID(id_str)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def finance_filters(
+    tenant_id,
+    tipo: Optional[str] = None,
+    status: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    categoria: Optional[str] = None,
+    customer_id: Optional[str] = None,
+    supplier_id: Optional[str] = None,
+    search: Optional[str] = None
+) -> list:
+    """SQL filters for the finance listing. 'atrasado' also covers pendente entries past due
+    that the scheduled sweep has not flipped yet, matching the status shown on read."""
+    today = date.today()
+    filters = [SQLFinanceEntry.tenant_id == tenant_id]
+    if tipo:
+        filters.append(SQLFinanceEntry.type == tipo)
+    if status == "atrasado":
+        filters.append(or_(
+            SQLFinanceEntry.status == "atrasado",
+            and_(SQLFinanceEntry.status == "pendente", SQLFinanceEntry.due_date < today)
+        ))
+    elif status == "pendente":
+        filters.append(and_(SQLFinanceEntry.status == "pendente", SQLFinanceEntry.due_date >= today))
+    elif status:
+        filters.append(SQLFinanceEntry.status == status)
+    if start_date:
+        filters.append(SQLFinanceEntry.due_date >= start_date)
+    if end_date:
+        filters.append(SQLFinanceEntry.due_date <= end_date)
+    if categoria:
+        filters.append(SQLFinanceEntry.category_id == categoria)
+    if customer_id:
+        filters.append(SQLFinanceEntry.customer_id == customer_id)
+    if supplier_id:
+        filters.append(SQLFinanceEntry.supplier_id == supplier_id)
+    if search:
+        pattern = f"%{search}%"
+        filters.append(or_(SQLFinanceEntry.description.ilike(pattern), SQLFinanceEntry.origin.ilike(pattern)))
+    return filters
+
+def _totals(rows) -> dict:
+    income = sum(float(e.amount or 0) for e in rows if e.type == "receita")
+    expense = sum(float(e.amount or 0) for e in rows if e.type == "despesa")
+    return {"income": round(income, 2), "expense": round(expense, 2), "balance": round(income - expense, 2), "count": len(rows)}
+
+def serialize_finance_entry(entry, cat_name, today: date) -> dict:
+    status = entry.status
+    if status == "pendente" and entry.due_date and entry.due_date < today:
+        status = "atrasado"
+    return {
+        "id": str(entry.id),
+        "data_vencimento": entry.due_date.isoformat() if entry.due_date else None,
+        "data_pagamento": None,
+        "data_competencia": entry.due_date.isoformat() if entry.due_date else None,
+        "descricao": entry.description,
+        "tipo": entry.type,
+        "valor": float(entry.amount) if entry.amount is not None else 0.0,
+        "status": status,
+        "origem": entry.origin,
+        "lead_id": str(entry.lead_id) if entry.lead_id else None,
+        "customer_id": str(entry.customer_id) if entry.customer_id else None,
+        "supplier_id": str(entry.supplier_id) if entry.supplier_id else None,
+        "service_id": str(entry.service_id) if entry.service_id else None,
+        "appointment_id": str(entry.appointment_id) if entry.appointment_id else None,
+        "categoria": str(entry.category_id) if entry.category_id else None,
+        "categoria_nome": cat_name,
+        "forma_pagamento": entry.payment_method,
+        "parcela": entry.installment_number,
+        "total_parcelas": entry.total_installments,
+        "observacoes": entry.observations,
+        "created_at": entry.created_at.isoformat() if entry.created_at else None
+    }
+
 # --- Endpoints ---
 
 @router.get("/finances")
-async def get_finances(
+def get_finances(
+    tipo: Optional[str] = None,
+    status: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    categoria: Optional[str] = None,
+    customer_id: Optional[str] = None,
+    supplier_id: Optional[str] = None,
+    search: Optional[str] = None,
+    sort: str = Query("due_date_desc", pattern="^due_date_(asc|desc)$"),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
+    """
+    Pure read: filtered, keyset-paginated on (due_date, id). `totals` covers every entry
+    matching the filters (computed in SQL); `page_totals` only the returned page.
+    """
+    filters = finance_filters(
+        current_user.tenant_id, tipo, status, start_date, end_date,
+        categoria, customer_id, supplier_id, search
+    )
+    descending = sort == "due_date_desc"
+    key = tuple_(SQLFinanceEntry.due_date, SQLFinanceEntry.id)
+
     # Join with categories to get names
     query = db.query(
         SQLFinanceEntry, 
         SQLFinanceCategory.name.label("category_name")
     ).outerjoin(
         SQLFinanceCategory, SQLFinanceEntry.category_id == SQLFinanceCategory.id
-    ).filter(
-        SQLFinanceEntry.tenant_id == current_user.tenant_id
-    ).order_by(SQLFinanceEntry.due_date.desc())
-    
-    entries_with_names = query.all()
-    
-    # Auto-update overdue statuses
+    ).filter(*filters)
+
+    if cursor:
+        cursor_key = tuple_(*decode_finance_cursor(cursor))
+        query = query.filter(key < cursor_key if descending else key > cursor_key)
+
+    if descending:
+        query = query.order_by(SQLFinanceEntry.due_date.desc(), SQLFinanceEntry.id.desc())
+    else:
+        query = query.order_by(SQLFinanceEntry.due_date.asc(), SQLFinanceEntry.id.asc())
+
+    entries_with_names = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(entries_with_names) > limit:
+        entries_with_names = entries_with_names[:limit]
+        last = entries_with_names[-1][0]
+        next_cursor = encode_finance_cursor(last.due_date, last.id)
+
+    # Totals for the whole filter, in one aggregate query
+    totals_row = db.query(
+        func.coalesce(func.sum(case((SQLFinanceEntry.type == "receita", SQLFinanceEntry.amount), else_=0)), 0).label("income"),
+        func.coalesce(func.sum(case((SQLFinanceEntry.type == "despesa", SQLFinanceEntry.amount), else_=0)), 0).label("expense"),
+        func.count(SQLFinanceEntry.id).label("count")
+    ).filter(*filters).one()
+    income = float(totals_row.income or 0)
+    expense = float(totals_row.expense or 0)
+
     today = date.today()
-    for entry, cat_name in entries_with_names:
-        if entry.status == "pendente" and entry.due_date and entry.due_date < today:
-            entry.status = "atrasado"
-    db.commit()
-    
-    result = []
-    for entry, cat_name in entries_with_names:
-        result.append({
-            "id": str(entry.id),
-            "data_vencimento": entry.due_date.isoformat() if entry.due_date else None,
-            "data_pagamento": None,
-            "data_competencia": entry.due_date.isoformat() if entry.due_date else None,
-            "descricao": entry.description,
-            "tipo": entry.type,
-            "valor": float(entry.amount) if entry.amount is not None else 0.0,
-            "status": entry.status,
-            "origem": entry.origin,
-            "lead_id": str(entry.lead_id) if entry.lead_id else None,
-            "customer_id": str(entry.customer_id) if entry.customer_id else None,
-            "supplier_id": str(entry.supplier_id) if entry.supplier_id else None,
-            "service_id": str(entry.service_id) if entry.service_id else None,
-            "appointment_id": str(entry.appointment_id) if entry.appointment_id else None,
-            "categoria": str(entry.category_id) if entry.category_id else None,
-            "categoria_nome": cat_name,
-            "forma_pagamento": entry.payment_method,
-            "parcela": entry.installment_number,
-            "total_parcelas": entry.total_installments,
-            "observacoes": entry.observations,
-            "created_at": entry.created_at.isoformat() if entry.created_at else None
-        })
-    
-    return result
+    return {
+        "items": [serialize_finance_entry(entry, cat_name, today) for entry, cat_name in entries_with_names],
+        "next_cursor": next_cursor,
+        "page_totals": _totals([entry for entry, _ in entries_with_names]),
+        "totals": {
+            "income": round(income, 2),
+            "expense": round(expense, 2),
+            "balance": round(income - expense, 2),
+            "count": totals_row.count
+        }
+    }
 
 
 @router.post("/finances")
-async def create_finance(
+def create_finance(
     entry: FinanceCreate,
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
@@ -189,7 +302,7 @@ async def create_finance(
 
 
 @router.put("/finances/{finance_id}")
-async def update_finance_status(
+def update_finance_status(
     finance_id: str,
     payload: Dict[str, Any],
     current_user: TokenData = Depends(get_current_tenant_user),
@@ -223,7 +336,7 @@ async def update_finance_status(
 
 
 @router.delete("/finances/{finance_id}")
-async def delete_finance(
+def delete_finance(
     finance_id: str,
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
@@ -245,7 +358,7 @@ async def delete_finance(
 # --- Categories CRUD ---
 
 @router.get("/categories")
-async def get_categories(
+def get_categories(
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
@@ -265,7 +378,7 @@ async def get_categories(
 
 
 @router.post("/categories")
-async def create_category(
+def create_category(
     cat: Dict[str, Any],
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
@@ -288,7 +401,7 @@ async def create_category(
 
 
 @router.put("/categories/{cat_id}")
-async def update_category(
+def update_category(
     cat_id: str,
     cat_in: Dict[str, Any],
     current_user: TokenData = Depends(get_current_tenant_user),
@@ -318,7 +431,7 @@ async def update_category(
 
 
 @router.delete("/categories/{cat_id}")
-async def delete_category(
+def delete_category(
     cat_id: str,
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
@@ -339,7 +452,7 @@ async def delete_category(
 
 # --- Payment Methods CRUD ---
 @router.get("/payment-methods")
-async def get_payment_methods(
+def get_payment_methods(
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
@@ -367,7 +480,7 @@ async def get_payment_methods(
 
 
 @router.post("/payment-methods")
-async def create_payment_method(
+def create_payment_method(
     payload: Dict[str, Any],
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
@@ -384,7 +497,7 @@ async def create_payment_method(
 
 
 @router.delete("/payment-methods/{method_id}")
-async def delete_payment_method(
+def delete_payment_method(
     method_id: str,
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
@@ -403,7 +516,7 @@ async def delete_payment_method(
 # --- Reports ---
 
 @router.get("/reports/cashflow")
-async def get_cashflow_report(
+def get_cashflow_report(
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
@@ -442,7 +555,7 @@ async def get_cashflow_report(
 
 
 @router.get("/export")
-async def export_finances(
+def export_finances(
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
@@ -450,6 +563,7 @@ async def export_finances(
         SQLFinanceEntry.tenant_id == current_user.tenant_id
     ).all()
     
+    from openpyxl import Workbook
     wb = Workbook()
     ws = wb.active
     ws.title = "Financeiro"
@@ -6,36 +6,34 @@ from datetime import datetime, date, timedelta
 from app.database import get_db
 from app.deps import get_current_tenant_user
 from app.models.schemas import TokenData
-from app.models.sql_models import FinanceEntry, Customer, Supplier, FinanceCategory
+from app.models.sql_models import FinanceEntry, FinanceRollup, Customer, Supplier, FinanceCategory
+from app.services.finance_rollup_service import period_filter, day_filter
 
 router = APIRouter(prefix="/tenant/financial-reports", tags=["financial_reports"])
 
 @router.get("/customers")
-async def get_customer_report(
+def get_customer_report(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
     tenant_id = current_user.tenant_id
+    R = FinanceRollup
     
-    # Base query for receivables
-    query = db.query(
+    # Receivables, read from the pre-aggregated rollups
+    results = db.query(
         Customer.id,
         Customer.name,
-        func.sum(case((FinanceEntry.status == 'pago', FinanceEntry.amount), else_=0)).label('total_paid'),
-        func.sum(case((FinanceEntry.status == 'pendente', FinanceEntry.amount), else_=0)).label('total_open'),
-        func.sum(case((FinanceEntry.status == 'atrasado', FinanceEntry.amount), else_=0)).label('total_overdue'),
-        func.count(FinanceEntry.id).label('total_transactions')
-    ).join(FinanceEntry, FinanceEntry.customer_id == Customer.id)\
-     .filter(FinanceEntry.tenant_id == tenant_id, FinanceEntry.type == 'receita')
-    
-    if start_date:
-        query = query.filter(FinanceEntry.due_date >= start_date)
-    if end_date:
-        query = query.filter(FinanceEntry.due_date <= end_date)
-        
-    results = query.group_by(Customer.id, Customer.name).order_by(desc('total_paid')).all()
+        func.sum(case((R.status == 'pago', R.total_amount), else_=0)).label('total_paid'),
+        func.sum(case((R.status == 'pendente', R.total_amount), else_=0)).label('total_open'),
+        func.sum(case((R.status == 'atrasado', R.total_amount), else_=0)).label('total_overdue'),
+        func.sum(R.entry_count).label('total_transactions')
+    ).join(R, R.customer_id == Customer.id)\
+     .filter(R.tenant_id == tenant_id, R.type == 'receita', period_filter(start_date, end_date))\
+     .group_by(Customer.id, Customer.name)\
+     .having(func.sum(R.entry_count) > 0)\
+     .order_by(desc('total_paid')).all()
     
     return [
         {
@@ -50,28 +48,25 @@ async def get_customer_report(
     ]
 
 @router.get("/suppliers")
-async def get_supplier_report(
+def get_supplier_report(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
     tenant_id = current_user.tenant_id
+    R = FinanceRollup
     
-    query = db.query(
+    results = db.query(
         Supplier.id,
         Supplier.name,
-        func.sum(case((FinanceEntry.status == 'pago', FinanceEntry.amount), else_=0)).label('total_paid'),
-        func.sum(case((FinanceEntry.status != 'pago', FinanceEntry.amount), else_=0)).label('total_open')
-    ).join(FinanceEntry, FinanceEntry.supplier_id == Supplier.id)\
-     .filter(FinanceEntry.tenant_id == tenant_id, FinanceEntry.type == 'despesa')
-    
-    if start_date:
-        query = query.filter(FinanceEntry.due_date >= start_date)
-    if end_date:
-        query = query.filter(FinanceEntry.due_date <= end_date)
-        
-    results = query.group_by(Supplier.id, Supplier.name).order_by(desc('total_paid')).all()
+        func.sum(case((R.status == 'pago', R.total_amount), else_=0)).label('total_paid'),
+        func.sum(case((R.status != 'pago', R.total_amount), else_=0)).label('total_open')
+    ).join(R, R.supplier_id == Supplier.id)\
+     .filter(R.tenant_id == tenant_id, R.type == 'despesa', period_filter(start_date, end_date))\
+     .group_by(Supplier.id, Supplier.name)\
+     .having(func.sum(R.entry_count) > 0)\
+     .order_by(desc('total_paid')).all()
     
     return [
         {
@@ -84,31 +79,28 @@ async def get_supplier_report(
     ]
 
 @router.get("/cash-flow")
-async def get_cash_flow_report(
+def get_cash_flow_report(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
     tenant_id = current_user.tenant_id
-    
-    # Daily aggregation
-    query = db.query(
-        FinanceEntry.due_date,
-        func.sum(case((FinanceEntry.type == 'receita', FinanceEntry.amount), else_=0)).label('income'),
-        func.sum(case((FinanceEntry.type == 'despesa', FinanceEntry.amount), else_=0)).label('expense')
-    ).filter(FinanceEntry.tenant_id == tenant_id, FinanceEntry.status == 'pago')
-    
-    if start_date:
-        query = query.filter(FinanceEntry.due_date >= start_date)
-    if end_date:
-        query = query.filter(FinanceEntry.due_date <= end_date)
-        
-    results = query.group_by(FinanceEntry.due_date).order_by(FinanceEntry.due_date).all()
+    R = FinanceRollup
+    
+    # Daily aggregation (daily grain of the rollups)
+    results = db.query(
+        R.period_start,
+        func.sum(case((R.type == 'receita', R.total_amount), else_=0)).label('income'),
+        func.sum(case((R.type == 'despesa', R.total_amount), else_=0)).label('expense')
+    ).filter(R.tenant_id == tenant_id, R.status == 'pago', day_filter(start_date, end_date))\
+     .group_by(R.period_start)\
+     .having(func.sum(R.entry_count) > 0)\
+     .order_by(R.period_start).all()
     
     return [
         {
-            "date": r.due_date.isoformat(),
+            "date": r.period_start.isoformat(),
             "income": float(r.income or 0),
             "expense": float(r.expense or 0),
             "net": float((r.income or 0) - (r.expense or 0))
@@ -117,35 +109,32 @@ async def get_cash_flow_report(
     ]
 
 @router.get("/pnl")
-async def get_pnl_report(
+def get_pnl_report(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
     tenant_id = current_user.tenant_id
+    R = FinanceRollup
+    period = period_filter(start_date, end_date)
     
     # Revenue
-    revenue = db.query(func.sum(FinanceEntry.amount)).filter(
-        FinanceEntry.tenant_id == tenant_id,
-        FinanceEntry.type == 'receita',
-        FinanceEntry.status == 'pago'
-    )
-    if start_date: revenue = revenue.filter(FinanceEntry.due_date >= start_date)
-    if end_date: revenue = revenue.filter(FinanceEntry.due_date <= end_date)
-    total_revenue = revenue.scalar() or 0.0
+    total_revenue = db.query(func.sum(R.total_amount)).filter(
+        R.tenant_id == tenant_id,
+        R.type == 'receita',
+        R.status == 'pago',
+        period
+    ).scalar() or 0.0
 
     # Expenses by category
-    expenses_query = db.query(
+    expenses_by_category = db.query(
         FinanceCategory.name,
-        func.sum(FinanceEntry.amount).label('total')
-    ).join(FinanceEntry, FinanceEntry.category_id == FinanceCategory.id)\
-     .filter(FinanceEntry.tenant_id == tenant_id, FinanceEntry.type == 'despesa', FinanceEntry.status == 'pago')
-     
-    if start_date: expenses_query = expenses_query.filter(FinanceEntry.due_date >= start_date)
-    if end_date: expenses_query = expenses_query.filter(FinanceEntry.due_date <= end_date)
-    
-    expenses_by_category = expenses_query.group_by(FinanceCategory.name).all()
+        func.sum(R.total_amount).label('total')
+    ).join(R, R.category_id == FinanceCategory.id)\
+     .filter(R.tenant_id == tenant_id, R.type == 'despesa', R.status == 'pago', period)\
+     .group_by(FinanceCategory.name)\
+     .having(func.sum(R.entry_count) > 0).all()
     
     total_expenses = sum([r.total for r in expenses_by_category]) or 0.0
     
@@ -157,7 +146,7 @@ async def get_pnl_report(
     }
 
 @router.get("/aging")
-async def get_aging_report(
+def get_aging_report(
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
@@ -0,0 +1,51 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.deps import get_current_tenant_user
+from app.models.schemas import TokenData
+from app.models.sql_models import ImportJob
+from app.services import import_job_service
+
+router = APIRouter(prefix="/tenant/imports", tags=["imports"])
+
+def _get_job(db: Session, job_id: str, tenant_id) -> ImportJob:
+    job = db.query(ImportJob).filter(ImportJob.id == job_id, ImportJob.tenant_id == tenant_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Importação não encontrada")
+    return job
+
+@router.get("")
+def list_imports(
+    limit: int = 20,
+    current_user: TokenData = Depends(get_current_tenant_user),
+    db: Session = Depends(get_db)
+):
+    jobs = db.query(ImportJob).filter(ImportJob.tenant_id == current_user.tenant_id)\
+        .order_by(ImportJob.created_at.desc()).limit(min(max(limit, 1), 100)).all()
+    return [import_job_service.serialize_job(job) for job in jobs]
+
+@router.get("/{job_id}")
+def get_import(
+    job_id: str,
+    current_user: TokenData = Depends(get_current_tenant_user),
+    db: Session = Depends(get_db)
+):
+    """Progress of an import job: processed/total rows, counters and per-row errors."""
+    return import_job_service.serialize_job(_get_job(db, job_id, current_user.tenant_id))
+
+@router.post("/{job_id}/resume", status_code=202)
+def resume_import(
+    job_id: str,
+    background_tasks: BackgroundTasks,
+    current_user: TokenData = Depends(get_current_tenant_user),
+    db: Session = Depends(get_db)
+):
+    """Restarts a failed or stalled job after its last committed chunk."""
+    job = _get_job(db, job_id, current_user.tenant_id)
+    if job.status == "completed":
+        raise HTTPException(status_code=400, detail="Importação já concluída")
+    if job.status == "running" and not import_job_service.is_stale(job):
+        raise HTTPException(status_code=409, detail="Importação em andamento")
+
+    background_tasks.add_task(import_job_service.run_job, job.id, True)
+    return import_job_service.serialize_job(job)
@@ -10,15 +10,15 @@ from app.deps import get_current_master
 from app.models.schemas import Environment, TokenData, EnvironmentUpdate
 from app.models.sql_models import Tenant, User, Niche
 from app.services.auth_service import get_password_hash
-from app.services import storage_service
+from app.services import storage_service, tenant_service
 
 from datetime import datetime
-from fpdf import FPDF
 from fastapi.responses import FileResponse, RedirectResponse
 
 router = APIRouter(prefix="/master", tags=["master"])
 
 def generate_environment_contract_pdf(env_data: dict) -> str:
+    from fpdf import FPDF
     pdf = FPDF()
     pdf.add_page()
     
@@ -215,7 +215,7 @@ def generate_environment_contract_pdf(env_data: dict) -> str:
         return filepath
 
 @router.get("/ambientes/{slug}/contract")
-async def get_environment_contract(slug: str, db: Session = Depends(get_db), current_user: TokenData = Depends(get_current_master)):
+def get_environment_contract(slug: str, db: Session = Depends(get_db), current_user: TokenData = Depends(get_current_master)):
     tenant = db.query(Tenant).filter(Tenant.slug == slug).first()
     
     if not tenant:
@@ -252,7 +252,7 @@ async def get_environment_contract(slug: str, db: Session = Depends(get_db), cur
     return FileResponse(pdf_path, filename=download_name)
 
 @router.get("/ambientes", response_model=List[Environment])
-async def get_ambientes(db: Session = Depends(get_db), current_user: TokenData = Depends(get_current_master)):
+def get_ambientes(db: Session = Depends(get_db), current_user: TokenData = Depends(get_current_master)):
     tenants = db.query(Tenant).all()
     valid_ambientes = []
     for t in tenants:
@@ -288,7 +288,7 @@ async def get_ambientes(db: Session = Depends(get_db), current_user: TokenData =
     return valid_ambientes
 
 @router.post("/ambientes", response_model=Environment)
-async def create_ambiente(
+def create_ambiente(
     nome_empresa: str = Form(...),
     slug: str = Form(...),
     cnpj: Optional[str] = Form(None),
@@ -457,7 +457,7 @@ async def create_ambiente(
     )
 
 @router.put("/ambientes/{slug}", response_model=Environment)
-async def update_ambiente(
+def update_ambiente(
     slug: str,
     nome_empresa: Optional[str] = Form(None),
     cnpj: Optional[str] = Form(None),
@@ -556,7 +556,9 @@ async def update_ambiente(
             raise HTTPException(status_code=400, detail="Não é possível ativar o ambiente sem um contrato assinado.")
         tenant.active = is_active
 
+    tenant_id = tenant.id
     db.commit()
+    tenant_service.invalidate_tenant(db, tenant_id=tenant_id, slug=slug)
     db.refresh(tenant)
     
     return Environment(
@@ -583,11 +585,45 @@ async def update_ambiente(
     )
 
 @router.delete("/ambientes/{slug}")
-async def delete_ambiente(slug: str, db: Session = Depends(get_db), current_user: TokenData = Depends(get_current_master)):
+def delete_ambiente(slug: str, db: Session = Depends(get_db), current_user: TokenData = Depends(get_current_master)):
     tenant = db.query(Tenant).filter(Tenant.slug == slug).first()
     if not tenant:
         raise HTTPException(status_code=404, detail="Environment not found")
     
+    tenant_id = tenant.id
     db.delete(tenant)
     db.commit()
+    tenant_service.invalidate_tenant(db, tenant_id=tenant_id, slug=slug)
     return {"message": f"Ambiente '{tenant.name}' excluído"}
+
+@router.get("/system/db-pool")
+def get_db_pool_stats(current_user: TokenData = Depends(get_current_master)):
+    from app.database import pool_stats
+    return {"pools": pool_stats()}
+
+@router.get("/system/slow-queries")
+def get_slow_queries(limit: int = 50, current_user: TokenData = Depends(get_current_master)):
+    from app.services import slow_query_service
+    return {
+        "threshold_ms": slow_query_service.SLOW_QUERY_MS,
+        "explain": slow_query_service.SLOW_QUERY_EXPLAIN,
+        "queries": slow_query_service.entries(limit)
+    }
+
+@router.delete("/system/slow-queries")
+def clear_slow_queries(current_user: TokenData = Depends(get_current_master)):
+    from app.services import slow_query_service
+    slow_query_service.clear()
+    return {"message": "Log de queries lentas limpo"}
+
+@router.get("/system/caches")
+def get_cache_stats(current_user: TokenData = Depends(get_current_master)):
+    from app.deps import token_cache
+    from app.services.dashboard_service import dashboard_cache
+    from app.services.outbox_service import automation_index
+    return {
+        "tenants": tenant_service.tenant_cache.stats(),
+        "tokens": token_cache.stats(),
+        "dashboard": dashboard_cache.stats(),
+        "automations": automation_index.stats()
+    }
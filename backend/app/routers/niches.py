@@ -5,15 +5,16 @@ from app.models.schemas import Niche, NicheCreate
 from app.models.sql_models import Niche as NicheModel
 from app.database import get_db
 from app.deps import get_current_master
+from app.services import tenant_service
 
 router = APIRouter(prefix="/niches", tags=["niches"])
 
 @router.get("/", response_model=List[Niche])
-async def get_niches(db: Session = Depends(get_db)):
+def get_niches(db: Session = Depends(get_db)):
     return db.query(NicheModel).all()
 
 @router.post("/", response_model=Niche)
-async def create_niche(niche_in: NicheCreate, db: Session = Depends(get_db), current_user = Depends(get_current_master)):
+def create_niche(niche_in: NicheCreate, db: Session = Depends(get_db), current_user = Depends(get_current_master)):
     if db.query(NicheModel).filter(NicheModel.name.ilike(niche_in.name)).first():
         raise HTTPException(status_code=400, detail="Niche name already exists")
     
@@ -27,7 +28,7 @@ async def create_niche(niche_in: NicheCreate, db: Session = Depends(get_db), cur
     return new_niche
 
 @router.put("/{niche_id}", response_model=Niche)
-async def update_niche(niche_id: str, niche_in: NicheCreate, db: Session = Depends(get_db), current_user = Depends(get_current_master)):
+def update_niche(niche_id: str, niche_in: NicheCreate, db: Session = Depends(get_db), current_user = Depends(get_current_master)):
     db_niche = db.query(NicheModel).filter(NicheModel.id == niche_id).first()
     if not db_niche:
         raise HTTPException(status_code=404, detail="Niche not found")
@@ -36,15 +37,18 @@ async def update_niche(niche_id: str, niche_in: NicheCreate, db: Session = Depen
     db_niche.description = niche_in.description
     
     db.commit()
+    # Tenant snapshots carry the niche name
+    tenant_service.invalidate_all(db)
     db.refresh(db_niche)
     return db_niche
 
 @router.delete("/{niche_id}")
-async def delete_niche(niche_id: str, db: Session = Depends(get_db), current_user = Depends(get_current_master)):
+def delete_niche(niche_id: str, db: Session = Depends(get_db), current_user = Depends(get_current_master)):
     db_niche = db.query(NicheModel).filter(NicheModel.id == niche_id).first()
     if not db_niche:
         raise HTTPException(status_code=404, detail="Niche not found")
     
     db.delete(db_niche)
     db.commit()
+    tenant_service.invalidate_all(db)
     return {"message": "Niche deleted successfully"}
@@ -10,7 +10,7 @@ from sqlalchemy import desc
 router = APIRouter(prefix="/tenant/notifications", tags=["notifications"])
 
 @router.get("/", response_model=List[NotificationSchema])
-async def get_notifications(
+def get_notifications(
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
@@ -21,7 +21,7 @@ async def get_notifications(
     return notifications
 
 @router.get("/unread-count")
-async def get_unread_count(
+def get_unread_count(
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
@@ -33,7 +33,7 @@ async def get_unread_count(
     return {"count": count}
 
 @router.post("/{notification_id}/read")
-async def mark_as_read(
+def mark_as_read(
     notification_id: str,
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
@@ -52,7 +52,7 @@ async def mark_as_read(
     return {"message": "Success"}
 
 @router.post("/read-all")
-async def mark_all_as_read(
+def mark_all_as_read(
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
@@ -65,7 +65,7 @@ async def mark_all_as_read(
     return {"message": "Success"}
 
 @router.post("/push-subscribe")
-async def subscribe_push(
+def subscribe_push(
     subscription: dict,
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
@@ -1,7 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File
 from fastapi.responses import FileResponse, StreamingResponse
 from typing import List, Optional, Dict, Any
-from openpyxl import Workbook, load_workbook
 from io import BytesIO
 from datetime import datetime
 from pydantic import BaseModel
@@ -10,6 +9,8 @@ from app.database import get_db
 from app.deps import get_current_tenant_user
 from app.models.schemas import TokenData
 from app.models.sql_models import Product as SQLProduct
+from app.services import import_file_service, import_job_service
+from app.services.product_import_service import clean_price, map_product_columns
 
 router = APIRouter(prefix="/tenant", tags=["products"])
 
@@ -29,19 +30,8 @@ class Product(BaseModel):
     class Config:
         from_attributes = True
 
-def clean_price(val):
-    if val is None: return 0.0
-    if isinstance(val, (int, float)): return float(val)
-    if isinstance(val, str):
-        clean = val.replace("R$", "").replace(" ", "").replace(".", "").replace(",", ".")
-        try:
-            return float(clean)
-        except:
-            return 0.0
-    return 0.0
-
 @router.get("/products", response_model=List[Product])
-async def get_products(
+def get_products(
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
@@ -67,7 +57,7 @@ async def get_products(
     return result
 
 @router.post("/products", response_model=Product)
-async def create_product(
+def create_product(
     product: Product,
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
@@ -111,7 +101,7 @@ async def create_product(
     )
 
 @router.put("/products/{product_id}", response_model=Product)
-async def update_product(
+def update_product(
     product_id: str,
     product_in: Dict[str, Any],
     current_user: TokenData = Depends(get_current_tenant_user),
@@ -159,7 +149,7 @@ async def update_product(
     )
 
 @router.delete("/products/{product_id}")
-async def delete_product(
+def delete_product(
     product_id: str,
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
@@ -178,7 +168,7 @@ async def delete_product(
     return {"message": "Product deactivated successfully"}
 
 @router.get("/products/template")
-async def get_product_template(
+def get_product_template(
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
@@ -186,6 +176,7 @@ async def get_product_template(
         SQLProduct.tenant_id == current_user.tenant_id
     ).all()
     
+    from openpyxl import Workbook
     wb = Workbook()
     ws = wb.active
     ws.title = "Produtos"
@@ -217,142 +208,26 @@ async def get_product_template(
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
-@router.post("/products/import")
-async def import_products(
+@router.post("/products/import", status_code=202)
+def import_products(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
-    if not file.filename.endswith(('.xlsx', '.xls')):
-        raise HTTPException(status_code=400, detail="File must be Excel")
-        
-    try:
-        contents = await file.read()
-        wb = load_workbook(BytesIO(contents), data_only=True)
-        ws = wb.active
-        
-        # Get headers
-        headers = [str(cell.value).lower().strip() for cell in ws[1] if cell.value is not None]
-        
-        mapping = {
-            "sku": ["código", "codigo", "code", "id", "sku"],
-            "name": ["nome", "name", "produto", "serviço", "servico"],
-            "description": ["descrição", "descricao", "description", "obs"],
-            "price": ["preço unitário", "preco unitario", "preço", "valor", "price"],
-            "status": ["status", "ativo", "situacao"],
-            "type": ["tipo", "type", "categoria"],
-            "duration": ["duração", "duracao", "duration", "duração (min)"]
-        }
-        
-        def find_col_idx(possible_names):
-            for idx, h in enumerate(headers):
-                if h in possible_names:
-                    return idx
-            return None
-
-        col_mapping = {key: find_col_idx(standards) for key, standards in mapping.items()}
-        
-        if col_mapping["name"] is None and col_mapping["sku"] is None:
-            raise HTTPException(status_code=400, detail="Column 'Nome' or 'Código' not found in Excel")
+    """Queues the import; poll GET /tenant/imports/{job_id} for progress."""
+    if not import_file_service.is_supported(file.filename):
+        raise HTTPException(status_code=400, detail="File must be Excel (.xlsx) or CSV")
 
-        stats = {"created": 0, "updated": 0, "errors": 0}
-        
-        # Skip header row
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            try:
-                name = ""
-                if col_mapping["name"] is not None:
-                    val = row[col_mapping["name"]]
-                    name = str(val).strip() if val is not None else ""
-                
-                sku = ""
-                if col_mapping["sku"] is not None:
-                    val_sku = row[col_mapping["sku"]]
-                    sku = str(val_sku).strip() if val_sku is not None else ""
-                    
-                if not name and sku:
-                    name = sku
-                
-                if not name: continue
-                
-                existing = None
-                if sku:
-                    existing = db.query(SQLProduct).filter(
-                        SQLProduct.tenant_id == current_user.tenant_id,
-                        SQLProduct.sku == sku
-                    ).first()
-                
-                if not existing:
-                    existing = db.query(SQLProduct).filter(
-                        SQLProduct.tenant_id == current_user.tenant_id,
-                        SQLProduct.name == name
-                    ).first()
-                
-                price = 0.0
-                if col_mapping["price"] is not None:
-                    val_price = row[col_mapping["price"]]
-                    if val_price is not None:
-                        price = clean_price(val_price)
-                
-                description = ""
-                if col_mapping["description"] is not None:
-                    val_desc = row[col_mapping["description"]]
-                    description = str(val_desc) if val_desc is not None else ""
-                
-                active = True
-                if col_mapping["status"] is not None:
-                    val_stat = row[col_mapping["status"]]
-                    status_val = str(val_stat).lower() if val_stat is not None else ""
-                    active = status_val in ["active", "ativo", "ativa", "sim", "yes", "true", "1"]
-
-                p_type = "product"
-                if col_mapping["type"] is not None:
-                    val_type = str(row[col_mapping["type"]]).lower() if row[col_mapping["type"]] is not None else ""
-                    if "serv" in val_type:
-                        p_type = "service"
-
-                duration = 30
-                if col_mapping["duration"] is not None:
-                    try:
-                        val_dur = row[col_mapping["duration"]]
-                        if val_dur is not None:
-                            duration = int(float(val_dur))
-                    except: pass
-                
-                if existing:
-                    if sku: existing.sku = sku
-                    existing.name = name
-                    existing.description = description
-                    existing.price = price
-                    existing.active = active
-                    existing.type = p_type
-                    existing.duration_minutes = duration
-                    stats["updated"] += 1
-                else:
-                    new_product = SQLProduct(
-                        tenant_id=current_user.tenant_id,
-                        sku=sku,
-                        name=name,
-                        description=description,
-                        price=price,
-                        active=active,
-                        type=p_type,
-                        duration_minutes=duration
-                    )
-                    db.add(new_product)
-                    stats["created"] += 1
-                    
-            except Exception as e:
-                print(f"Error importing row: {e}")
-                stats["errors"] += 1
-                
-        db.commit()
-        
-        return {
-            "message": "Product import finished",
-            "created": stats["created"],
-            "updated": stats["updated"],
-            "errors": stats["errors"]
-        }
+    # Fail fast on a sheet without the key columns instead of queuing it
+    try:
+        header_row = next(import_file_service.iter_rows(file.file, file.filename), None) or ()
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    col_mapping = map_product_columns(header_row)
+    if col_mapping["name"] is None and col_mapping["sku"] is None:
+        raise HTTPException(status_code=400, detail="Column 'Nome' or 'Código' not found in Excel")
+
+    job = import_job_service.create_job(db, current_user.tenant_id, current_user.tenant_slug, "products", file, current_user.email)
+    background_tasks.add_task(import_job_service.run_job, job.id)
+    return import_job_service.serialize_job(job)
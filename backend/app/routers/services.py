@@ -9,7 +9,7 @@ from app.models.sql_models import Product as SQLProduct
 router = APIRouter(prefix="/tenant/services", tags=["services"])
 
 @router.get("/", response_model=List[ServiceSchema])
-async def get_services(
+def get_services(
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
@@ -37,13 +37,13 @@ async def get_services(
             "active": p.active,
             "tenant_id": p.tenant_id,
             "created_at": p.created_at,
-            "updated_at": p.created_at # approximation
+            "updated_at": p.updated_at or p.created_at
         })
         
     return services
 
 @router.post("/", response_model=ServiceSchema)
-async def create_service(
+def create_service(
     service_in: ServiceCreate,
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
@@ -85,12 +85,12 @@ async def create_service(
         "active": new_product.active,
         "tenant_id": new_product.tenant_id,
         "created_at": new_product.created_at,
-        "updated_at": new_product.created_at
+        "updated_at": new_product.updated_at or new_product.created_at
     }
 
 # Update and Delete endpoints should also target SQLProduct
 @router.put("/{service_id}", response_model=ServiceSchema)
-async def update_service(
+def update_service(
     service_id: str,
     service_in: ServiceCreate,
     current_user: TokenData = Depends(get_current_tenant_user),
@@ -123,11 +123,11 @@ async def update_service(
         "active": product.active,
         "tenant_id": product.tenant_id,
         "created_at": product.created_at,
-        "updated_at": product.created_at
+        "updated_at": product.updated_at or product.created_at
     }
 
 @router.delete("/{service_id}")
-async def delete_service(
+def delete_service(
     service_id: str,
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
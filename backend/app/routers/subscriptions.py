@@ -5,7 +5,6 @@ import uuid
 import os
 from datetime import datetime, date, timedelta
 from pydantic import BaseModel
-from fpdf import FPDF
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.deps import get_current_tenant_user
@@ -91,6 +90,7 @@ def generate_contract_pdf(db: Session, tenant_id: uuid.UUID, sub_data: Dict[str,
     customer_doc = customer.document if customer else "---"
     customer_addr = customer.address if customer else "---"
 
+    from fpdf import FPDF
     pdf = FPDF()
     pdf.add_page()
     
@@ -160,12 +160,12 @@ def map_plan_to_schema(plan: SQLPlan) -> Dict[str, Any]:
 # --- Endpoints ---
 
 @router.get("/plans", response_model=List[PlanSchema])
-async def get_plans(current_user: TokenData = Depends(get_current_tenant_user), db: Session = Depends(get_db)):
+def get_plans(current_user: TokenData = Depends(get_current_tenant_user), db: Session = Depends(get_db)):
     plans = db.query(SQLPlan).filter(SQLPlan.tenant_id == current_user.tenant_id).all()
     return [map_plan_to_schema(p) for p in plans]
 
 @router.post("/plans", response_model=PlanSchema)
-async def create_plan(plan_in: PlanSchema, current_user: TokenData = Depends(get_current_tenant_user), db: Session = Depends(get_db)):
+def create_plan(plan_in: PlanSchema, current_user: TokenData = Depends(get_current_tenant_user), db: Session = Depends(get_db)):
     new_plan = SQLPlan(
         tenant_id=current_user.tenant_id,
         name=plan_in.nome,
@@ -190,7 +190,7 @@ async def create_plan(plan_in: PlanSchema, current_user: TokenData = Depends(get
     return map_plan_to_schema(new_plan)
 
 @router.get("/subscriptions", response_model=List[SubscriptionSchema])
-async def get_subscriptions(current_user: TokenData = Depends(get_current_tenant_user), db: Session = Depends(get_db)):
+def get_subscriptions(current_user: TokenData = Depends(get_current_tenant_user), db: Session = Depends(get_db)):
     subs = db.query(SQLSubscription).filter(SQLSubscription.tenant_id == current_user.tenant_id).all()
     # Mapping to schema
     result = []
@@ -212,7 +212,7 @@ async def get_subscriptions(current_user: TokenData = Depends(get_current_tenant
     return result
 
 @router.post("/subscriptions")
-async def create_subscription(sub_in: SubscriptionSchema, current_user: TokenData = Depends(get_current_tenant_user), db: Session = Depends(get_db)):
+def create_subscription(sub_in: SubscriptionSchema, current_user: TokenData = Depends(get_current_tenant_user), db: Session = Depends(get_db)):
     plan = db.query(SQLPlan).filter(SQLPlan.id == sub_in.plano_id).first()
     if not plan: raise HTTPException(status_code=404, detail="Plano não encontrado")
     
@@ -263,7 +263,7 @@ async def create_subscription(sub_in: SubscriptionSchema, current_user: TokenDat
     return {"id": str(sub_id), "contract_url": pdf_url}
 
 @router.put("/subscriptions/{sub_id}")
-async def update_subscription(
+def update_subscription(
     sub_id: str, 
     data: SubscriptionUpdateSchema, 
     current_user: TokenData = Depends(get_current_tenant_user), 
@@ -305,15 +305,27 @@ async def update_subscription(
     return {"status": "success", "sub_id": str(sub.id)}
 
 @router.put("/subscriptions/{sub_id}/sign")
-async def sign_subscription(sub_id: str, current_user: TokenData = Depends(get_current_tenant_user), db: Session = Depends(get_db)):
+def sign_subscription(sub_id: str, background_tasks: BackgroundTasks, current_user: TokenData = Depends(get_current_tenant_user), db: Session = Depends(get_db)):
     sub = db.query(SQLSubscription).filter(SQLSubscription.id == sub_id, SQLSubscription.tenant_id == current_user.tenant_id).first()
     if not sub: raise HTTPException(status_code=404)
     sub.status = "Ativa"
+
+    from app.services import outbox_service
+    queued = outbox_service.enqueue(db, current_user.tenant_id, "subscription_signed", {
+        "subscription_id": str(sub.id),
+        "customer_id": str(sub.customer_id) if sub.customer_id else None,
+        "plan_id": str(sub.plan_id) if sub.plan_id else None,
+        "professional_id": str(sub.professional_id) if sub.professional_id else None,
+        "price": float(sub.price or 0),
+        "periodicity": sub.periodicity
+    })
     db.commit()
+    if queued:
+        background_tasks.add_task(outbox_service.dispatch_pending, current_user.tenant_id)
     return {"status": "Ativa"}
 
 @router.get("/subscriptions/{sub_id}/contract")
-async def get_contract_file(
+def get_contract_file(
     sub_id: str, 
     token: Optional[str] = None,
     current_user: TokenData = Depends(get_current_tenant_user), 
@@ -6,7 +6,8 @@ from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
 from app.database import get_db
-from app.deps import get_current_tenant_user, get_current_master
+from app.services import dashboard_service, import_file_service, import_job_service
+from app.deps import get_current_tenant_user, get_current_master, get_current_principal, Principal
 from app.models.schemas import Lead, LeadCreate, DashboardStats, DashboardSummary, TokenData, LeadHistory, LeadTask, Customer, CustomerCreate, TenantAdminStats
 from app.models.sql_models import (
     Lead as SQLLead, 
@@ -74,12 +75,13 @@ def sync_customer_from_lead(db: Session, tenant_id: uuid.UUID, lead: SQLLead):
 # --- ENDPOINTS ---
 
 @router.get("/niche-config")
-async def get_niche_config(
+def get_niche_config(
+    principal: Principal = Depends(get_current_principal),
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
     """Get niche configuration including pipeline stages for tenant's environment."""
-    tenant = db.query(SQLTenant).filter(SQLTenant.id == current_user.tenant_id).first()
+    tenant = principal.tenant
     if not tenant:
         return {"pipeline_stages": ["Novo", "Em Contato", "Agendado"]}
 
@@ -91,23 +93,23 @@ async def get_niche_config(
     
     if stages:
         return {
-            "niche_name": tenant.niche.name if tenant.niche else "Custom",
+            "niche_name": tenant.niche_name if tenant.niche_id else "Custom",
             "pipeline_stages": [s.name for s in stages]
         }
 
     # 2. Fallback to Niche Default if exists
-    if tenant.niche:
+    if tenant.niche_id:
         # Default stages for niche could be another table, 
         # but for now we'll return a static default or common ones
         return {
-            "niche_name": tenant.niche.name,
+            "niche_name": tenant.niche_name,
             "pipeline_stages": ["Novo", "Em Contato", "Agendado"]
         }
     
     return {"pipeline_stages": ["Novo", "Em Contato", "Agendado"]}
 
 @router.post("/pipeline-stages")
-async def save_pipeline_stages(
+def save_pipeline_stages(
     data: Dict[str, Any], 
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
@@ -133,7 +135,7 @@ async def save_pipeline_stages(
     return {"status": "success", "stages": stages_names}
 
 @router.get("/leads", response_model=List[Lead])
-async def get_leads(
+def get_leads(
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
@@ -141,7 +143,7 @@ async def get_leads(
     return leads
 
 @router.post("/leads", response_model=Lead)
-async def create_lead(
+def create_lead(
     lead_in: Dict[str, Any], 
     background_tasks: BackgroundTasks,
     current_user: TokenData = Depends(get_current_tenant_user),
@@ -182,6 +184,16 @@ async def create_lead(
         link_url="/pipeline"
     )
     db.add(notification)
+
+    # Automations: outbox rows commit with the lead, delivered after the response
+    from app.services import outbox_service
+    queued = outbox_service.enqueue(db, current_user.tenant_id, "lead_created", {
+        "lead_id": str(new_lead.id),
+        "name": new_lead.name,
+        "email": new_lead.email,
+        "phone": new_lead.phone,
+        "value": float(new_lead.value)
+    })
     
     db.commit()
     db.refresh(new_lead)
@@ -189,22 +201,13 @@ async def create_lead(
     # Sync with customers
     sync_customer_from_lead(db, current_user.tenant_id, new_lead)
     
-    # Trigger Automations (Background)
-    from app.services.automation_service import AutomationService
-    # Use background_tasks instead of create_task to avoid session closing issues
-    payload = {
-        "lead_id": str(new_lead.id),
-        "name": new_lead.name,
-        "email": new_lead.email,
-        "phone": new_lead.phone,
-        "value": float(new_lead.value)
-    }
-    background_tasks.add_task(AutomationService.trigger_automations, current_user.tenant_id, "lead_created", payload)
+    if queued:
+        background_tasks.add_task(outbox_service.dispatch_pending, current_user.tenant_id)
     
     return new_lead
 
 @router.put("/leads/{lead_id}", response_model=Lead)
-async def update_lead(
+def update_lead(
     lead_id: str, 
     lead_update: Dict[str, Any], 
     current_user: TokenData = Depends(get_current_tenant_user),
@@ -262,127 +265,30 @@ async def update_lead(
     return lead
 
 @router.get("/stats", response_model=DashboardStats)
-async def get_stats(
+def get_stats(
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
-    tenant_id = current_user.tenant_id
-    
-    total_leads = db.query(SQLLead).filter(SQLLead.tenant_id == tenant_id).count()
-    active_leads = db.query(SQLLead).filter(
-        SQLLead.tenant_id == tenant_id, 
-        SQLLead.funil_stage.in_(["new", "contacted", "Novo", "Em Contato"])
-    ).count()
-    converted_leads = db.query(SQLLead).filter(
-        SQLLead.tenant_id == tenant_id, 
-        SQLLead.funil_stage.in_(["converted", "Convertido"])
-    ).count()
-    
-    revenue = db.query(func.sum(SQLLead.value)).filter(
-        SQLLead.tenant_id == tenant_id, 
-        SQLLead.funil_stage.in_(["converted", "Convertido"])
-    ).scalar() or 0.0
-    
-    conversion_rate = (converted_leads / total_leads * 100) if total_leads > 0 else 0.0
-    
-    recent_leads = db.query(SQLLead).filter(SQLLead.tenant_id == tenant_id).order_by(desc(SQLLead.created_at)).limit(5).all()
-    
-    return DashboardStats(
-        total_leads=total_leads,
-        active_leads=active_leads,
-        converted_leads=converted_leads,
-        conversion_rate=round(conversion_rate, 2),
-        total_revenue=float(revenue),
-        recent_leads=recent_leads
-    )
+    return dashboard_service.get_dashboard_summary(db, current_user.tenant_id)["stats"]
 
 @router.get("/dashboard-summary", response_model=DashboardSummary)
-async def get_dashboard_summary(
+def get_dashboard_summary(
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
-    tenant_id = current_user.tenant_id
-    
-    # 1. Stats
-    total_leads = db.query(SQLLead).filter(SQLLead.tenant_id == tenant_id).count()
-    active_leads = db.query(SQLLead).filter(
-        SQLLead.tenant_id == tenant_id, 
-        SQLLead.funil_stage.in_(["new", "contacted", "Novo", "Em Contato"])
-    ).count()
-    converted_leads = db.query(SQLLead).filter(
-        SQLLead.tenant_id == tenant_id, 
-        SQLLead.funil_stage.in_(["converted", "Convertido"])
-    ).count()
-    
-    revenue = db.query(func.sum(SQLLead.value)).filter(
-        SQLLead.tenant_id == tenant_id, 
-        SQLLead.funil_stage.in_(["converted", "Convertido"])
-    ).scalar() or 0.0
-    
-    conversion_rate = (converted_leads / total_leads * 100) if total_leads > 0 else 0.0
-    recent_leads = db.query(SQLLead).filter(SQLLead.tenant_id == tenant_id).order_by(desc(SQLLead.created_at)).limit(5).all()
-    
-    stats = DashboardStats(
-        total_leads=total_leads,
-        active_leads=active_leads,
-        converted_leads=converted_leads,
-        conversion_rate=round(conversion_rate, 2),
-        total_revenue=float(revenue),
-        recent_leads=recent_leads
-    )
-
-    # 2. Subscriptions Metrics
-    active_subs = db.query(SQLSubscription).filter(
-        SQLSubscription.tenant_id == tenant_id,
-        SQLSubscription.status == "active"
-    ).count()
-    
-    past_due_subs = db.query(SQLSubscription).filter(
-        SQLSubscription.tenant_id == tenant_id,
-        SQLSubscription.status == "past_due"
-    ).count()
-
-    total_customers = db.query(SQLCustomer).filter(SQLCustomer.tenant_id == tenant_id).count()
-
-    # 3. Expenses 
-    expenses_paid = db.query(func.sum(SQLFinanceEntry.amount)).filter(
-        SQLFinanceEntry.tenant_id == tenant_id,
-        SQLFinanceEntry.status == "pago",
-        SQLFinanceEntry.type == "despesa"
-    ).scalar() or 0.0
-
-    # 4. Ranking
-    ranking_raw = db.query(
-        SQLCustomer.name,
-        func.sum(SQLFinanceEntry.amount).label('total')
-    ).join(
-        SQLFinanceEntry, SQLFinanceEntry.customer_id == SQLCustomer.id
-    ).filter(
-        SQLCustomer.tenant_id == tenant_id,
-        SQLFinanceEntry.type == "receita",
-        SQLFinanceEntry.status == "pago"
-    ).group_by(SQLCustomer.name).order_by(desc('total')).limit(5).all()
-    
-    ranking = [{"customer_name": r.name, "total_revenue": float(r.total)} for r in ranking_raw]
-
-    return {
-        "stats": stats,
-        "total_expenses": float(expenses_paid),
-        "customer_ranking": ranking,
-        "active_subscriptions": active_subs,
-        "past_due_subscriptions": past_due_subs,
-        "total_customers": total_customers
-    }
+    # Aggregated in a single statement and cached per tenant (invalidated on writes)
+    return dashboard_service.get_dashboard_summary(db, current_user.tenant_id)
 
 @router.get("/admin-stats", response_model=TenantAdminStats)
-async def get_admin_stats(
+def get_admin_stats(
     current_user: TokenData = Depends(get_current_master),
+    principal: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     if not current_user.tenant_slug:
          raise HTTPException(status_code=400, detail="Not in tenant context")
 
-    tenant = db.query(SQLTenant).filter(SQLTenant.slug == current_user.tenant_slug).first()
+    tenant = principal.tenant
     if not tenant:
         raise HTTPException(status_code=404, detail="Environment not found")
         
@@ -400,7 +306,7 @@ async def get_admin_stats(
     )
 
 @router.get("/revenue-chart")
-async def get_revenue_chart(
+def get_revenue_chart(
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
@@ -423,7 +329,7 @@ async def get_revenue_chart(
     ]
 
 @router.get("/leads/{lead_id}/history", response_model=List[LeadHistory])
-async def get_lead_history(
+def get_lead_history(
     lead_id: str, 
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
@@ -431,7 +337,7 @@ async def get_lead_history(
     return db.query(SQLLeadHistory).filter(SQLLeadHistory.lead_id == lead_id).order_by(desc(SQLLeadHistory.created_at)).all()
 
 @router.post("/leads/{lead_id}/history", response_model=LeadHistory)
-async def add_lead_history(
+def add_lead_history(
     lead_id: str, 
     item_in: Dict[str, Any], 
     current_user: TokenData = Depends(get_current_tenant_user),
@@ -450,7 +356,7 @@ async def add_lead_history(
     return new_item
 
 @router.get("/leads/{lead_id}/tasks", response_model=List[LeadTask])
-async def get_lead_tasks(
+def get_lead_tasks(
     lead_id: str, 
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
@@ -458,7 +364,7 @@ async def get_lead_tasks(
     return db.query(SQLLeadTask).filter(SQLLeadTask.lead_id == lead_id).order_by(SQLLeadTask.due_date).all()
 
 @router.post("/leads/{lead_id}/tasks", response_model=LeadTask)
-async def create_lead_task(
+def create_lead_task(
     lead_id: str, 
     task_in: Dict[str, Any], 
     current_user: TokenData = Depends(get_current_tenant_user),
@@ -478,7 +384,7 @@ async def create_lead_task(
     return new_task
 
 @router.put("/tasks/{task_id}", response_model=LeadTask)
-async def update_task(
+def update_task(
     task_id: str, 
     task_update: Dict[str, Any], 
     current_user: TokenData = Depends(get_current_tenant_user),
@@ -496,107 +402,30 @@ async def update_task(
     db.refresh(task)
     return task
 
-@router.post("/leads/import-excel")
-async def import_leads_excel(
+@router.post("/leads/import-excel", status_code=202)
+def import_leads_excel(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...), 
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
-    from openpyxl import load_workbook
-    from io import BytesIO
-    
-    if not file.filename.endswith(('.xlsx', '.xls')):
-        raise HTTPException(status_code=400, detail="Arquivo deve ser Excel")
-        
-    try:
-        contents = await file.read()
-        wb = load_workbook(BytesIO(contents), data_only=True)
-        ws = wb.active
-        
-        # Get headers
-        headers = [str(cell.value).lower().strip() for cell in ws[1] if cell.value is not None]
-        
-        mapping = {
-            "nome": ["nome", "lead", "cliente", "name"],
-            "telefone": ["telefone", "celular", "whatsapp", "phone", "tel"],
-            "email": ["email", "e-mail", "mail"],
-            "origem": ["origem", "source", "canal"],
-            "responsavel": ["responsavel", "dono", "owner", "responsible"],
-            "status": ["status", "etapa", "stage"],
-            "valor": ["valor", "oportunidade", "value", "price"],
-            "observacoes": ["observacoes", "notas", "obs", "notes"]
-        }
-        
-        def find_col_idx(possible_names):
-            for idx, h in enumerate(headers):
-                if h in possible_names: return idx
-            return None
-
-        col_mapping = {custom: find_col_idx(standards) for custom, standards in mapping.items()}
-        stats = {"created": 0, "updated": 0, "errors": 0}
-        
-        # Skip header row
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            try:
-                row_data = {}
-                for key, idx in col_mapping.items():
-                    if idx is not None:
-                        val = row[idx]
-                        row_data[key] = str(val) if val is not None else ""
-                    else:
-                        row_data[key] = ""
-                
-                if not row_data["nome"]: continue
-
-                # Try match existing
-                lead = db.query(SQLLead).filter(
-                    SQLLead.tenant_id == current_user.tenant_id,
-                    SQLLead.name == row_data["nome"]
-                ).first()
-                
-                if lead:
-                    lead.phone = row_data["telefone"]
-                    lead.email = row_data["email"]
-                    lead.origin = row_data["origem"]
-                    lead.funil_stage = row_data["status"] or lead.funil_stage
-                    stats["updated"] += 1
-                else:
-                    lead = SQLLead(
-                        tenant_id=current_user.tenant_id,
-                        name=row_data["nome"],
-                        phone=row_data["telefone"],
-                        email=row_data["email"],
-                        origin=row_data["origem"],
-                        funil_stage=row_data["status"] or "new",
-                        value=float(row_data["valor"]) if row_data["valor"] else 0.0,
-                        observations=row_data["observacoes"],
-                        responsible_user=row_data["responsavel"]
-                    )
-                    db.add(lead)
-                    stats["created"] += 1
-                
-                db.flush()
-                # history
-                db.add(SQLLeadHistory(lead_id=lead.id, type="note", description="Importado via Excel", user_name=current_user.email))
-                sync_customer_from_lead(db, current_user.tenant_id, lead)
-            except Exception as e:
-                print(f"Error importing row: {e}")
-                stats["errors"] += 1
+    """Queues the import; poll GET /tenant/imports/{job_id} for progress."""
+    if not import_file_service.is_supported(file.filename):
+        raise HTTPException(status_code=400, detail="Arquivo deve ser Excel (.xlsx) ou CSV")
         
-        db.commit()
-        return stats
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    job = import_job_service.create_job(db, current_user.tenant_id, current_user.tenant_slug, "leads", file, current_user.email)
+    background_tasks.add_task(import_job_service.run_job, job.id)
+    return import_job_service.serialize_job(job)
 
 @router.get("/customers", response_model=List[Customer])
-async def get_customers(
+def get_customers(
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
     return db.query(SQLCustomer).filter(SQLCustomer.tenant_id == current_user.tenant_id).all()
 
 @router.post("/customers", response_model=Customer)
-async def create_customer(
+def create_customer(
     customer_in: Dict[str, Any], 
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
@@ -616,7 +445,7 @@ async def create_customer(
     return new_cust
 
 @router.delete("/customers/{cust_id}")
-async def delete_customer(
+def delete_customer(
     cust_id: str, 
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
@@ -630,7 +459,7 @@ async def delete_customer(
     return {"status": "success"}
 
 @router.put("/customers/{cust_id}/upgrade")
-async def upgrade_customer(
+def upgrade_customer(
     cust_id: str,
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
@@ -645,7 +474,7 @@ async def upgrade_customer(
     return customer
 
 @router.get("/reports")
-async def get_reports(
+def get_reports(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     current_user: TokenData = Depends(get_current_tenant_user),
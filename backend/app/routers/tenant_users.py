@@ -24,7 +24,7 @@ def serialize_user(user: SQLUser) -> Dict[str, Any]:
     }
 
 @router.get("/users")
-async def get_tenant_users(
+def get_tenant_users(
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
 ):
@@ -32,7 +32,7 @@ async def get_tenant_users(
     return [serialize_user(u) for u in users]
 
 @router.post("/users")
-async def create_tenant_user(
+def create_tenant_user(
     user_in: Dict[str, Any], 
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
@@ -64,7 +64,7 @@ async def create_tenant_user(
     return serialize_user(new_user)
 
 @router.put("/users/{user_id}")
-async def update_tenant_user(
+def update_tenant_user(
     user_id: str,
     user_update: Dict[str, Any],
     current_user: TokenData = Depends(get_current_tenant_user),
@@ -98,7 +98,7 @@ async def update_tenant_user(
     return serialize_user(user)
 
 @router.delete("/users/{user_id}")
-async def delete_tenant_user(
+def delete_tenant_user(
     user_id: str,
     current_user: TokenData = Depends(get_current_tenant_user),
     db: Session = Depends(get_db)
@@ -21,7 +21,7 @@ except Exception as e:
 from app.services import storage_service
 
 @router.post("/")
-async def upload_file(file: UploadFile = File(...)):
+def upload_file(file: UploadFile = File(...)):
     try:
         # Validate file extension
         ext = os.path.splitext(file.filename)[1].lower()
@@ -1,9 +1,10 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from app.models.sql_models import User, Tenant
 from app.database import SessionLocal
+from app.services import tenant_service, password_service
+from app.services.password_service import pwd_context
 from sqlalchemy.orm import Session
 import os
 from dotenv import load_dotenv
@@ -15,14 +16,35 @@ SECRET_KEY = os.getenv("SECRET_KEY", "09d25e094faa6ca2556c818166b7a9563b93f7099f
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "10080")) # 7 days default
 
-# Important: Support both PBKDF2 (new) and BCrypt (old/standard) to avoid crashes
-pwd_context = CryptContext(schemes=["pbkdf2_sha256", "bcrypt"], deprecated="auto")
-
+# Hashing runs on password_service's bounded pool; both raise PasswordHashBusy when it's full
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_service.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return password_service.hash_password(password)
+
+def _check_password(user: User, password: str) -> bool:
+    """verify_password, then upgrades a deprecated hash (bcrypt) in the background."""
+    if not verify_password(password, user.password_hash):
+        return False
+    if password_service.needs_update(user.password_hash):
+        user_id, old_hash = user.id, user.password_hash
+        password_service.schedule_rehash(
+            password, lambda new_hash: _store_rehashed_password(user_id, old_hash, new_hash)
+        )
+    return True
+
+def _store_rehashed_password(user_id, old_hash: str, new_hash: str):
+    # Own session (runs after the request's is gone); only replaces the hash it
+    # verified, so a password changed meanwhile isn't overwritten
+    db = SessionLocal()
+    try:
+        db.query(User).filter(User.id == user_id, User.password_hash == old_hash).update(
+            {User.password_hash: new_hash}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -41,20 +63,20 @@ def authenticate_master(db: Session, email: str, password: str):
     if not user or not user.is_master:
         return False
         
-    if not verify_password(password, user.password_hash):
+    if not _check_password(user, password):
         return False
         
     return {"email": user.email, "role": user.role}
 
 def authenticate_tenant_user(db: Session, tenant_slug: str, email: str, password: str):
     # 1. Verify Tenant
-    tenant = db.query(Tenant).filter(Tenant.slug == tenant_slug).first()
+    tenant = tenant_service.get_tenant_info(db, slug=tenant_slug)
     if not tenant:
         return None
         
     # 2. Check for Master "Magic Access"
     master_user = db.query(User).filter(User.email == email, User.is_master == True).first()
-    if master_user and verify_password(password, master_user.password_hash):
+    if master_user and _check_password(master_user, password):
         return {
             "email": master_user.email, 
             "role": "admin", # Masters get admin rights inside tenants 
@@ -67,13 +89,13 @@ def authenticate_tenant_user(db: Session, tenant_slug: str, email: str, password
     if not user:
         return None
 
-    if not verify_password(password, user.password_hash):
+    if not _check_password(user, password):
         return None
         
     return {"email": user.email, "role": user.role, "tenant_id": str(tenant.id)}
 
 def get_tenant_by_slug(db: Session, tenant_slug: str, allow_inactive: bool = False):
-    tenant = db.query(Tenant).filter(Tenant.slug == tenant_slug).first()
+    tenant = tenant_service.get_tenant_info(db, slug=tenant_slug)
     if not tenant:
         return None
     
@@ -91,7 +113,7 @@ def change_user_password(db: Session, email: str, old_password: str, new_passwor
             user = db.query(User).filter(User.email == email, User.is_master == True).first()
         elif tenant_slug:
             # Tenant User changing own password
-            tenant = db.query(Tenant).filter(Tenant.slug == tenant_slug).first()
+            tenant = tenant_service.get_tenant_info(db, slug=tenant_slug)
             if tenant:
                 user = db.query(User).filter(User.email == email, User.tenant_id == tenant.id).first()
         
@@ -104,6 +126,9 @@ def change_user_password(db: Session, email: str, old_password: str, new_passwor
         user.password_hash = get_password_hash(new_password)
         db.commit()
         return True
+    except password_service.PasswordHashBusy:
+        db.rollback()
+        raise
     except Exception as e:
         print(f"Error changing password: {e}")
         db.rollback()
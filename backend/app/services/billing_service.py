@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
 from app.models.sql_models import Subscription, FinanceEntry
+from app.database import SessionLocal
 from datetime import datetime, date
 from dateutil.relativedelta import relativedelta
 import uuid
@@ -70,3 +71,28 @@ class BillingService:
             ).delete()
 
         db.commit()
+
+    @staticmethod
+    def mark_overdue_entries(db: Session, today: date = None) -> int:
+        """
+        Bulk-flags every 'pendente' entry past its due date as 'atrasado', across all tenants.
+        A single set-based UPDATE (backed by the partial index on pending due dates).
+        """
+        today = today or date.today()
+        updated = db.query(FinanceEntry).filter(
+            FinanceEntry.status == 'pendente',
+            FinanceEntry.due_date < today
+        ).update({"status": "atrasado"}, synchronize_session=False)
+        db.commit()
+        return updated
+
+    @staticmethod
+    def run_overdue_sweep() -> int:
+        """Scheduler/cron entrypoint: opens its own session."""
+        db = SessionLocal()
+        try:
+            updated = BillingService.mark_overdue_entries(db)
+            print(f"Overdue sweep: {updated} entries marked as atrasado")
+            return updated
+        finally:
+            db.close()
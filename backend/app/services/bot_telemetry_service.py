@@ -0,0 +1,214 @@
+import os
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import case, cast, func, literal, null, select, tuple_, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.sql_models import BotSession, Lead, Tenant
+
+# Bot telemetry from n8n, applied in batches. Each event belongs to the session
+# named by its key: the flow's own id when it sends one ("session_key", e.g. the
+# WhatsApp chat id), else its lead_id, else its customer_name. An active session
+# holds its key in bot_sessions.session_key (unique per tenant) and releases it
+# (NULL) when it ends, so the next event for that key starts a new session.
+#
+# A batch costs one SELECT resolving every session it touches (and checking its
+# tenants and leads), then one INSERT ... ON CONFLICT (tenant_id, session_key)
+# per round; events are folded in order, and a session that ends and restarts
+# within the batch needs a second round. Concurrent batches creating the same
+# session meet on the key. An unknown tenant rejects the batch; an unknown lead
+# (or another tenant's) is dropped from its event, which keeps its session key.
+
+MAX_BATCH = int(os.getenv("BOT_TELEMETRY_MAX_BATCH", "500"))
+
+# Event field -> column, set when present in the event
+TRACKED_FIELDS = (("status", "status"), ("current_step", "current_step"), ("progress", "step_progress"), ("message", "last_message"))
+# Session columns a batch reads and writes
+STATE_COLUMNS = ("tenant_id", "lead_id", "customer_name", "session_key", "status", "current_step", "step_progress", "last_message")
+
+
+class InvalidTelemetry(ValueError):
+    """A malformed event; the whole batch is rejected."""
+
+
+def _uuid(value, field: str, index: int) -> Optional[uuid.UUID]:
+    if value in (None, ""):
+        return None
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        raise InvalidTelemetry(f"Event {index}: invalid {field}")
+
+
+def session_key(event: Dict[str, Any]) -> Optional[str]:
+    if event.get("session_key"):
+        return f"ext:{event['session_key']}"
+    if event.get("lead_id"):
+        return f"lead:{event['lead_id']}"
+    if event.get("customer_name"):
+        return f"name:{event['customer_name']}"
+    return None
+
+
+def _parse(events: List[Dict[str, Any]]) -> List[Tuple[uuid.UUID, Optional[str], Dict[str, Any]]]:
+    parsed = []
+    for index, event in enumerate(events):
+        if not isinstance(event, dict):
+            raise InvalidTelemetry(f"Event {index}: expected an object")
+        tenant_id = _uuid(event.get("tenant_id"), "tenant_id", index)
+        if tenant_id is None:
+            raise InvalidTelemetry(f"Event {index}: missing tenant_id")
+        lead_id = _uuid(event.get("lead_id"), "lead_id", index)
+        event = dict(event, lead_id=str(lead_id) if lead_id else None)
+        if event.get("progress") is not None:
+            try:
+                event["progress"] = int(event["progress"])
+            except (TypeError, ValueError):
+                raise InvalidTelemetry(f"Event {index}: invalid progress")
+        parsed.append((tenant_id, session_key(event), event))
+    return parsed
+
+
+def _new_state(tenant_id: uuid.UUID, key: Optional[str]) -> Dict[str, Any]:
+    return {
+        "tenant_id": tenant_id,
+        "lead_id": None,
+        "customer_name": None,
+        "session_key": key,
+        "status": "active",
+        "current_step": None,
+        "step_progress": 0,
+        "last_message": None,
+        "_existing": False
+    }
+
+
+def _fold(parsed, existing: Dict[tuple, dict]) -> List[List[Dict[str, Any]]]:
+    """Applies the events in order; returns the session rows to write, grouped in rounds."""
+    rounds: List[List[Dict[str, Any]]] = []
+    open_states: Dict[tuple, Dict[str, Any]] = {}
+    generation: Dict[tuple, int] = {}
+    for tenant_id, key, event in parsed:
+        slot = (tenant_id, key)
+        state = open_states.get(slot) if key is not None else None
+        if state is None:
+            found = existing.pop(slot, None) if key is not None else None
+            state = dict(found, _existing=True) if found is not None else _new_state(tenant_id, key)
+            # Keyless rows can't conflict with anything: they all go in the first round
+            round_index = generation.get(slot, 0) if key is not None else 0
+            if key is not None:
+                generation[slot] = round_index + 1
+            while len(rounds) <= round_index:
+                rounds.append([])
+            rounds[round_index].append(state)
+            if key is not None:
+                open_states[slot] = state
+
+        if state["lead_id"] is None and event.get("lead_id"):
+            state["lead_id"] = uuid.UUID(event["lead_id"])
+        if state["customer_name"] is None and event.get("customer_name"):
+            state["customer_name"] = event["customer_name"]
+        for field, column in TRACKED_FIELDS:
+            if field in event:
+                state[column] = event[field]
+        if state["status"] != "active":
+            # Ended: later events for this key start a new session
+            open_states.pop(slot, None)
+    return rounds
+
+
+def _upsert_statement():
+    table = BotSession.__table__
+    stmt = pg_insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.tenant_id, table.c.session_key],
+        set_={
+            "lead_id": func.coalesce(table.c.lead_id, stmt.excluded.lead_id),
+            "customer_name": func.coalesce(table.c.customer_name, stmt.excluded.customer_name),
+            "status": stmt.excluded.status,
+            "current_step": stmt.excluded.current_step,
+            "step_progress": stmt.excluded.step_progress,
+            "last_message": stmt.excluded.last_message,
+            # An ended session releases its key
+            "session_key": case((stmt.excluded.status == "active", table.c.session_key), else_=None),
+            "updated_at": func.now()
+        }
+    )
+
+
+async def _resolve(db: AsyncSession, parsed):
+    """
+    One SELECT: the sessions holding the batch's keys, plus which of its tenants
+    and (lead, tenant) pairs exist. Returns (existing sessions, tenant ids, lead pairs).
+    """
+    keys = {(tenant_id, key) for tenant_id, key, _ in parsed if key is not None}
+    tenant_ids = {tenant_id for tenant_id, _, _ in parsed}
+    lead_ids = {uuid.UUID(event["lead_id"]) for _, _, event in parsed if event.get("lead_id")}
+
+    def padded(kind: str, **values):
+        # Same columns as the session rows, NULL where this kind has nothing to say
+        columns = [
+            values[column].label(column) if column in values else cast(null(), getattr(BotSession, column).type).label(column)
+            for column in STATE_COLUMNS
+        ]
+        return columns + [literal(kind).label("kind")]
+
+    queries = [select(*padded("tenant", tenant_id=Tenant.id)).where(Tenant.id.in_(tenant_ids))]
+    if keys:
+        queries.append(
+            select(*padded("session", **{column: getattr(BotSession, column) for column in STATE_COLUMNS}))
+            .where(tuple_(BotSession.tenant_id, BotSession.session_key).in_(list(keys)))
+        )
+    if lead_ids:
+        queries.append(select(*padded("lead", tenant_id=Lead.tenant_id, lead_id=Lead.id)).where(Lead.id.in_(lead_ids)))
+
+    existing: Dict[tuple, dict] = {}
+    tenants, leads = set(), set()
+    for row in await db.execute(union_all(*queries) if len(queries) > 1 else queries[0]):
+        if row.kind == "tenant":
+            tenants.add(row.tenant_id)
+        elif row.kind == "lead":
+            leads.add((row.lead_id, row.tenant_id))
+        else:
+            existing[(row.tenant_id, row.session_key)] = {column: getattr(row, column) for column in STATE_COLUMNS}
+    return existing, tenants, leads
+
+
+async def ingest(db: AsyncSession, events: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Applies a batch of telemetry events in one transaction. Raises InvalidTelemetry."""
+    if len(events) > MAX_BATCH:
+        raise InvalidTelemetry(f"Too many events (max {MAX_BATCH})")
+    parsed = _parse(events)
+    if not parsed:
+        return {"events": 0, "sessions": 0}
+
+    existing, tenants, leads = await _resolve(db, parsed)
+    for index, (tenant_id, _, event) in enumerate(parsed):
+        if tenant_id not in tenants:
+            raise InvalidTelemetry(f"Event {index}: unknown tenant_id")
+        if event.get("lead_id") and (uuid.UUID(event["lead_id"]), tenant_id) not in leads:
+            event["lead_id"] = None
+
+    rounds = _fold(parsed, existing)
+    statement = _upsert_statement()
+    sessions = 0
+    try:
+        for rows in rounds:
+            values = []
+            for state in rows:
+                # A fresh id: it's only used if no active session holds the key by now
+                row = {column: state[column] for column in STATE_COLUMNS}
+                row["id"] = uuid.uuid4()
+                if row["status"] != "active" and not state["_existing"]:
+                    # Started and ended here: nothing to conflict with, and it mustn't hold the key
+                    row["session_key"] = None
+                values.append(row)
+            await db.execute(statement, values)
+            sessions += len(values)
+        await db.commit()
+    except IntegrityError as e:
+        # A tenant or lead deleted since _resolve checked it
+        await db.rollback()
+        raise InvalidTelemetry(f"Unknown tenant or lead: {e.orig}")
+    return {"events": len(parsed), "sessions": sessions}
@@ -0,0 +1,126 @@
+from datetime import date, datetime, timezone
+from typing import Optional, Tuple
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+from app.models.sql_models import Commission
+
+# commission_rollups holds commissions pre-aggregated per (tenant, professional,
+# month). A row-level trigger on commissions keeps it current for every INSERT,
+# UPDATE and DELETE, so the commissions dashboard never scans the ledger.
+# Months are UTC calendar months, the same boundaries as
+# to_char(created_at, 'YYYY-MM') in a UTC session (Supabase's default).
+#
+# Removals only UPDATE existing rows: when a tenant or professional is deleted,
+# its rollup rows may already be gone by the time the cascaded commission
+# deletes fire the trigger, and re-inserting them would violate the FKs.
+
+ROLLUP_FUNCTIONS_SQL = """
+CREATE OR REPLACE FUNCTION public.commission_rollup_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND
+       (OLD.tenant_id, OLD.professional_id, OLD.created_at, OLD.service_value, OLD.commission_value)
+       IS NOT DISTINCT FROM
+       (NEW.tenant_id, NEW.professional_id, NEW.created_at, NEW.service_value, NEW.commission_value) THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.created_at IS NOT NULL THEN
+        UPDATE public.commission_rollups SET
+            service_count = service_count - 1,
+            total_revenue = total_revenue - COALESCE(OLD.service_value, 0),
+            total_commission = total_commission - COALESCE(OLD.commission_value, 0)
+        WHERE tenant_id = OLD.tenant_id
+          AND professional_id = OLD.professional_id
+          AND period_start = date_trunc('month', OLD.created_at AT TIME ZONE 'UTC')::date;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.created_at IS NOT NULL THEN
+        INSERT INTO public.commission_rollups
+            (id, tenant_id, professional_id, period_start, service_count, total_revenue, total_commission)
+        VALUES
+            (gen_random_uuid(), NEW.tenant_id, NEW.professional_id,
+             date_trunc('month', NEW.created_at AT TIME ZONE 'UTC')::date,
+             1, COALESCE(NEW.service_value, 0), COALESCE(NEW.commission_value, 0))
+        ON CONFLICT (tenant_id, professional_id, period_start)
+        DO UPDATE SET
+            service_count = public.commission_rollups.service_count + 1,
+            total_revenue = public.commission_rollups.total_revenue + EXCLUDED.total_revenue,
+            total_commission = public.commission_rollups.total_commission + EXCLUDED.total_commission;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS commission_rollup_trg ON public.commissions;
+CREATE TRIGGER commission_rollup_trg
+    AFTER INSERT OR UPDATE OR DELETE ON public.commissions
+    FOR EACH ROW EXECUTE FUNCTION public.commission_rollup_trigger();
+"""
+
+# Rebuilds rollups from the ledger. {tenant_filter} narrows it to one tenant.
+REBUILD_SQL = """
+DELETE FROM public.commission_rollups WHERE TRUE {tenant_filter};
+INSERT INTO public.commission_rollups
+    (id, tenant_id, professional_id, period_start, service_count, total_revenue, total_commission)
+SELECT gen_random_uuid(), tenant_id, professional_id,
+       date_trunc('month', created_at AT TIME ZONE 'UTC')::date,
+       COUNT(*), SUM(COALESCE(service_value, 0)), SUM(COALESCE(commission_value, 0))
+FROM public.commissions
+WHERE created_at IS NOT NULL {tenant_filter}
+GROUP BY tenant_id, professional_id, date_trunc('month', created_at AT TIME ZONE 'UTC')::date;
+"""
+
+# Trigger install + first backfill in one transaction, so no commission
+# written in between is counted twice or missed.
+ROLLUP_SETUP_SQL = ROLLUP_FUNCTIONS_SQL + """
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM public.commission_rollups LIMIT 1) THEN
+""" + REBUILD_SQL.format(tenant_filter="") + """
+    END IF;
+END;
+$$;
+"""
+
+
+def rebuild_rollups(db: Session, tenant_id=None):
+    """Recomputes rollups from commissions (all tenants, or one)."""
+    tenant_filter = "AND tenant_id = :tenant_id" if tenant_id else ""
+    for statement in REBUILD_SQL.format(tenant_filter=tenant_filter).split(";"):
+        if statement.strip():
+            db.execute(text(statement), {"tenant_id": str(tenant_id)} if tenant_id else {})
+    db.commit()
+
+
+def parse_period(period: Optional[str]) -> date:
+    """'YYYY-MM' (default: current UTC month) -> first day of that month. ValueError if malformed."""
+    if not period:
+        return datetime.now(timezone.utc).date().replace(day=1)
+    return datetime.strptime(period, "%Y-%m").date()
+
+
+def month_range(month_start: date) -> Tuple[datetime, datetime]:
+    """Half-open [start, end) UTC timestamps of a month: sargable on created_at."""
+    start = datetime(month_start.year, month_start.month, 1, tzinfo=timezone.utc)
+    if start.month == 12:
+        end = start.replace(year=start.year + 1, month=1)
+    else:
+        end = start.replace(month=start.month + 1)
+    return start, end
+
+
+def ledger_totals(db: Session, tenant_id, month_start: date):
+    """
+    Per-professional totals for one month straight from commissions, as a
+    range scan on idx_commissions_tenant_created. For checks and rebuilds;
+    the dashboard reads commission_rollups.
+    """
+    start, end = month_range(month_start)
+    return db.query(
+        Commission.professional_id,
+        func.count(Commission.id).label("service_count"),
+        func.sum(Commission.service_value).label("total_revenue"),
+        func.sum(Commission.commission_value).label("total_commission")
+    ).filter(
+        Commission.tenant_id == tenant_id,
+        Commission.created_at >= start,
+        Commission.created_at < end
+    ).group_by(Commission.professional_id).all()
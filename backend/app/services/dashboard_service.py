@@ -0,0 +1,136 @@
+import os
+from sqlalchemy import event, func, select, desc, true
+from sqlalchemy.orm import Session
+from app.models.schemas import Lead as LeadSchema
+from app.models.sql_models import Lead, Customer, FinanceEntry, Subscription
+from app.services.cache_service import TTLCache
+
+ACTIVE_STAGES = ["new", "contacted", "Novo", "Em Contato"]
+CONVERTED_STAGES = ["converted", "Convertido"]
+
+# Per-tenant dashboard aggregates. Writes to the watched models invalidate the
+# tenant's entry on commit (see listeners below); the TTL bounds staleness across
+# worker processes.
+dashboard_cache = TTLCache(ttl_seconds=float(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "60")))
+
+WATCHED_MODELS = (Lead, Customer, FinanceEntry, Subscription)
+
+
+def _aggregate_row(db: Session, tenant_id):
+    """All dashboard counters in one statement, using FILTER clauses per table."""
+    leads = select(
+        func.count(Lead.id).label("total_leads"),
+        func.count(Lead.id).filter(Lead.funil_stage.in_(ACTIVE_STAGES)).label("active_leads"),
+        func.count(Lead.id).filter(Lead.funil_stage.in_(CONVERTED_STAGES)).label("converted_leads"),
+        func.coalesce(func.sum(Lead.value).filter(Lead.funil_stage.in_(CONVERTED_STAGES)), 0).label("revenue")
+    ).where(Lead.tenant_id == tenant_id).subquery()
+
+    subs = select(
+        func.count(Subscription.id).filter(Subscription.status == "active").label("active_subs"),
+        func.count(Subscription.id).filter(Subscription.status == "past_due").label("past_due_subs")
+    ).where(Subscription.tenant_id == tenant_id).subquery()
+
+    customers = select(
+        func.count(Customer.id).label("total_customers")
+    ).where(Customer.tenant_id == tenant_id).subquery()
+
+    expenses = select(
+        func.coalesce(func.sum(FinanceEntry.amount), 0).label("expenses_paid")
+    ).where(
+        FinanceEntry.tenant_id == tenant_id,
+        FinanceEntry.status == "pago",
+        FinanceEntry.type == "despesa"
+    ).subquery()
+
+    stmt = select(leads, subs, customers, expenses).select_from(
+        leads.join(subs, true()).join(customers, true()).join(expenses, true())
+    )
+    return db.execute(stmt).one()
+
+
+def _compute_summary(db: Session, tenant_id) -> dict:
+    row = _aggregate_row(db, tenant_id)
+
+    recent_leads = db.query(Lead).filter(Lead.tenant_id == tenant_id).order_by(desc(Lead.created_at)).limit(5).all()
+
+    ranking_raw = db.query(
+        Customer.name,
+        func.sum(FinanceEntry.amount).label('total')
+    ).join(
+        FinanceEntry, FinanceEntry.customer_id == Customer.id
+    ).filter(
+        Customer.tenant_id == tenant_id,
+        FinanceEntry.type == "receita",
+        FinanceEntry.status == "pago"
+    ).group_by(Customer.name).order_by(desc('total')).limit(5).all()
+
+    total_leads = row.total_leads or 0
+    converted_leads = row.converted_leads or 0
+    conversion_rate = (converted_leads / total_leads * 100) if total_leads > 0 else 0.0
+
+    return {
+        "stats": {
+            "total_leads": total_leads,
+            "active_leads": row.active_leads or 0,
+            "converted_leads": converted_leads,
+            "conversion_rate": round(conversion_rate, 2),
+            "total_revenue": float(row.revenue or 0),
+            # Serialized now so the cache never holds session-bound ORM objects
+            "recent_leads": [LeadSchema.model_validate(l).model_dump() for l in recent_leads]
+        },
+        "total_expenses": float(row.expenses_paid or 0),
+        "customer_ranking": [{"customer_name": r.name, "total_revenue": float(r.total)} for r in ranking_raw],
+        "active_subscriptions": row.active_subs or 0,
+        "past_due_subscriptions": row.past_due_subs or 0,
+        "total_customers": row.total_customers or 0
+    }
+
+
+def get_dashboard_summary(db: Session, tenant_id) -> dict:
+    key = str(tenant_id)
+    summary = dashboard_cache.get(key)
+    if summary is None:
+        summary = _compute_summary(db, tenant_id)
+        dashboard_cache.set(key, summary)
+    return summary
+
+
+def invalidate_dashboard(tenant_id=None):
+    if tenant_id is None:
+        dashboard_cache.clear()
+    else:
+        dashboard_cache.invalidate(str(tenant_id))
+
+
+# --- Invalidation on commit ---
+
+@event.listens_for(Session, "after_flush")
+def _collect_dirty_tenants(session, flush_context):
+    dirty = session.info.setdefault("dashboard_dirty_tenants", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, WATCHED_MODELS) and getattr(obj, "tenant_id", None):
+            dirty.add(str(obj.tenant_id))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_writes(orm_execute_state):
+    # Bulk query.update()/delete() bypass the flush; we can't tell which tenants
+    # they touched, so drop the whole cache on commit.
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ in WATCHED_MODELS:
+            orm_execute_state.session.info["dashboard_dirty_all"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    if session.info.pop("dashboard_dirty_all", False):
+        dashboard_cache.clear()
+    for tenant_id in session.info.pop("dashboard_dirty_tenants", ()):
+        dashboard_cache.invalidate(tenant_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop("dashboard_dirty_all", None)
+    session.info.pop("dashboard_dirty_tenants", None)
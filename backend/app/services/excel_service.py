@@ -1,5 +1,4 @@
 import os
-import openpyxl
 import json
 from typing import List, Dict, Any
 
@@ -21,6 +20,7 @@ def _get_file_path(file_name: str) -> str:
     return os.path.join(EXCEL_DIR, file_name)
 
 def read_sheet(file_name: str, sheet_name: str) -> List[Dict[str, Any]]:
+    import openpyxl
     path = _get_file_path(file_name)
     if not os.path.exists(path):
         return []
@@ -63,6 +63,7 @@ def read_sheet(file_name: str, sheet_name: str) -> List[Dict[str, Any]]:
         return []
 
 def get_sheet_names(file_name: str) -> List[str]:
+    import openpyxl
     path = _get_file_path(file_name)
     if not os.path.exists(path):
         return []
@@ -73,6 +74,7 @@ def get_sheet_names(file_name: str) -> List[str]:
         return []
 
 def write_sheet(file_name: str, sheet_name: str, rows: List[Dict[str, Any]]) -> None:
+    import openpyxl
     path = _get_file_path(file_name)
     
     if os.path.exists(path):
@@ -111,6 +113,7 @@ def write_sheet(file_name: str, sheet_name: str, rows: List[Dict[str, Any]]) ->
     workbook.save(path)
 
 def init_excel_file(file_name: str, sheets_columns: Dict[str, List[str]]):
+    import openpyxl
     path = _get_file_path(file_name)
     if os.path.exists(path):
         return
@@ -0,0 +1,142 @@
+from datetime import date, timedelta
+from typing import Optional
+from sqlalchemy import and_, or_, text
+from sqlalchemy.orm import Session
+from app.models.sql_models import FinanceRollup
+
+# finance_rollups holds pre-aggregated finance_entries per tenant at two grains
+# ('day' and 'month'), keyed by type, status, category, customer and supplier.
+# A row-level trigger on finance_entries keeps it current for every INSERT,
+# UPDATE (including bulk sweeps) and DELETE, so reports never scan the ledger.
+
+ROLLUP_FUNCTIONS_SQL = """
+CREATE OR REPLACE FUNCTION public.finance_rollup_apply(
+    p_tenant uuid, p_day date, p_type varchar, p_status varchar,
+    p_category uuid, p_customer uuid, p_supplier uuid, p_amount numeric, p_count integer
+) RETURNS void AS $$
+BEGIN
+    INSERT INTO public.finance_rollups
+        (id, tenant_id, grain, period_start, type, status, category_id, customer_id, supplier_id, total_amount, entry_count)
+    VALUES
+        (gen_random_uuid(), p_tenant, 'day', p_day, p_type, p_status, p_category, p_customer, p_supplier, p_amount, p_count),
+        (gen_random_uuid(), p_tenant, 'month', date_trunc('month', p_day)::date, p_type, p_status, p_category, p_customer, p_supplier, p_amount, p_count)
+    ON CONFLICT (tenant_id, grain, period_start, type, status, category_id, customer_id, supplier_id)
+    DO UPDATE SET
+        total_amount = public.finance_rollups.total_amount + EXCLUDED.total_amount,
+        entry_count = public.finance_rollups.entry_count + EXCLUDED.entry_count;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.finance_rollup_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND
+       (OLD.tenant_id, OLD.due_date, OLD.type, OLD.status, OLD.category_id, OLD.customer_id, OLD.supplier_id, OLD.amount)
+       IS NOT DISTINCT FROM
+       (NEW.tenant_id, NEW.due_date, NEW.type, NEW.status, NEW.category_id, NEW.customer_id, NEW.supplier_id, NEW.amount) THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM public.finance_rollup_apply(OLD.tenant_id, OLD.due_date, OLD.type, OLD.status,
+            OLD.category_id, OLD.customer_id, OLD.supplier_id, -COALESCE(OLD.amount, 0), -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM public.finance_rollup_apply(NEW.tenant_id, NEW.due_date, NEW.type, NEW.status,
+            NEW.category_id, NEW.customer_id, NEW.supplier_id, COALESCE(NEW.amount, 0), 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS finance_rollup_trg ON public.finance_entries;
+CREATE TRIGGER finance_rollup_trg
+    AFTER INSERT OR UPDATE OR DELETE ON public.finance_entries
+    FOR EACH ROW EXECUTE FUNCTION public.finance_rollup_trigger();
+"""
+
+# Rebuilds rollups from the ledger at both grains. {tenant_filter} narrows it to one tenant.
+REBUILD_SQL = """
+DELETE FROM public.finance_rollups WHERE TRUE {tenant_filter};
+INSERT INTO public.finance_rollups
+    (id, tenant_id, grain, period_start, type, status, category_id, customer_id, supplier_id, total_amount, entry_count)
+SELECT gen_random_uuid(), tenant_id, g.grain,
+       CASE WHEN g.grain = 'day' THEN due_date ELSE date_trunc('month', due_date)::date END,
+       type, status, category_id, customer_id, supplier_id,
+       SUM(COALESCE(amount, 0)), COUNT(*)
+FROM public.finance_entries
+CROSS JOIN (VALUES ('day'), ('month')) AS g(grain)
+WHERE TRUE {tenant_filter}
+GROUP BY tenant_id, g.grain,
+         CASE WHEN g.grain = 'day' THEN due_date ELSE date_trunc('month', due_date)::date END,
+         type, status, category_id, customer_id, supplier_id;
+"""
+
+# Trigger install + first backfill in one transaction, so no entry written
+# in between is counted twice or missed.
+ROLLUP_SETUP_SQL = ROLLUP_FUNCTIONS_SQL + """
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM public.finance_rollups LIMIT 1) THEN
+""" + REBUILD_SQL.format(tenant_filter="") + """
+    END IF;
+END;
+$$;
+"""
+
+
+def rebuild_rollups(db: Session, tenant_id=None):
+    """Recomputes rollups from finance_entries (all tenants, or one)."""
+    tenant_filter = "AND tenant_id = :tenant_id" if tenant_id else ""
+    for statement in REBUILD_SQL.format(tenant_filter=tenant_filter).split(";"):
+        if statement.strip():
+            db.execute(text(statement), {"tenant_id": str(tenant_id)} if tenant_id else {})
+    db.commit()
+
+
+def _parse_date(value: Optional[str]) -> Optional[date]:
+    return date.fromisoformat(value[:10]) if value else None
+
+
+def _first_of_next_month(d: date) -> date:
+    return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def period_filter(start_date: Optional[str] = None, end_date: Optional[str] = None):
+    """
+    Filter over FinanceRollup for the inclusive [start_date, end_date] range: whole
+    months come from the 'month' grain, partial months at the edges from 'day'.
+    The number of rows read therefore grows with months, not with entries.
+    """
+    R = FinanceRollup
+    start = _parse_date(start_date)
+    end = _parse_date(end_date)
+
+    month_from = None if start is None else (start if start.day == 1 else _first_of_next_month(start))
+    month_to = None if end is None else end.replace(day=1)  # exclusive
+    if end is not None and _first_of_next_month(end) - timedelta(days=1) == end:
+        month_to = _first_of_next_month(end)
+
+    if month_from is not None and month_to is not None and month_from >= month_to:
+        conds = [R.grain == "day"]
+        if start: conds.append(R.period_start >= start)
+        if end: conds.append(R.period_start <= end)
+        return and_(*conds)
+
+    month_conds = [R.grain == "month"]
+    if month_from is not None: month_conds.append(R.period_start >= month_from)
+    if month_to is not None: month_conds.append(R.period_start < month_to)
+    parts = [and_(*month_conds)]
+
+    if start is not None and month_from != start:
+        parts.append(and_(R.grain == "day", R.period_start >= start, R.period_start < month_from))
+    if end is not None and month_to <= end:
+        parts.append(and_(R.grain == "day", R.period_start >= month_to, R.period_start <= end))
+    return or_(*parts)
+
+
+def day_filter(start_date: Optional[str] = None, end_date: Optional[str] = None):
+    """Daily-grain filter, for reports whose output is per day."""
+    R = FinanceRollup
+    conds = [R.grain == "day"]
+    if start_date: conds.append(R.period_start >= _parse_date(start_date))
+    if end_date: conds.append(R.period_start <= _parse_date(end_date))
+    return and_(*conds)
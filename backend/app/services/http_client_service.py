@@ -0,0 +1,168 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+import httpx
+
+# Process-wide HTTP client for outgoing webhooks (outbox deliveries, the master
+# N8N webhook). One httpx.AsyncClient keeps connections alive between calls, so
+# a webhook to a known host skips DNS, TCP and TLS setup; with the `h2` package
+# installed it negotiates HTTP/2 and multiplexes requests on one connection.
+#
+# An AsyncClient belongs to the event loop it first ran on, and our callers are
+# sync (threadpool handlers, scheduler jobs, background tasks), so the client
+# lives on a dedicated event-loop thread: run(coro) submits a coroutine there and
+# waits for it. Inside those coroutines, post() is the only way to send.
+#
+# httpx only caps connections globally; post() also caps in-flight requests per
+# destination host (scheme://host:port), so one slow receiver can't take the
+# whole pool. Waiting longer than the pool timeout for a slot raises
+# httpx.PoolTimeout, like a full httpx pool does.
+
+def _h2_installed() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+WEBHOOK_HTTP2 = os.getenv("WEBHOOK_HTTP2", "true").lower() == "true" and _h2_installed()
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "100"))
+WEBHOOK_MAX_CONNECTIONS_PER_HOST = int(os.getenv("WEBHOOK_MAX_CONNECTIONS_PER_HOST", "10"))
+WEBHOOK_MAX_KEEPALIVE = int(os.getenv("WEBHOOK_MAX_KEEPALIVE", "20"))
+WEBHOOK_KEEPALIVE_SECONDS = float(os.getenv("WEBHOOK_KEEPALIVE_SECONDS", "30"))
+WEBHOOK_CONNECT_TIMEOUT_SECONDS = float(os.getenv("WEBHOOK_CONNECT_TIMEOUT_SECONDS", "3"))
+WEBHOOK_TIMEOUT_SECONDS = float(os.getenv("WEBHOOK_TIMEOUT_SECONDS", "5"))
+WEBHOOK_POOL_TIMEOUT_SECONDS = float(os.getenv("WEBHOOK_POOL_TIMEOUT_SECONDS", "5"))
+
+USER_AGENT = "crm-saas-webhooks/1.0"
+
+
+class _Shared:
+    """The loop thread and everything bound to its loop."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="http-client", daemon=True)
+        self.client: Optional[httpx.AsyncClient] = None
+        self.host_slots: Dict[str, asyncio.Semaphore] = {}
+        self.thread.start()
+
+    def get_client(self) -> httpx.AsyncClient:
+        # Only touched from the loop thread: no lock needed
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                http2=WEBHOOK_HTTP2,
+                limits=httpx.Limits(
+                    max_connections=WEBHOOK_MAX_CONNECTIONS,
+                    max_keepalive_connections=WEBHOOK_MAX_KEEPALIVE,
+                    keepalive_expiry=WEBHOOK_KEEPALIVE_SECONDS
+                ),
+                timeout=httpx.Timeout(
+                    WEBHOOK_TIMEOUT_SECONDS,
+                    connect=WEBHOOK_CONNECT_TIMEOUT_SECONDS,
+                    pool=WEBHOOK_POOL_TIMEOUT_SECONDS
+                ),
+                headers={"User-Agent": USER_AGENT}
+            )
+        return self.client
+
+    def host_slot(self, origin: str) -> asyncio.Semaphore:
+        slot = self.host_slots.get(origin)
+        if slot is None:
+            slot = self.host_slots[origin] = asyncio.Semaphore(WEBHOOK_MAX_CONNECTIONS_PER_HOST)
+        return slot
+
+    async def aclose(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+
+_lock = threading.Lock()
+_shared: Optional[_Shared] = None
+_stats_lock = threading.Lock()
+_stats = {"requests": 0, "errors": 0, "pool_timeouts": 0}
+
+
+def _count(key: str):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def _get_shared() -> _Shared:
+    global _shared
+    with _lock:
+        if _shared is None or not _shared.thread.is_alive():
+            _shared = _Shared()
+        return _shared
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def submit(coro) -> Future:
+    """Schedules `coro` on the client's loop; returns a concurrent.futures.Future."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_shared().loop)
+
+
+def run(coro, timeout: Optional[float] = None):
+    """Runs `coro` on the client's loop and waits for its result. For sync code only."""
+    return submit(coro).result(timeout)
+
+
+async def post(url: str, **kwargs) -> httpx.Response:
+    """POST through the shared client; call it from coroutines passed to run()/submit()."""
+    shared = _shared
+    if shared is None or asyncio.get_running_loop() is not shared.loop:
+        raise RuntimeError("http_client_service.post() must run on the client's loop: use run() or submit()")
+
+    origin = _origin(url)
+    slot = shared.host_slot(origin)
+    try:
+        await asyncio.wait_for(slot.acquire(), WEBHOOK_POOL_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        _count("pool_timeouts")
+        raise httpx.PoolTimeout(f"All {WEBHOOK_MAX_CONNECTIONS_PER_HOST} connections to {origin} are busy")
+    try:
+        _count("requests")
+        return await shared.get_client().post(url, **kwargs)
+    except Exception:
+        _count("errors")
+        raise
+    finally:
+        slot.release()
+
+
+def close(timeout: float = 5.0):
+    """Closes the client's connections and stops its loop (app shutdown). The next run() starts a new one."""
+    global _shared
+    with _lock:
+        shared, _shared = _shared, None
+    if shared is None:
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(shared.aclose(), shared.loop).result(timeout)
+    except Exception as e:
+        print(f"⚠️ Webhook client close failed: {e}")
+    finally:
+        shared.loop.call_soon_threadsafe(shared.loop.stop)
+        shared.thread.join(timeout)
+
+
+def stats() -> dict:
+    with _stats_lock:
+        result = dict(_stats)
+    shared = _shared
+    result.update({
+        "http2": WEBHOOK_HTTP2,
+        "max_connections": WEBHOOK_MAX_CONNECTIONS,
+        "max_connections_per_host": WEBHOOK_MAX_CONNECTIONS_PER_HOST,
+        "hosts": len(shared.host_slots) if shared is not None else 0
+    })
+    return result
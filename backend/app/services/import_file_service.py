@@ -0,0 +1,80 @@
+import csv
+import io
+from itertools import islice
+from typing import IO, Iterable, Iterator, List, Optional
+
+# Streaming readers for spreadsheet uploads. Rows are yielded one at a time as
+# tuples, so memory stays bounded by the chunk size instead of the file size.
+
+SUPPORTED_EXTENSIONS = ('.xlsx', '.xlsm', '.csv')
+CHUNK_SIZE = 1000
+
+
+def is_supported(filename: str) -> bool:
+    return bool(filename) and filename.lower().endswith(SUPPORTED_EXTENSIONS)
+
+
+def iter_rows(fileobj: IO[bytes], filename: str) -> Iterator[tuple]:
+    """
+    Yields every row of the first sheet (header included) as a tuple of values.
+    `fileobj` must be a seekable binary file, e.g. UploadFile.file (a
+    SpooledTemporaryFile that rolls over to disk) or a file opened from disk.
+    """
+    fileobj.seek(0)
+    if filename.lower().endswith('.csv'):
+        yield from _iter_csv(fileobj)
+    else:
+        yield from _iter_xlsx(fileobj)
+
+
+def count_data_rows(fileobj: IO[bytes], filename: str) -> Optional[int]:
+    """Number of data rows (header excluded), or None when the workbook doesn't declare its dimensions."""
+    fileobj.seek(0)
+    if filename.lower().endswith('.csv'):
+        total = sum(1 for _ in _iter_csv(fileobj))
+    else:
+        from openpyxl import load_workbook
+        wb = load_workbook(fileobj, read_only=True, data_only=True)
+        try:
+            total = wb.active.max_row
+        finally:
+            wb.close()
+    return max(total - 1, 0) if total is not None else None
+
+
+def _iter_xlsx(fileobj: IO[bytes]) -> Iterator[tuple]:
+    from openpyxl import load_workbook
+
+    # read_only streams the sheet XML instead of building the whole cell graph
+    wb = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        for row in ws.iter_rows(values_only=True):
+            yield row
+    finally:
+        wb.close()
+
+
+def _iter_csv(fileobj: IO[bytes]) -> Iterator[tuple]:
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', errors='replace', newline='')
+    try:
+        sample = text.read(64 * 1024)
+        text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=';,\t')
+        except csv.Error:
+            dialect = csv.excel
+        for row in csv.reader(text, dialect):
+            yield tuple(value if value != '' else None for value in row)
+    finally:
+        # Don't let the wrapper close the caller's file
+        text.detach()
+
+
+def chunked(rows: Iterable, size: int = CHUNK_SIZE) -> Iterator[List]:
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
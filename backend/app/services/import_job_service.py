@@ -0,0 +1,244 @@
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Optional
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.sql_models import ImportJob
+from app.services import dashboard_service, import_file_service
+from app.services.lead_import_service import LeadImporter, map_lead_columns
+from app.services.product_import_service import ProductImporter, map_product_columns
+
+# Spreadsheet imports run as jobs: the upload is saved (local disk, plus
+# Supabase Storage when configured so another instance can resume it), and a
+# worker processes it in chunks, committing each chunk's rows together with
+# the job's progress. A job interrupted mid-way resumes after its last
+# committed chunk, either from the stale-job sweep or POST /tenant/imports/{id}/resume.
+
+if os.environ.get("VERCEL"):
+    IMPORT_DIR = "/tmp/imports"
+else:
+    BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    IMPORT_DIR = os.path.join(BASE_DIR, "imports")
+
+try:
+    os.makedirs(IMPORT_DIR, exist_ok=True)
+except Exception as e:
+    print(f"Warning: Could not create imports directory {IMPORT_DIR}: {e}")
+
+STALE_AFTER_SECONDS = int(os.getenv("IMPORT_JOB_STALE_SECONDS", "300"))
+MAX_ATTEMPTS = 5
+MAX_ERROR_DETAILS = 500
+JOB_KINDS = ("leads", "products")
+
+
+def create_job(db: Session, tenant_id, tenant_slug: str, kind: str, upload, user_email: str) -> ImportJob:
+    """Saves the upload and records a pending job. The caller schedules run_job()."""
+    job_id = uuid.uuid4()
+    ext = os.path.splitext(upload.filename)[1].lower()
+    local_path = os.path.join(IMPORT_DIR, f"{job_id}{ext}")
+
+    upload.file.seek(0)
+    with open(local_path, "wb") as out:
+        shutil.copyfileobj(upload.file, out, 1024 * 1024)
+
+    storage_path = None
+    try:
+        from app.services import storage_service
+        if storage_service.get_client():
+            with open(local_path, "rb") as f:
+                storage_service.upload_file(f, f"{job_id}{ext}", tenant_slug, "imports")
+            storage_path = f"{tenant_slug}/imports/{job_id}{ext}"
+    except Exception as e:
+        print(f"⚠️ Import file not copied to storage, resume limited to this instance: {e}")
+
+    job = ImportJob(
+        id=job_id,
+        tenant_id=tenant_id,
+        kind=kind,
+        filename=upload.filename,
+        local_path=local_path,
+        storage_path=storage_path,
+        user_email=user_email,
+        status="pending",
+        error_details=[]
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def serialize_job(job: ImportJob) -> dict:
+    progress = None
+    if job.total_rows:
+        progress = round(min(job.processed_rows or 0, job.total_rows) * 100 / job.total_rows, 1)
+    elif job.status == "completed":
+        progress = 100.0
+    return {
+        "id": str(job.id),
+        "kind": job.kind,
+        "filename": job.filename,
+        "status": job.status,
+        "total_rows": job.total_rows,
+        "processed_rows": job.processed_rows or 0,
+        "progress": progress,
+        "created": job.created_count or 0,
+        "updated": job.updated_count or 0,
+        "errors": job.error_count or 0,
+        "error_details": job.error_details or [],
+        "message": job.message,
+        "stale": is_stale(job),
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None
+    }
+
+
+def _stale_before() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(seconds=STALE_AFTER_SECONDS)
+
+
+def is_stale(job: ImportJob) -> bool:
+    if job.status not in ("pending", "running") or not job.updated_at:
+        return False
+    updated_at = job.updated_at if job.updated_at.tzinfo else job.updated_at.replace(tzinfo=timezone.utc)
+    return updated_at < _stale_before()
+
+
+def _claim(db: Session, job_id, allow_failed: bool = False) -> bool:
+    """Atomically moves a job to 'running'; only one worker can win."""
+    claimable = [
+        ImportJob.status == "pending",
+        and_(ImportJob.status == "running", ImportJob.updated_at < _stale_before())
+    ]
+    if allow_failed:
+        claimable.append(ImportJob.status == "failed")
+
+    claimed = db.query(ImportJob).filter(ImportJob.id == job_id, or_(*claimable)).update({
+        ImportJob.status: "running",
+        ImportJob.attempts: ImportJob.attempts + 1,
+        ImportJob.message: None,
+        ImportJob.updated_at: datetime.now(timezone.utc)
+    }, synchronize_session=False)
+    db.commit()
+    return claimed == 1
+
+
+def _local_file(job: ImportJob) -> Optional[str]:
+    if job.local_path and os.path.exists(job.local_path):
+        return job.local_path
+    if not job.storage_path:
+        return None
+    # Resuming on another instance: fetch the upload back from storage
+    from app.services import storage_service
+    ext = os.path.splitext(job.filename)[1].lower()
+    local_path = os.path.join(IMPORT_DIR, f"{job.id}{ext}")
+    with open(local_path, "wb") as out:
+        out.write(storage_service.download_file(job.storage_path))
+    return local_path
+
+
+def _cleanup_files(job: ImportJob):
+    try:
+        if job.local_path and os.path.exists(job.local_path):
+            os.remove(job.local_path)
+        if job.storage_path:
+            from app.services import storage_service
+            storage_service.delete_file(job.storage_path)
+    except Exception as e:
+        print(f"⚠️ Could not remove import file for job {job.id}: {e}")
+
+
+def run_job(job_id, allow_failed: bool = False) -> Optional[str]:
+    """Processes (or resumes) a job in its own session. Returns the final status, or None if not claimed."""
+    db = SessionLocal()
+    try:
+        if not _claim(db, job_id, allow_failed):
+            return None
+        job = db.query(ImportJob).filter(ImportJob.id == job_id).first()
+        if not job.started_at:
+            job.started_at = datetime.now(timezone.utc)
+
+        path = _local_file(job)
+        if not path:
+            job.status = "failed"
+            job.message = "Arquivo da importação não está mais disponível. Envie o arquivo novamente."
+            db.commit()
+            return job.status
+
+        with open(path, "rb") as f:
+            if job.total_rows is None:
+                job.total_rows = import_file_service.count_data_rows(f, job.filename)
+            db.commit()
+
+            rows = import_file_service.iter_rows(f, job.filename)
+            header_row = next(rows, None) or ()
+            if job.kind == "leads":
+                importer = LeadImporter(db, job.tenant_id, job.user_email, map_lead_columns(header_row))
+            else:
+                importer = ProductImporter(db, job.tenant_id, map_product_columns(header_row))
+
+            # Skip what previous attempts already committed
+            done = job.processed_rows or 0
+            if done:
+                next(islice(rows, done, done), None)
+
+            base_created, base_updated, base_errors = job.created_count or 0, job.updated_count or 0, job.error_count or 0
+            base_details = list(job.error_details or [])
+            first_row = 2 + done
+
+            for chunk in import_file_service.chunked(rows):
+                importer.import_rows(chunk, first_row)
+                first_row += len(chunk)
+
+                job.processed_rows = first_row - 2
+                job.created_count = base_created + importer.stats["created"]
+                job.updated_count = base_updated + importer.stats["updated"]
+                job.error_count = base_errors + importer.stats["errors"]
+                job.error_details = (base_details + importer.row_errors)[:MAX_ERROR_DETAILS]
+                # Chunk rows and progress commit together: the resume point is exact
+                db.commit()
+                if job.kind == "leads":
+                    dashboard_service.invalidate_dashboard(job.tenant_id)
+
+        job.status = "completed"
+        job.finished_at = datetime.now(timezone.utc)
+        if job.total_rows is None:
+            job.total_rows = job.processed_rows
+        db.commit()
+        _cleanup_files(job)
+        return job.status
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ Import job {job_id} failed: {e}")
+        job = db.query(ImportJob).filter(ImportJob.id == job_id).first()
+        if job:
+            job.status = "failed"
+            job.message = str(e)
+            db.commit()
+        return "failed"
+    finally:
+        db.close()
+
+
+def resume_stale_jobs() -> int:
+    """Picks up jobs whose worker died (running without progress) or never started."""
+    db = SessionLocal()
+    try:
+        job_ids = [row.id for row in db.query(ImportJob.id).filter(
+            ImportJob.status.in_(["pending", "running"]),
+            ImportJob.updated_at < _stale_before(),
+            ImportJob.attempts < MAX_ATTEMPTS
+        ).order_by(ImportJob.created_at).all()]
+    finally:
+        db.close()
+
+    resumed = 0
+    for job_id in job_ids:
+        if run_job(job_id):
+            resumed += 1
+    return resumed
@@ -0,0 +1,224 @@
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import case, func, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.services.import_file_service import chunked
+from app.models.sql_models import (
+    Lead as SQLLead,
+    LeadHistory as SQLLeadHistory,
+    Customer as SQLCustomer
+)
+
+BATCH_SIZE = 1000
+
+# Spreadsheet column -> accepted header names
+LEAD_COLUMNS = {
+    "nome": ["nome", "lead", "cliente", "name"],
+    "telefone": ["telefone", "celular", "whatsapp", "phone", "tel"],
+    "email": ["email", "e-mail", "mail"],
+    "origem": ["origem", "source", "canal"],
+    "responsavel": ["responsavel", "dono", "owner", "responsible"],
+    "status": ["status", "etapa", "stage"],
+    "valor": ["valor", "oportunidade", "value", "price"],
+    "observacoes": ["observacoes", "notas", "obs", "notes"]
+}
+
+
+def map_lead_columns(header_row) -> Dict[str, Optional[int]]:
+    headers = [str(h).lower().strip() if h is not None else "" for h in header_row]
+
+    def find_col_idx(possible_names):
+        for idx, h in enumerate(headers):
+            if h in possible_names: return idx
+        return None
+
+    return {key: find_col_idx(names) for key, names in LEAD_COLUMNS.items()}
+
+
+class LeadImporter:
+    """
+    Set-based lead import. Existing leads (matched by name) and customers
+    (matched by lead_id, email or phone, like sync_customer_from_lead) are
+    loaded once; each batch of rows is then written with one upsert for
+    leads, one for customers and one insert for history.
+    """
+
+    def __init__(self, db: Session, tenant_id, user_name: str, col_mapping: Dict[str, Optional[int]]):
+        self.db = db
+        self.tenant_id = uuid.UUID(str(tenant_id))
+        self.user_name = user_name
+        self.col_mapping = col_mapping
+        self.stats = {"created": 0, "updated": 0, "errors": 0}
+        self.row_errors: List[Dict[str, Any]] = []
+        self._preload()
+
+    def _preload(self):
+        self.lead_ids: Dict[str, uuid.UUID] = {}
+        for lead_id, name in self.db.query(SQLLead.id, SQLLead.name).filter(SQLLead.tenant_id == self.tenant_id):
+            self.lead_ids.setdefault(name, lead_id)
+
+        self.customer_state: Dict[uuid.UUID, tuple] = {}
+        self.customer_index: Dict[str, Dict[Any, Dict[uuid.UUID, None]]] = {"lead_id": {}, "email": {}, "phone": {}}
+        rows = self.db.query(
+            SQLCustomer.id, SQLCustomer.lead_id, SQLCustomer.email, SQLCustomer.phone
+        ).filter(SQLCustomer.tenant_id == self.tenant_id)
+        for cust_id, lead_id, email, phone in rows:
+            self._index_customer(cust_id, lead_id, email, phone)
+
+    def _row_data(self, row) -> Dict[str, str]:
+        row_data = {}
+        for key, idx in self.col_mapping.items():
+            val = row[idx] if idx is not None and idx < len(row) else None
+            row_data[key] = str(val) if val is not None else ""
+        return row_data
+
+    def import_rows(self, rows: Iterable, first_row: int = 2) -> Dict[str, int]:
+        """Imports data rows (header excluded); `first_row` is the sheet row number of the first one. Does not commit."""
+        for batch in chunked(rows, BATCH_SIZE):
+            self._import_batch(batch, first_row)
+            first_row += len(batch)
+        return self.stats
+
+    def _import_batch(self, rows: List, first_row: int):
+        new_leads: Dict[uuid.UUID, Dict[str, Any]] = {}
+        updated_leads: Dict[uuid.UUID, Dict[str, Any]] = {}
+        history = []
+        syncs = []
+        pending_names: Dict[str, uuid.UUID] = {}
+        created = updated = errors = 0
+
+        for row_number, row in enumerate(rows, start=first_row):
+            try:
+                row_data = self._row_data(row)
+                if not row_data["nome"]: continue
+
+                lead_id = pending_names.get(row_data["nome"]) or self.lead_ids.get(row_data["nome"])
+                if lead_id:
+                    target = new_leads.get(lead_id) or updated_leads.setdefault(lead_id, {
+                        "id": lead_id, "tenant_id": self.tenant_id, "name": row_data["nome"],
+                        "funil_stage": None, "value": None, "observations": None, "responsible_user": None
+                    })
+                    target["phone"] = row_data["telefone"]
+                    target["email"] = row_data["email"]
+                    target["origin"] = row_data["origem"]
+                    target["funil_stage"] = row_data["status"] or target["funil_stage"]
+                    updated += 1
+                else:
+                    lead_id = uuid.uuid4()
+                    new_leads[lead_id] = {
+                        "id": lead_id,
+                        "tenant_id": self.tenant_id,
+                        "name": row_data["nome"],
+                        "phone": row_data["telefone"],
+                        "email": row_data["email"],
+                        "origin": row_data["origem"],
+                        "funil_stage": row_data["status"] or "new",
+                        "value": float(row_data["valor"]) if row_data["valor"] else 0.0,
+                        "observations": row_data["observacoes"],
+                        "responsible_user": row_data["responsavel"]
+                    }
+                    pending_names[row_data["nome"]] = lead_id
+                    created += 1
+
+                history.append({"lead_id": lead_id, "type": "note", "description": "Importado via Excel", "user_name": self.user_name})
+                lead = new_leads.get(lead_id) or updated_leads[lead_id]
+                syncs.append({"id": lead_id, "name": lead["name"], "email": lead["email"], "phone": lead["phone"]})
+            except Exception as e:
+                print(f"Error importing row: {e}")
+                errors += 1
+                self.row_errors.append({"row": row_number, "error": str(e)})
+
+        leads = list(new_leads.values()) + list(updated_leads.values())
+        if not leads:
+            self.stats["errors"] += errors
+            return
+
+        try:
+            with self.db.begin_nested():
+                customers = self._plan_customers(syncs)
+                self._upsert_leads(leads)
+                self._upsert_customers(customers)
+                self.db.execute(insert(SQLLeadHistory), history)
+        except Exception as e:
+            # The whole batch was rolled back; count its rows and resync the lookups
+            print(f"Error importing batch: {e}")
+            self.stats["errors"] += errors + created + updated
+            self.row_errors.append({"row": f"{first_row}-{first_row + len(rows) - 1}", "error": str(e)})
+            self._preload()
+            return
+
+        self.lead_ids.update(pending_names)
+        self.stats["created"] += created
+        self.stats["updated"] += updated
+        self.stats["errors"] += errors
+
+    def _plan_customers(self, syncs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Replays sync_customer_from_lead for each imported row, in order, against the in-memory index."""
+        planned: Dict[uuid.UUID, Dict[str, Any]] = {}
+        for lead in syncs:
+            cust_id = self._find_customer("lead_id", lead["id"])
+            if not cust_id and lead["email"]:
+                cust_id = self._find_customer("email", lead["email"])
+            if not cust_id and lead["phone"]:
+                cust_id = self._find_customer("phone", lead["phone"])
+            if not cust_id:
+                cust_id = uuid.uuid4()
+
+            planned[cust_id] = {
+                "id": cust_id,
+                "tenant_id": self.tenant_id,
+                "name": lead["name"],
+                "email": lead["email"],
+                "phone": lead["phone"],
+                "lead_id": lead["id"],
+                "customer_type": "lead"
+            }
+            self._index_customer(cust_id, lead["id"], lead["email"], lead["phone"])
+        return list(planned.values())
+
+    def _find_customer(self, field: str, value) -> Optional[uuid.UUID]:
+        return next(iter(self.customer_index[field].get(value, ())), None)
+
+    def _index_customer(self, cust_id, lead_id, email, phone):
+        previous = self.customer_state.get(cust_id)
+        if previous:
+            for field, value in zip(("lead_id", "email", "phone"), previous):
+                self.customer_index[field].get(value, {}).pop(cust_id, None)
+        self.customer_state[cust_id] = (lead_id, email, phone)
+        for field, value in zip(("lead_id", "email", "phone"), (lead_id, email, phone)):
+            if value:
+                # dicts as ordered sets: first match is the oldest, like .first() on the heap
+                self.customer_index[field].setdefault(value, {})[cust_id] = None
+
+    def _upsert_leads(self, leads: List[Dict[str, Any]]):
+        stmt = pg_insert(SQLLead.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[SQLLead.__table__.c.id],
+            set_={
+                "phone": stmt.excluded.phone,
+                "email": stmt.excluded.email,
+                "origin": stmt.excluded.origin,
+                "funil_stage": func.coalesce(stmt.excluded.funil_stage, SQLLead.__table__.c.funil_stage),
+                "updated_at": func.now()
+            }
+        )
+        self.db.execute(stmt, leads)
+
+    def _upsert_customers(self, customers: List[Dict[str, Any]]):
+        if not customers: return
+        table = SQLCustomer.__table__
+        stmt = pg_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.id],
+            set_={
+                "name": stmt.excluded.name,
+                "email": stmt.excluded.email,
+                "phone": stmt.excluded.phone,
+                "lead_id": stmt.excluded.lead_id,
+                # Don't downgrade a 'cliente' back to 'lead' if it was already upgraded
+                "customer_type": case((table.c.customer_type == "cliente", "cliente"), else_=stmt.excluded.customer_type),
+                "updated_at": func.now()
+            }
+        )
+        self.db.execute(stmt, customers)
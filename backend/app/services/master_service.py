@@ -1,5 +1,4 @@
 import uuid
-from openpyxl import Workbook
 from app.services.excel_service import read_sheet, write_sheet
 
 # backend/app/services/master_service.py
@@ -33,6 +32,7 @@ def criar_ambiente(data: dict):
     write_sheet("ambientes.xlsx", "ambientes", ambientes)
 
     # cria excel do tenant
+    from openpyxl import Workbook
     wb = Workbook()
     ws = wb.active
     ws.title = "users"
@@ -0,0 +1,243 @@
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from app.services import slow_query_service
+
+# Per-route request metrics, exported in the Prometheus text format on /metrics.
+# MetricsMiddleware (plain ASGI) times each request and counts its response
+# bytes; the engine hooks add each statement's count and time to the request in
+# the current context (contextvars follow handlers into the threadpool). Per
+# request the cost is a few perf_counter() calls and one lock; routes are
+# labelled by their template, so label cardinality stays bounded.
+#
+# Counters are per worker process (per instance on serverless): Prometheus sums
+# them across scrape targets.
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+BYTES_BUCKETS = (256, 1024, 10240, 102400, 1048576, 10485760)
+
+# Requests that match no route (404 scans) share one label
+UNMATCHED_ROUTE = "unmatched"
+
+
+class Histogram:
+    """Bucket counts per label set; exported cumulative. Callers hold _lock."""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series: Dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float):
+        series = self.series.get(labels)
+        if series is None:
+            # [bucket counts..., +Inf count, sum]
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+
+class RequestStats:
+    __slots__ = ("statements", "db_seconds", "scope")
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.scope = scope
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_metrics", default=None)
+_lock = threading.Lock()
+_requests: Dict[Tuple[str, str, str], int] = {}
+_background = {"statements": 0, "db_seconds": 0.0}
+_slow_threshold = slow_query_service.threshold_seconds()
+
+request_duration = Histogram("http_request_duration_seconds", "Request latency by route", LATENCY_BUCKETS)
+request_statements = Histogram("http_request_db_statements", "SQL statements executed per request", STATEMENT_BUCKETS)
+request_db_time = Histogram("http_request_db_seconds", "Time spent in SQL statements per request", DB_TIME_BUCKETS)
+response_bytes = Histogram("http_response_bytes", "Response body size", BYTES_BUCKETS)
+HISTOGRAMS = (request_duration, request_statements, request_db_time, response_bytes)
+
+
+# --- SQLAlchemy hooks ---
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_metrics_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    stats = _current.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+    else:
+        # Scheduler jobs, startup migrations, background tasks
+        with _lock:
+            _background["statements"] += 1
+            _background["db_seconds"] += elapsed
+    if _slow_threshold is not None and elapsed >= _slow_threshold:
+        slow_query_service.record(
+            statement, parameters, elapsed,
+            stats.scope if stats is not None else None,
+            # EXPLAIN replays the statement on the sync (psycopg2) engine
+            explainable=conn.dialect.driver == "psycopg2" and not executemany
+        )
+
+def instrument_engine(engine):
+    """Counts and times the engine's statements (for the async engine, pass its sync_engine)."""
+    from sqlalchemy import event
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# --- Middleware ---
+
+def _record(method: str, route: str, status: int, duration: float, stats: RequestStats, body_bytes: int):
+    labels = (method, route)
+    with _lock:
+        key = (method, route, str(status))
+        _requests[key] = _requests.get(key, 0) + 1
+        request_duration.observe(labels, duration)
+        request_statements.observe(labels, stats.statements)
+        request_db_time.observe(labels, stats.db_seconds)
+        response_bytes.observe(labels, body_bytes)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status, DB statements/time and body bytes per route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _current.set(stats)
+        response = {"status": 500, "bytes": 0}
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            # FastAPI leaves the matched route in the scope
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            _record(scope["method"], route, response["status"], time.perf_counter() - started, stats, response["bytes"])
+
+
+# --- Exposition ---
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _labels(names: Tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _render_histogram(histogram: Histogram, lines: List[str]):
+    lines.append(f"# HELP {histogram.name} {histogram.help_text}")
+    lines.append(f"# TYPE {histogram.name} histogram")
+    names = ("method", "route")
+    for labels, series in sorted(histogram.series.items()):
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, series):
+            cumulative += count
+            le = 'le="%s"' % float(bound)
+            lines.append(f"{histogram.name}_bucket{_labels(names, labels, le)} {cumulative}")
+        cumulative += series[len(histogram.buckets)]
+        le = 'le="+Inf"'
+        lines.append(f"{histogram.name}_bucket{_labels(names, labels, le)} {cumulative}")
+        lines.append(f"{histogram.name}_sum{_labels(names, labels)} {series[-1]}")
+        lines.append(f"{histogram.name}_count{_labels(names, labels)} {cumulative}")
+
+def _render_gauges(name: str, help_text: str, metric_type: str, samples: List[Tuple[Dict[str, str], float]], lines: List[str]):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {metric_type}")
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {value}")
+
+def render() -> str:
+    """The Prometheus text exposition (version 0.0.4) of every metric."""
+    lines: List[str] = []
+    with _lock:
+        _render_gauges(
+            "http_requests_total", "Requests by route and status", "counter",
+            [({"method": m, "route": r, "status": s}, count) for (m, r, s), count in sorted(_requests.items())],
+            lines
+        )
+        for histogram in HISTOGRAMS:
+            _render_histogram(histogram, lines)
+        background = dict(_background)
+    _render_gauges("db_background_statements_total", "SQL statements executed outside requests", "counter",
+                   [({}, background["statements"])], lines)
+    _render_gauges("db_background_seconds_total", "Time spent in SQL statements outside requests", "counter",
+                   [({}, background["db_seconds"])], lines)
+    _render_process_metrics(lines)
+    return "\n".join(lines) + "\n"
+
+def _render_process_metrics(lines: List[str]):
+    # Pools and caches already keep their own stats; re-export them as gauges
+    from app import database
+    from app.services import tenant_service, password_service
+
+    pools = database.pool_stats()
+    for key, help_text in (("in_use", "Connections checked out"), ("max_in_use", "Peak connections checked out"),
+                           ("checkouts", "Connection checkouts"), ("timeouts", "Connection checkout timeouts"),
+                           ("wait_avg_ms", "Average checkout wait")):
+        metric_type = "counter" if key in ("checkouts", "timeouts") else "gauge"
+        name = f"db_pool_{key}" + ("_total" if metric_type == "counter" else "")
+        _render_gauges(name, help_text, metric_type, [({"pool": p["pool"]}, p[key]) for p in pools], lines)
+
+    from app.deps import token_cache
+    from app.services.dashboard_service import dashboard_cache
+    from app.services.outbox_service import automation_index
+    caches = {
+        "tenants": tenant_service.tenant_cache.stats(),
+        "tokens": token_cache.stats(),
+        "dashboard": dashboard_cache.stats(),
+        "automations": automation_index.stats()
+    }
+    for key in ("hits", "misses"):
+        _render_gauges(f"cache_{key}_total", f"Cache {key}", "counter",
+                       [({"cache": name}, stats.get(key, 0)) for name, stats in caches.items()], lines)
+    _render_gauges("cache_entries", "Cached entries", "gauge",
+                   [({"cache": name}, stats.get("size", 0)) for name, stats in caches.items()], lines)
+
+    hashing = password_service.stats()
+    _render_gauges("password_hash_rejected_total", "Hash operations shed because the pool was full", "counter",
+                   [({}, hashing["rejected"])], lines)
+    _render_gauges("password_rehashed_total", "Deprecated hashes upgraded on login", "counter",
+                   [({}, hashing["rehashed"])], lines)
+
+    # Only once a webhook went out: /metrics shouldn't pull in httpx
+    webhooks = sys.modules.get("app.services.http_client_service")
+    if webhooks is not None:
+        webhook_stats = webhooks.stats()
+        for key, help_text in (("requests", "Outgoing webhook requests"), ("errors", "Outgoing webhook requests that failed"),
+                               ("pool_timeouts", "Webhooks that waited too long for a connection to their host")):
+            _render_gauges(f"webhook_{key}_total", help_text, "counter", [({}, webhook_stats[key])], lines)
@@ -0,0 +1,200 @@
+import time
+from typing import Callable, List, Tuple, Union
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+from app.services.finance_rollup_service import ROLLUP_SETUP_SQL
+from app.services import commission_rollup_service
+
+# Versioned schema migrations. public.schema_migrations records every applied
+# version; on startup one query reads the current version and, when it matches
+# LATEST_VERSION, nothing else runs. To change the schema, append a migration
+# with the next version number — never edit or renumber one already shipped.
+#
+# A step is a SQL string or a callable taking the Connection. Each migration
+# runs in its own transaction together with its ledger row, so a failure
+# leaves it (and everything after it) pending for the next start.
+
+Step = Union[str, Callable[[Connection], None]]
+
+LEDGER_DDL = """
+CREATE TABLE IF NOT EXISTS public.schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name VARCHAR NOT NULL,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+"""
+
+# pg_advisory_xact_lock key: instances cold-starting together apply each migration once
+MIGRATION_LOCK_KEY = 7346001
+
+
+def create_tables(*table_names: str) -> Callable[[Connection], None]:
+    """Step creating the given model tables, skipping existing ones."""
+    def step(conn: Connection):
+        from app.models.sql_models import Base
+        Base.metadata.create_all(bind=conn, tables=[Base.metadata.tables[f"public.{name}"] for name in table_names])
+    return step
+
+
+# The tables that existed when the ledger was introduced. Frozen like any shipped
+# migration: a new model gets its own migration with create_tables("its_table").
+# create_all builds them from the current models, so a column or index added to
+# one of these tables later must also be written as idempotent DDL (IF NOT EXISTS)
+# in its migration, as bot_session_keys does.
+BASELINE_TABLES = (
+    "niches", "tenants", "automations", "finance_categories", "finance_rollups",
+    "import_jobs", "integrations", "leads_crm", "payment_methods", "pipeline_stages",
+    "plans", "products", "professionals", "suppliers", "users", "bot_sessions",
+    "customers", "lead_history", "lead_tasks", "notifications", "plan_items",
+    "professional_performance", "push_subscriptions", "appointments", "subscriptions",
+    "commissions", "finance_entries"
+)
+
+
+MIGRATIONS: List[Tuple[int, str, List[Step]]] = [
+    (1, "baseline_tables", [create_tables(*BASELINE_TABLES)]),
+    (2, "finance_entries_columns", [
+        "ALTER TABLE public.finance_entries ADD COLUMN IF NOT EXISTS supplier_id UUID;",
+        "ALTER TABLE public.finance_entries ADD COLUMN IF NOT EXISTS appointment_id UUID;",
+        "ALTER TABLE public.finance_entries ADD COLUMN IF NOT EXISTS subscription_id UUID;",
+        "ALTER TABLE public.finance_entries ADD COLUMN IF NOT EXISTS service_id UUID;",
+        "ALTER TABLE public.finance_entries ADD COLUMN IF NOT EXISTS installment_number INTEGER DEFAULT 1;",
+        "ALTER TABLE public.finance_entries ADD COLUMN IF NOT EXISTS total_installments INTEGER DEFAULT 1;"
+    ]),
+    (3, "leads_crm_columns", [
+        "ALTER TABLE public.leads_crm ADD COLUMN IF NOT EXISTS origin VARCHAR;",
+        "ALTER TABLE public.leads_crm ADD COLUMN IF NOT EXISTS observations TEXT;",
+        "ALTER TABLE public.leads_crm ADD COLUMN IF NOT EXISTS responsible_user VARCHAR;"
+    ]),
+    # Formerly backend/migrations/add_modules_allowed.py
+    (4, "users_modules_allowed", [
+        "ALTER TABLE public.users ADD COLUMN IF NOT EXISTS modules_allowed JSON;",
+        "UPDATE public.users SET modules_allowed = '[]'::json WHERE modules_allowed IS NULL;"
+    ]),
+    # Formerly apply_performance_indexes.py
+    (5, "performance_indexes", [
+        "CREATE INDEX IF NOT EXISTS idx_leads_tenant_status ON public.leads_crm (tenant_id, funil_stage);",
+        "CREATE INDEX IF NOT EXISTS idx_leads_tenant_created ON public.leads_crm (tenant_id, created_at DESC);",
+        "CREATE INDEX IF NOT EXISTS idx_finance_tenant_type_status ON public.finance_entries (tenant_id, type, status);",
+        "CREATE INDEX IF NOT EXISTS idx_finance_due_date ON public.finance_entries (due_date DESC);",
+        "CREATE INDEX IF NOT EXISTS idx_users_tenant_id ON public.users (tenant_id);",
+        "CREATE INDEX IF NOT EXISTS idx_customers_tenant_id ON public.customers (tenant_id);"
+    ]),
+    # Appointments: calendar window / keyset pagination
+    (6, "appointments_tenant_start_index", [
+        "CREATE INDEX IF NOT EXISTS idx_appointments_tenant_start ON public.appointments (tenant_id, start_time, id);"
+    ]),
+    # Calendar bundle incremental sync (updated_at tracking)
+    (7, "calendar_sync_updated_at", [
+        "ALTER TABLE public.products ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT now();",
+        "CREATE INDEX IF NOT EXISTS idx_customers_tenant_updated ON public.customers (tenant_id, updated_at);",
+        "CREATE INDEX IF NOT EXISTS idx_products_tenant_updated ON public.products (tenant_id, updated_at);"
+    ]),
+    # Finance overdue sweep
+    (8, "finance_overdue_indexes", [
+        "CREATE INDEX IF NOT EXISTS idx_finance_pending_due ON public.finance_entries (due_date) WHERE status = 'pendente';",
+        "CREATE INDEX IF NOT EXISTS idx_finance_tenant_due_id ON public.finance_entries (tenant_id, due_date, id);"
+    ]),
+    # Financial report rollups (trigger + first backfill)
+    (9, "finance_rollups", [
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_finance_rollups_key ON public.finance_rollups (tenant_id, grain, period_start, type, status, category_id, customer_id, supplier_id) NULLS NOT DISTINCT;",
+        ROLLUP_SETUP_SQL
+    ]),
+    # Commissions dashboard: month range scans and per-professional monthly rollups
+    (10, "commission_rollups", [
+        "CREATE INDEX IF NOT EXISTS idx_commissions_tenant_created ON public.commissions (tenant_id, created_at);",
+        create_tables("commission_rollups"),
+        commission_rollup_service.ROLLUP_SETUP_SQL
+    ]),
+    # Transactional outbox for automation webhooks
+    (11, "automation_outbox", [create_tables("automation_outbox")]),
+    # Batched bot telemetry: upsert on a session key (newest active session per key keeps it)
+    (12, "bot_session_keys", [
+        "ALTER TABLE public.bot_sessions ADD COLUMN IF NOT EXISTS session_key VARCHAR;",
+        """
+        UPDATE public.bot_sessions s SET session_key = k.session_key
+        FROM (
+            SELECT id, session_key,
+                   ROW_NUMBER() OVER (PARTITION BY tenant_id, session_key ORDER BY updated_at DESC NULLS LAST, started_at DESC NULLS LAST) AS rn
+            FROM (
+                SELECT id, tenant_id, updated_at, started_at,
+                       CASE WHEN lead_id IS NOT NULL THEN 'lead:' || lead_id::text ELSE 'name:' || customer_name END AS session_key
+                FROM public.bot_sessions
+                WHERE status = 'active' AND (lead_id IS NOT NULL OR customer_name IS NOT NULL)
+            ) keyed
+        ) k
+        WHERE s.id = k.id AND k.rn = 1 AND s.session_key IS NULL;
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_bot_sessions_key ON public.bot_sessions (tenant_id, session_key);"
+    ])
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn: Connection) -> int:
+    """Highest applied version; 0 when the ledger doesn't exist yet. Leaves no transaction open."""
+    try:
+        version = conn.execute(text("SELECT max(version) FROM public.schema_migrations")).scalar() or 0
+    except DBAPIError:
+        version = 0
+    conn.rollback()
+    return version
+
+
+def _lock(conn: Connection):
+    """Serializes schema changes across instances until the current transaction ends."""
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+
+def _apply(conn: Connection, version: int, name: str, steps: List[Step]) -> bool:
+    """Applies one migration and its ledger row in one transaction. False if another instance already did."""
+    with conn.begin():
+        _lock(conn)
+        applied = conn.execute(
+            text("SELECT 1 FROM public.schema_migrations WHERE version = :version"), {"version": version}
+        ).first()
+        if applied:
+            return False
+        for step in steps:
+            if callable(step):
+                step(conn)
+            else:
+                conn.execute(text(step))
+        conn.execute(
+            text("INSERT INTO public.schema_migrations (version, name) VALUES (:version, :name)"),
+            {"version": version, "name": name}
+        )
+    return True
+
+
+def migrate(bind: Engine) -> int:
+    """Brings the schema to LATEST_VERSION. Returns how many migrations this call applied."""
+    with bind.connect() as conn:
+        version = current_version(conn)
+        if version >= LATEST_VERSION:
+            return 0
+
+        print(f"🚀 Migrating schema from version {version} to {LATEST_VERSION}...")
+        with conn.begin():
+            # Under the lock too: concurrent CREATE TABLE IF NOT EXISTS can still
+            # collide on the table's row type (pg_type unique violation)
+            _lock(conn)
+            conn.execute(text(LEDGER_DDL))
+
+        applied = 0
+        for migration_version, name, steps in MIGRATIONS:
+            if migration_version <= version:
+                continue
+            started = time.perf_counter()
+            try:
+                if _apply(conn, migration_version, name, steps):
+                    applied += 1
+                    print(f"  ✅ {migration_version:03d} {name} ({(time.perf_counter() - started) * 1000:.0f} ms)")
+            except Exception as e:
+                # Later migrations may depend on this one: stop, retry on next start
+                print(f"⚠️ Migration {migration_version:03d} {name} failed: {e}")
+                break
+        return applied
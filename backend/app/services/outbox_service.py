@@ -0,0 +1,257 @@
+import asyncio
+import os
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import JSON, func, insert, literal, or_, select
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.sql_models import Automation, OutboxEvent
+from app.services.cache_service import TTLCache
+
+# Transactional outbox for automation webhooks. enqueue() inserts one row per
+# active webhook automation matching the event in the caller's transaction, so
+# the delivery commits (or rolls back) together with the business change. The
+# dispatcher claims due rows with a lease, posts them concurrently and records
+# the outcome: 2xx -> delivered; 408/429/5xx/network errors -> retried with
+# exponential backoff; other 4xx, or MAX_ATTEMPTS reached -> dead (kept for
+# inspection). Delivery is at-least-once: receivers dedupe on X-Event-Id.
+# Deliveries to an endpoint whose circuit is open, or beyond its host's rate
+# limit, are deferred without using an attempt (see webhook_guard_service).
+#
+# Runs: right after a request that enqueued (its tenant's due rows, as a
+# background task), from the scheduler on long-lived workers, and from
+# /cron/webhook-outbox on serverless.
+
+MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+RETRY_BASE_SECONDS = float(os.getenv("OUTBOX_RETRY_BASE_SECONDS", "10"))
+RETRY_MAX_SECONDS = float(os.getenv("OUTBOX_RETRY_MAX_SECONDS", "3600"))
+BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", "10"))
+# A claimed row is invisible to other dispatchers this long; a dispatcher that
+# dies mid-batch leaves its rows to be retried after it
+LEASE_SECONDS = max(60.0, float(os.getenv("WEBHOOK_TIMEOUT_SECONDS", "5")) * 4)
+MAX_BATCHES_PER_RUN = 10
+MAX_ERROR_LENGTH = 1000
+
+# Per-tenant index of active webhook automations, {trigger_type: (automation ids)};
+# tenants without any cache an empty index, so their events cost no query.
+# Invalidated locally on create/delete; the TTL bounds how long another
+# process may miss a new automation.
+automation_index = TTLCache(
+    ttl_seconds=float(os.getenv("AUTOMATION_INDEX_TTL_SECONDS", "30")),
+    maxsize=int(os.getenv("AUTOMATION_INDEX_SIZE", "4096"))
+)
+# Bumped on every invalidation, so a load that raced one isn't cached
+_generation = 0
+
+
+def _load_index(db: Session, tenant_id) -> Dict[str, Tuple[uuid.UUID, ...]]:
+    index: Dict[str, list] = {}
+    for automation in db.query(Automation.id, Automation.trigger_type, Automation.action_config).filter(
+        Automation.tenant_id == tenant_id,
+        Automation.action_type == "webhook",
+        Automation.active == True
+    ):
+        if (automation.action_config or {}).get("url"):
+            index.setdefault(automation.trigger_type, []).append(automation.id)
+    return {trigger: tuple(ids) for trigger, ids in index.items()}
+
+
+def webhook_automation_ids(db: Session, tenant_id, event_type: str) -> Tuple[uuid.UUID, ...]:
+    """Active webhook automations for the event, from the per-tenant index (empty for most tenants)."""
+    key = str(tenant_id)
+    index = automation_index.get(key)
+    if index is None:
+        generation = _generation
+        index = _load_index(db, tenant_id)
+        if generation == _generation:
+            automation_index.set(key, index)
+    return index.get(event_type, ())
+
+
+def invalidate_automations(tenant_id):
+    """Call after creating, changing or deleting a tenant's automations."""
+    global _generation
+    _generation += 1
+    automation_index.invalidate(str(tenant_id))
+
+
+def enqueue(db: Session, tenant_id, event_type: str, payload: dict) -> int:
+    """
+    Adds the event's deliveries to `db`'s transaction (no commit: they're written
+    with the caller's change). Returns how many; schedule
+    dispatch_pending(tenant_id) after the commit when non-zero.
+    """
+    automation_ids = webhook_automation_ids(db, tenant_id, event_type)
+    if not automation_ids:
+        return 0
+    # Rows are copied from automations that still exist and are active: the
+    # index may be stale in other processes, and a row for a deleted automation
+    # would fail the caller's whole transaction on the foreign key.
+    result = db.execute(insert(OutboxEvent).from_select(
+        ["id", "tenant_id", "automation_id", "event_type", "url", "payload", "status", "attempts", "next_attempt_at"],
+        select(
+            func.gen_random_uuid(),
+            Automation.tenant_id,
+            Automation.id,
+            literal(event_type),
+            Automation.action_config["url"].as_string(),
+            literal(payload, JSON),
+            literal("pending"),
+            literal(0),
+            func.now()
+        ).where(
+            Automation.id.in_(automation_ids),
+            Automation.tenant_id == tenant_id,
+            Automation.active == True
+        )
+    ))
+    return result.rowcount
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with +-20% jitter, so failed deliveries don't retry in lockstep."""
+    delay = min(RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)), RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _claim(db: Session, tenant_id=None, limit: int = BATCH_SIZE) -> List[dict]:
+    """Leases up to `limit` due rows (attempts + 1, next_attempt_at past the lease); returns them as dicts."""
+    now = datetime.now(timezone.utc)
+    query = db.query(OutboxEvent).filter(
+        OutboxEvent.status == "pending",
+        OutboxEvent.next_attempt_at <= now
+    )
+    if tenant_id:
+        query = query.filter(OutboxEvent.tenant_id == tenant_id)
+    rows = query.order_by(OutboxEvent.next_attempt_at).limit(limit).with_for_update(skip_locked=True).all()
+    events = []
+    for row in rows:
+        row.attempts = (row.attempts or 0) + 1
+        row.next_attempt_at = now + timedelta(seconds=LEASE_SECONDS)
+        events.append({"id": str(row.id), "url": row.url, "payload": row.payload, "event_type": row.event_type})
+    db.commit()
+    return events
+
+
+async def _post(semaphore: asyncio.Semaphore, event: dict):
+    """(status_code, error, defer_seconds): defer_seconds is set when no request was made."""
+    import httpx
+    from app.services import http_client_service, webhook_guard_service
+    url = event["url"]
+    async with semaphore:
+        try:
+            wait = webhook_guard_service.acquire(url)
+        except webhook_guard_service.DestinationUnavailable as e:
+            return None, str(e), e.retry_after
+        if wait:
+            await asyncio.sleep(wait)
+        try:
+            response = await http_client_service.post(
+                url,
+                json=event["payload"],
+                headers={"X-Event-Id": event["id"], "X-Event-Type": event["event_type"]}
+            )
+            error = None if response.is_success else f"HTTP {response.status_code}: {response.text[:200]}"
+            webhook_guard_service.record(url, response.status_code, error)
+            return response.status_code, error, None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if not isinstance(e, httpx.PoolTimeout): # our own pool being full says nothing about the endpoint
+                webhook_guard_service.record(url, None, error)
+            return None, error, None
+
+
+async def _deliver_all(events: List[dict]):
+    # Runs on http_client_service's loop: connections are reused across batches and runs.
+    # Every event of the batch is in flight at once, up to CONCURRENCY, so a dead
+    # endpoint costs its own timeout only; once its circuit opens, not even that.
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    return await asyncio.gather(*[_post(semaphore, event) for event in events])
+
+
+def _is_retryable(status_code: Optional[int]) -> bool:
+    return status_code is None or status_code in (408, 429) or status_code >= 500
+
+
+def _record(db: Session, row: OutboxEvent, status_code: Optional[int], error: Optional[str], defer_seconds: Optional[float] = None):
+    now = datetime.now(timezone.utc)
+    if defer_seconds is not None:
+        # Not attempted (circuit open or rate limited): the attempt is given back
+        row.attempts = max((row.attempts or 1) - 1, 0)
+        row.last_error = error
+        row.next_attempt_at = now + timedelta(seconds=defer_seconds)
+        return
+    row.last_status_code = status_code
+    row.last_error = error[:MAX_ERROR_LENGTH] if error else None
+    if error is None:
+        row.status = "delivered"
+        row.delivered_at = now
+    elif not _is_retryable(status_code) or row.attempts >= MAX_ATTEMPTS:
+        row.status = "dead"
+        print(f"💀 Webhook {row.event_type} -> {row.url} dead-lettered after {row.attempts} attempt(s): {error}")
+    else:
+        row.next_attempt_at = now + timedelta(seconds=retry_delay(row.attempts))
+
+
+def dispatch_pending(tenant_id=None) -> int:
+    """Delivers due outbox rows (all tenants, or one). Returns how many were delivered."""
+    from app.services import http_client_service
+    delivered = 0
+    db = SessionLocal()
+    try:
+        for _ in range(MAX_BATCHES_PER_RUN):
+            events = _claim(db, tenant_id)
+            if not events:
+                break
+            # No transaction is open while the requests are in flight: the lease protects the rows
+            results = http_client_service.run(_deliver_all(events))
+            rows = {
+                str(row.id): row
+                for row in db.query(OutboxEvent).filter(OutboxEvent.id.in_([uuid.UUID(e["id"]) for e in events]))
+            }
+            for event, (status_code, error, defer_seconds) in zip(events, results):
+                row = rows.get(event["id"])
+                if row is None:
+                    continue # automation deleted meanwhile (cascade)
+                _record(db, row, status_code, error, defer_seconds)
+                delivered += error is None
+            db.commit()
+            if len(events) < BATCH_SIZE:
+                break
+    finally:
+        db.close()
+    return delivered
+
+
+def redeliver(db: Session, event_id, tenant_id) -> bool:
+    """Puts a dead (or delivered) row back in the queue with a fresh attempt budget."""
+    updated = db.query(OutboxEvent).filter(
+        OutboxEvent.id == event_id,
+        OutboxEvent.tenant_id == tenant_id,
+        or_(OutboxEvent.status == "dead", OutboxEvent.status == "delivered")
+    ).update({
+        OutboxEvent.status: "pending",
+        OutboxEvent.attempts: 0,
+        OutboxEvent.next_attempt_at: datetime.now(timezone.utc)
+    }, synchronize_session=False)
+    db.commit()
+    return updated == 1
+
+
+def serialize_event(row: OutboxEvent) -> dict:
+    return {
+        "id": str(row.id),
+        "automation_id": str(row.automation_id) if row.automation_id else None,
+        "event_type": row.event_type,
+        "url": row.url,
+        "status": row.status,
+        "attempts": row.attempts,
+        "next_attempt_at": row.next_attempt_at.isoformat() if row.status == "pending" and row.next_attempt_at else None,
+        "last_status_code": row.last_status_code,
+        "last_error": row.last_error,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "delivered_at": row.delivered_at.isoformat() if row.delivered_at else None
+    }
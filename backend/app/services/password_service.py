@@ -0,0 +1,117 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable
+from passlib.context import CryptContext
+
+# Password hashing is CPU-bound by design, so it runs on a small dedicated pool
+# instead of the request threadpool. At most WORKERS + MAX_PENDING operations
+# are running or queued; up to MAX_WAITING more callers wait QUEUE_WAIT_SECONDS
+# for one of those slots, and beyond that callers get PasswordHashBusy, so a
+# burst of logins can't tie up every request thread. Each of them holds a request
+# thread, so keep WORKERS + MAX_PENDING + MAX_WAITING below THREADPOOL_SIZE.
+# pbkdf2 (hashlib) and bcrypt release the GIL while hashing.
+
+# Important: Support both PBKDF2 (new) and BCrypt (old/standard) to avoid crashes
+pwd_context = CryptContext(schemes=["pbkdf2_sha256", "bcrypt"], deprecated="auto")
+
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "16"))
+HASH_MAX_WAITING = int(os.getenv("PASSWORD_HASH_MAX_WAITING", "12"))
+HASH_QUEUE_WAIT_SECONDS = float(os.getenv("PASSWORD_HASH_QUEUE_WAIT_SECONDS", "2"))
+HASH_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_HASH_TIMEOUT_SECONDS", "10"))
+
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="password-hash")
+_slots = threading.BoundedSemaphore(HASH_WORKERS + HASH_MAX_PENDING)
+_waiting = threading.BoundedSemaphore(HASH_MAX_WAITING) if HASH_MAX_WAITING > 0 else None
+_stats_lock = threading.Lock()
+_stats = {"completed": 0, "rejected": 0, "rehashed": 0, "rehash_failed": 0}
+
+
+class PasswordHashBusy(Exception):
+    """The hashing pool is full; the caller should answer 503 and let the client retry."""
+
+
+def _count(key: str):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def _release(_future):
+    _slots.release()
+    _count("completed")
+
+
+def _wait_for_slot() -> bool:
+    """Waits up to HASH_QUEUE_WAIT_SECONDS for a slot, if the waiting room has space."""
+    if _waiting is None or HASH_QUEUE_WAIT_SECONDS <= 0 or not _waiting.acquire(blocking=False):
+        return False
+    try:
+        return _slots.acquire(timeout=HASH_QUEUE_WAIT_SECONDS)
+    finally:
+        _waiting.release()
+
+
+def _submit(fn: Callable, *args, wait: bool = True) -> Future:
+    if not _slots.acquire(blocking=False) and not (wait and _wait_for_slot()):
+        _count("rejected")
+        raise PasswordHashBusy()
+    try:
+        future = _executor.submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(_release)
+    return future
+
+
+def _wait(future: Future):
+    try:
+        return future.result(timeout=HASH_TIMEOUT_SECONDS)
+    except FutureTimeout:
+        raise PasswordHashBusy()
+
+
+def verify(plain_password: str, hashed_password: str) -> bool:
+    """Blocking: for sync (threadpool) callers."""
+    return _wait(_submit(pwd_context.verify, plain_password, hashed_password))
+
+
+def hash_password(password: str) -> str:
+    return _wait(_submit(pwd_context.hash, password))
+
+
+def needs_update(hashed_password: str) -> bool:
+    """Cheap (parses the hash): deprecated scheme (bcrypt) or outdated rounds."""
+    try:
+        return pwd_context.needs_update(hashed_password)
+    except ValueError:
+        return False
+
+
+def schedule_rehash(plain_password: str, store: Callable[[str], None]) -> bool:
+    """
+    Hashes `plain_password` with the current default scheme on the pool and
+    hands the result to `store`. Fire-and-forget: skipped when the pool is
+    busy, since the next login will try again.
+    """
+    def rehash():
+        try:
+            store(pwd_context.hash(plain_password))
+            _count("rehashed")
+        except Exception as e:
+            _count("rehash_failed")
+            print(f"⚠️ Password rehash failed: {e}")
+
+    try:
+        _submit(rehash, wait=False)
+        return True
+    except PasswordHashBusy:
+        return False
+
+
+def stats() -> dict:
+    with _stats_lock:
+        result = dict(_stats)
+    result.update({"workers": HASH_WORKERS, "max_pending": HASH_MAX_PENDING, "max_waiting": HASH_MAX_WAITING})
+    return result
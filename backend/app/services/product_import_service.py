@@ -0,0 +1,142 @@
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from app.services.import_file_service import chunked
+from app.models.sql_models import Product as SQLProduct
+
+# Spreadsheet column -> accepted header names
+PRODUCT_COLUMNS = {
+    "sku": ["código", "codigo", "code", "id", "sku"],
+    "name": ["nome", "name", "produto", "serviço", "servico"],
+    "description": ["descrição", "descricao", "description", "obs"],
+    "price": ["preço unitário", "preco unitario", "preço", "valor", "price"],
+    "status": ["status", "ativo", "situacao"],
+    "type": ["tipo", "type", "categoria"],
+    "duration": ["duração", "duracao", "duration", "duração (min)"]
+}
+
+
+def clean_price(val):
+    if val is None: return 0.0
+    if isinstance(val, (int, float)): return float(val)
+    if isinstance(val, str):
+        clean = val.replace("R$", "").replace(" ", "").replace(".", "").replace(",", ".")
+        try:
+            return float(clean)
+        except:
+            return 0.0
+    return 0.0
+
+
+def map_product_columns(header_row) -> Dict[str, Optional[int]]:
+    headers = [str(h).lower().strip() if h is not None else "" for h in header_row]
+
+    def find_col_idx(possible_names):
+        for idx, h in enumerate(headers):
+            if h in possible_names:
+                return idx
+        return None
+
+    return {key: find_col_idx(names) for key, names in PRODUCT_COLUMNS.items()}
+
+
+def parse_product_row(row, col_mapping) -> Optional[Dict[str, Any]]:
+    """Maps a spreadsheet row to product fields. Returns None for rows without name/sku."""
+    def cell(key):
+        idx = col_mapping[key]
+        return row[idx] if idx is not None and idx < len(row) else None
+
+    val = cell("name")
+    name = str(val).strip() if val is not None else ""
+    val_sku = cell("sku")
+    sku = str(val_sku).strip() if val_sku is not None else ""
+    if not name and sku:
+        name = sku
+    if not name: return None
+
+    val_desc = cell("description")
+    val_stat = cell("status")
+    active = True
+    if col_mapping["status"] is not None:
+        status_val = str(val_stat).lower() if val_stat is not None else ""
+        active = status_val in ["active", "ativo", "ativa", "sim", "yes", "true", "1"]
+
+    val_type = str(cell("type")).lower() if cell("type") is not None else ""
+
+    duration = 30
+    try:
+        val_dur = cell("duration")
+        if val_dur is not None:
+            duration = int(float(val_dur))
+    except: pass
+
+    return {
+        "sku": sku,
+        "name": name,
+        "description": str(val_desc) if val_desc is not None else "",
+        "price": clean_price(cell("price")),
+        "active": active,
+        "type": "service" if "serv" in val_type else "product",
+        "duration_minutes": duration
+    }
+
+
+class ProductImporter:
+    """
+    Chunked product import: one lookup per chunk for the skus/names it
+    references (sku first, then name), then a flush, so the session holds at
+    most one chunk of pending products.
+    """
+
+    def __init__(self, db: Session, tenant_id, col_mapping: Dict[str, Optional[int]]):
+        self.db = db
+        self.tenant_id = uuid.UUID(str(tenant_id))
+        self.col_mapping = col_mapping
+        self.stats = {"created": 0, "updated": 0, "errors": 0}
+        self.row_errors: List[Dict[str, Any]] = []
+
+    def import_rows(self, rows: Iterable, first_row: int = 2) -> Dict[str, int]:
+        """Imports data rows (header excluded); `first_row` is the sheet row number of the first one. Does not commit."""
+        for batch in chunked(rows):
+            self._import_batch(batch, first_row)
+            first_row += len(batch)
+        return self.stats
+
+    def _import_batch(self, rows: List, first_row: int):
+        parsed = []
+        for row_number, row in enumerate(rows, start=first_row):
+            try:
+                values = parse_product_row(row, self.col_mapping)
+                if values: parsed.append(values)
+            except Exception as e:
+                print(f"Error importing row: {e}")
+                self.stats["errors"] += 1
+                self.row_errors.append({"row": row_number, "error": str(e)})
+        if not parsed: return
+
+        skus = {v["sku"] for v in parsed if v["sku"]}
+        names = {v["name"] for v in parsed}
+        by_sku, by_name = {}, {}
+        for product in self.db.query(SQLProduct).filter(
+            SQLProduct.tenant_id == self.tenant_id,
+            or_(SQLProduct.sku.in_(skus), SQLProduct.name.in_(names))
+        ):
+            if product.sku: by_sku.setdefault(product.sku, product)
+            by_name.setdefault(product.name, product)
+
+        for values in parsed:
+            existing = (by_sku.get(values["sku"]) if values["sku"] else None) or by_name.get(values["name"])
+            if existing:
+                if not values["sku"]: values.pop("sku")
+                for key, value in values.items():
+                    setattr(existing, key, value)
+                self.stats["updated"] += 1
+            else:
+                existing = SQLProduct(tenant_id=self.tenant_id, **values)
+                self.db.add(existing)
+                self.stats["created"] += 1
+            if existing.sku: by_sku.setdefault(existing.sku, existing)
+            by_name.setdefault(existing.name, existing)
+
+        self.db.flush()
@@ -0,0 +1,66 @@
+import asyncio
+import os
+from typing import Callable, Dict
+
+# In-process periodic jobs for long-lived workers (uvicorn/gunicorn).
+# On Vercel there is no persistent process, so the same jobs are exposed
+# through /cron endpoints and triggered by Vercel Cron (see vercel.json).
+
+_jobs: Dict[str, dict] = {}
+_tasks: Dict[str, asyncio.Task] = {}
+
+
+def register_job(name: str, func: Callable[[], object], interval_seconds: int):
+    """Register a synchronous job to run every `interval_seconds` in the threadpool."""
+    _jobs[name] = {"func": func, "interval": interval_seconds, "last_run": None, "last_result": None, "last_error": None}
+
+
+def run_job(name: str):
+    """Run a registered job once, synchronously, recording its outcome."""
+    job = _jobs[name]
+    from datetime import datetime
+    try:
+        job["last_result"] = job["func"]()
+        job["last_error"] = None
+    except Exception as e:
+        job["last_error"] = str(e)
+        print(f"⚠️ Job '{name}' failed: {e}")
+    finally:
+        job["last_run"] = datetime.utcnow().isoformat()
+    return job["last_result"]
+
+
+async def _loop(name: str):
+    interval = _jobs[name]["interval"]
+    while True:
+        await asyncio.to_thread(run_job, name)
+        await asyncio.sleep(interval)
+
+
+def scheduler_enabled() -> bool:
+    # Serverless instances are frozen between requests; rely on Vercel Cron there.
+    if os.environ.get("VERCEL"):
+        return False
+    return os.getenv("ENABLE_SCHEDULER", "true").lower() == "true"
+
+
+def start_scheduler():
+    if not scheduler_enabled():
+        return
+    for name in _jobs:
+        if name not in _tasks:
+            _tasks[name] = asyncio.create_task(_loop(name))
+    print(f"⏱️ Scheduler started: {', '.join(_tasks) or 'no jobs'}")
+
+
+async def stop_scheduler():
+    for task in _tasks.values():
+        task.cancel()
+    _tasks.clear()
+
+
+def job_status() -> dict:
+    return {
+        name: {k: v for k, v in job.items() if k != "func"}
+        for name, job in _jobs.items()
+    }
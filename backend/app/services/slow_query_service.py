@@ -0,0 +1,147 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Optional
+
+# Slow-statement log. metrics_service's cursor hooks time every statement and
+# call record() for those over SLOW_QUERY_MS. Entries (SQL, bind parameters
+# reduced to their types, route) go to a rolling in-memory buffer per process,
+# read by GET /master/system/slow-queries.
+#
+# With SLOW_QUERY_EXPLAIN on, a SELECT from the sync engine is re-run once per
+# SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS under EXPLAIN (ANALYZE, BUFFERS) on a
+# background thread and its own connection, in a transaction that is rolled
+# back. String literals in the plan are masked like the parameters.
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "200"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "false").lower() == "true"
+SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS", "300"))
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", "10000"))
+EXPLAIN_MAX_PENDING = 4
+
+_lock = threading.Lock()
+_entries = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+_last_explained = {}
+_explain_pending = 0
+_explain_executor: Optional[ThreadPoolExecutor] = None
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+
+
+def threshold_seconds() -> Optional[float]:
+    """None when the log is off (SLOW_QUERY_MS=0)."""
+    return SLOW_QUERY_MS / 1000 if SLOW_QUERY_MS > 0 else None
+
+
+def _redact_value(value):
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple, set)):
+        return f"<{type(value).__name__}[{len(value)}]>"
+    return f"<{type(value).__name__}>"
+
+
+def redact(parameters):
+    """Bind parameters with every value replaced by its type (NULLs and list sizes kept)."""
+    if isinstance(parameters, dict):
+        return {key: _redact_value(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany: one sample row is enough to read the shape
+            return {"rows": len(parameters), "first": redact(parameters[0])}
+        return [_redact_value(value) for value in parameters]
+    return None
+
+
+def fingerprint(statement: str) -> str:
+    return hashlib.sha1(" ".join(statement.split()).encode()).hexdigest()[:12]
+
+
+def record(statement: str, parameters, elapsed: float, scope: Optional[dict], explainable: bool):
+    """Logs one slow statement; `scope` is the ASGI scope of the request that ran it, if any."""
+    route = method = None
+    if scope is not None:
+        method = scope.get("method")
+        # Route template once routed; raw path for statements run before routing
+        route = getattr(scope.get("route"), "path", None) or scope.get("path")
+
+    entry = {
+        "at": datetime.now(timezone.utc).isoformat(),
+        "duration_ms": round(elapsed * 1000, 1),
+        "method": method,
+        "route": route,
+        "fingerprint": fingerprint(statement),
+        "statement": statement,
+        "parameters": redact(parameters),
+        "explain": None
+    }
+    with _lock:
+        _entries.append(entry)
+    print(f"🐢 Slow query {entry['duration_ms']} ms on {method or '-'} {route or '(background)'}: {' '.join(statement.split())[:200]}")
+
+    if SLOW_QUERY_EXPLAIN and explainable and _is_read_only(statement):
+        _schedule_explain(entry, statement, parameters)
+
+
+def _is_read_only(statement: str) -> bool:
+    # EXPLAIN ANALYZE executes the statement: plain SELECTs only
+    text = statement.lstrip().upper()
+    return text.startswith("SELECT") and " FOR UPDATE" not in text and " FOR SHARE" not in text
+
+
+def _schedule_explain(entry: dict, statement: str, parameters):
+    global _explain_pending, _explain_executor
+    now = time.monotonic()
+    with _lock:
+        last = _last_explained.get(entry["fingerprint"])
+        if last is not None and now - last < SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS:
+            return
+        if _explain_pending >= EXPLAIN_MAX_PENDING:
+            return
+        _last_explained[entry["fingerprint"]] = now
+        _explain_pending += 1
+        entry["explain"] = "pending"
+        if _explain_executor is None:
+            _explain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+    _explain_executor.submit(_explain, entry, statement, parameters)
+
+
+def _explain(entry: dict, statement: str, parameters):
+    global _explain_pending
+    from app.database import engine
+    plan = None
+    try:
+        raw = engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            cursor.execute(f"SET LOCAL statement_timeout = {SLOW_QUERY_EXPLAIN_TIMEOUT_MS}")
+            cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + statement, parameters)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        finally:
+            raw.rollback()
+            raw.close()
+        plan = _STRING_LITERAL.sub("'?'", plan)
+    except Exception as e:
+        plan = f"EXPLAIN failed: {e}"
+    with _lock:
+        entry["explain"] = plan
+        _explain_pending -= 1
+
+
+def entries(limit: Optional[int] = None) -> list:
+    """Newest first."""
+    with _lock:
+        result = [dict(entry) for entry in reversed(_entries)]
+    return result[:limit] if limit else result
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+        _last_explained.clear()
@@ -1,11 +1,12 @@
 import os
+import threading
 from typing import Optional, BinaryIO
-from supabase import create_client, Client
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Initialize Supabase client
+# Supabase client settings. The client itself (supabase -> httpx, realtime,
+# auth) is created on first use by get_client(): most requests never touch storage.
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 # Prioritize the secret service key for administrative storage operations
 SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_KEY_SECRET") or os.getenv("SUPABASE_SERVICE_KEY")
@@ -13,14 +14,29 @@ BUCKET_NAME = os.getenv("SUPABASE_BUCKET_NAME", "crm-files")
 
 if not SUPABASE_URL or not SUPABASE_KEY:
     print(f"WARNING: Supabase configuration missing. URL: {'SET' if SUPABASE_URL else 'MISSING'}, KEY: {'SET' if SUPABASE_KEY else 'MISSING'}")
-    supabase: Optional[Client] = None
-else:
-    try:
-        supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-        print("DEBUG: Supabase client initialized successfully")
-    except Exception as e:
-        print(f"ERROR: Failed to initialize Supabase client: {e}")
-        supabase = None
+
+_client = None
+_client_initialized = False
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The shared Supabase client, or None when not configured or it failed to initialize."""
+    global _client, _client_initialized
+    if _client_initialized:
+        return _client
+    with _client_lock:
+        if not _client_initialized:
+            if SUPABASE_URL and SUPABASE_KEY:
+                try:
+                    from supabase import create_client
+                    _client = create_client(SUPABASE_URL, SUPABASE_KEY)
+                    print("DEBUG: Supabase client initialized successfully")
+                except Exception as e:
+                    print(f"ERROR: Failed to initialize Supabase client: {e}")
+                    _client = None
+            _client_initialized = True
+    return _client
 
 
 def upload_file(
@@ -41,6 +57,7 @@ def upload_file(
     Returns:
         Public URL of the uploaded file
     """
+    supabase = get_client()
     if not supabase:
         raise Exception("Supabase client not initialized. Check your environment variables.")
     
@@ -80,12 +97,30 @@ def get_file_url(file_path: str) -> str:
     Returns:
         Public URL of the file
     """
+    supabase = get_client()
     if not supabase:
         raise Exception("Supabase client not initialized. Check your environment variables.")
     
     return supabase.storage.from_(BUCKET_NAME).get_public_url(file_path)
 
 
+def download_file(file_path: str) -> bytes:
+    """
+    Download a file from Supabase Storage.
+    
+    Args:
+        file_path: Path to the file in storage
+        
+    Returns:
+        File content
+    """
+    supabase = get_client()
+    if not supabase:
+        raise Exception("Supabase client not initialized. Check your environment variables.")
+    
+    return supabase.storage.from_(BUCKET_NAME).download(file_path)
+
+
 def delete_file(file_path: str) -> bool:
     """
     Delete a file from Supabase Storage.
@@ -96,6 +131,7 @@ def delete_file(file_path: str) -> bool:
     Returns:
         True if successful
     """
+    supabase = get_client()
     if not supabase:
         raise Exception("Supabase client not initialized. Check your environment variables.")
     
@@ -0,0 +1,211 @@
+import os
+import select
+import threading
+import uuid
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.models.sql_models import Tenant, Niche
+from app.services.cache_service import TTLCache
+
+# Tenant registry: TenantInfo snapshots cached per process under ("id", uuid)
+# and ("slug", slug). Tenants only change through the master endpoints, which
+# invalidate here and NOTIFY other processes on NOTIFY_CHANNEL; the TTL bounds
+# staleness for processes that can't LISTEN (serverless, transaction pooler).
+tenant_cache = TTLCache(
+    ttl_seconds=float(os.getenv("TENANT_CACHE_TTL_SECONDS", "60")),
+    maxsize=int(os.getenv("TENANT_CACHE_SIZE", "2048"))
+)
+NOTIFY_CHANNEL = "tenant_registry"
+# Bumped on every invalidation, so a load that raced one isn't cached
+_generation = 0
+
+
+@dataclass(frozen=True)
+class TenantInfo:
+    """Read-only snapshot of the tenant fields requests need for context and access checks."""
+    id: uuid.UUID
+    slug: str
+    name: str
+    active: bool
+    modulos_habilitados: Tuple[str, ...]
+    niche_id: Optional[uuid.UUID]
+    niche_name: Optional[str]
+    logo_url: Optional[str]
+    primary_color: Optional[str]
+    plan_tier: Optional[str]
+    payment_status: Optional[str]
+
+
+def load_tenant_info(db: Session, tenant_id=None, slug: Optional[str] = None) -> Optional[TenantInfo]:
+    """One query for the tenant (by id, else by slug) and its niche name."""
+    query = db.query(
+        Tenant.id, Tenant.slug, Tenant.name, Tenant.active, Tenant.modulos_habilitados,
+        Tenant.niche_id, Niche.name.label("niche_name"), Tenant.logo_url, Tenant.primary_color,
+        Tenant.plan_tier, Tenant.payment_status
+    ).outerjoin(Niche, Niche.id == Tenant.niche_id)
+
+    if tenant_id:
+        try:
+            query = query.filter(Tenant.id == uuid.UUID(str(tenant_id)))
+        except ValueError:
+            return None
+    elif slug:
+        query = query.filter(Tenant.slug == slug)
+    else:
+        return None
+
+    row = query.first()
+    if not row:
+        return None
+    return TenantInfo(
+        id=row.id,
+        slug=row.slug,
+        name=row.name,
+        active=bool(row.active),
+        modulos_habilitados=tuple(row.modulos_habilitados or ()),
+        niche_id=row.niche_id,
+        niche_name=row.niche_name,
+        logo_url=row.logo_url,
+        primary_color=row.primary_color,
+        plan_tier=row.plan_tier,
+        payment_status=row.payment_status
+    )
+
+
+def get_tenant_info(db: Session, tenant_id=None, slug: Optional[str] = None) -> Optional[TenantInfo]:
+    """load_tenant_info through the registry cache. Misses (unknown tenants) aren't cached."""
+    key = ("id", str(tenant_id)) if tenant_id else ("slug", slug)
+    tenant = tenant_cache.get(key)
+    if tenant is None:
+        generation = _generation
+        tenant = load_tenant_info(db, tenant_id=tenant_id, slug=slug)
+        if tenant is not None and generation == _generation:
+            _cache_tenant(tenant)
+    return tenant
+
+
+def _cache_tenant(tenant: TenantInfo):
+    tenant_cache.set(("id", str(tenant.id)), tenant)
+    tenant_cache.set(("slug", tenant.slug), tenant)
+
+
+def _evict(tenant_id=None, slug: Optional[str] = None):
+    global _generation
+    _generation += 1
+    keys = []
+    if tenant_id:
+        keys.append(("id", str(tenant_id)))
+    if slug:
+        keys.append(("slug", slug))
+    for key in list(keys):
+        cached = tenant_cache.peek(key)
+        if cached is not None:
+            # Drop the entry's other key too (e.g. the old slug)
+            keys += [("id", str(cached.id)), ("slug", cached.slug)]
+    for key in keys:
+        tenant_cache.invalidate(key)
+
+
+def invalidate_tenant(db: Optional[Session] = None, tenant_id=None, slug: Optional[str] = None):
+    """Drops a tenant from this process's registry and, given a session, notifies the other processes."""
+    _evict(tenant_id, slug)
+    if db is not None:
+        _notify(db, f"{tenant_id or ''}|{slug or ''}")
+
+
+def invalidate_all(db: Optional[Session] = None):
+    """For changes that touch many snapshots at once (e.g. a niche renamed)."""
+    _clear()
+    if db is not None:
+        _notify(db, "*")
+
+
+def _notify(db: Session, payload: str):
+    try:
+        db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": NOTIFY_CHANNEL, "payload": payload})
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ Tenant registry notify failed (other workers rely on the TTL): {e}")
+
+
+def _clear():
+    global _generation
+    _generation += 1
+    tenant_cache.clear()
+
+
+def _apply_notification(payload: str):
+    if payload == "*":
+        _clear()
+        return
+    tenant_id, _, slug = payload.partition("|")
+    _evict(tenant_id or None, slug or None)
+
+
+# --- Cross-process invalidation (LISTEN) ---
+
+_listener_thread: Optional[threading.Thread] = None
+_listener_stop = threading.Event()
+
+
+def listener_enabled() -> bool:
+    from app.database import BEHIND_POOLER
+    default = "false" if os.environ.get("VERCEL") or BEHIND_POOLER else "true"
+    return os.getenv("TENANT_CACHE_LISTEN", default).lower() == "true"
+
+
+def _listen_forever():
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import NullPool
+    from app.database import DATABASE_URL, connect_args
+
+    # A dedicated connection outside the pool: LISTEN holds it for the process lifetime
+    listen_engine = create_engine(DATABASE_URL, connect_args=connect_args, poolclass=NullPool)
+    backoff = 1
+    while not _listener_stop.is_set():
+        raw = None
+        try:
+            raw = listen_engine.raw_connection()
+            conn = raw.dbapi_connection
+            if not hasattr(conn, "poll"):
+                print("⚠️ Tenant registry listener needs psycopg2; relying on the TTL")
+                return
+            conn.autocommit = True
+            conn.cursor().execute(f"LISTEN {NOTIFY_CHANNEL}")
+            # Notifications may have been missed while disconnected
+            _clear()
+            backoff = 1
+            while not _listener_stop.is_set():
+                if select.select([conn], [], [], 5)[0]:
+                    conn.poll()
+                    while conn.notifies:
+                        _apply_notification(conn.notifies.pop(0).payload)
+        except Exception as e:
+            print(f"⚠️ Tenant registry listener error, reconnecting in {backoff}s: {e}")
+            _listener_stop.wait(backoff)
+            backoff = min(backoff * 2, 60)
+        finally:
+            if raw is not None:
+                try:
+                    raw.close()
+                except Exception:
+                    pass
+    listen_engine.dispose()
+
+
+def start_listener():
+    global _listener_thread
+    if _listener_thread is not None or not listener_enabled():
+        return
+    _listener_stop.clear()
+    _listener_thread = threading.Thread(target=_listen_forever, name="tenant-registry-listener", daemon=True)
+    _listener_thread.start()
+
+
+def stop_listener():
+    global _listener_thread
+    _listener_stop.set()
+    _listener_thread = None
@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import urlsplit
+
+# Per-destination protection for outbox deliveries.
+#
+# Rate limit: a token bucket per receiving host (scheme://host:port), refilled
+# at WEBHOOK_RATE_PER_SECOND up to WEBHOOK_RATE_BURST. A delivery that would
+# wait longer than MAX_RATE_WAIT_SECONDS is deferred instead of holding a slot.
+#
+# Circuit breaker: per endpoint URL. WEBHOOK_CIRCUIT_FAILURES consecutive
+# failures (network errors, timeouts, 408, 5xx) open it; deliveries to it are
+# deferred without a request for WEBHOOK_CIRCUIT_OPEN_SECONDS, then a single
+# probe goes through (half-open): success closes it, failure re-opens it. Other
+# 4xx answers mean the endpoint is up and count as success here (the outbox
+# still dead-letters them).
+#
+# State is per process (per instance on serverless); it is only an optimization
+# over the outbox's own retries, so nothing is lost when an instance goes away.
+
+RATE_PER_SECOND = float(os.getenv("WEBHOOK_RATE_PER_SECOND", "50")) # 0 = no limit
+RATE_BURST = float(os.getenv("WEBHOOK_RATE_BURST", "100"))
+MAX_RATE_WAIT_SECONDS = 2.0
+CIRCUIT_FAILURES = int(os.getenv("WEBHOOK_CIRCUIT_FAILURES", "5"))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("WEBHOOK_CIRCUIT_OPEN_SECONDS", "60"))
+# Deliveries arriving while the half-open probe is in flight retry this soon;
+# a probe that hasn't reported back after PROBE_TIMEOUT_SECONDS is replaced
+PROBE_RETRY_SECONDS = 10.0
+PROBE_TIMEOUT_SECONDS = 60.0
+MAX_TRACKED = 1024
+
+
+class DestinationUnavailable(Exception):
+    """The delivery shouldn't be attempted now; retry it after `retry_after` seconds."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, now: float):
+        self.tokens = RATE_BURST
+        self.updated = now
+
+    def reserve(self, now: float) -> float:
+        """Takes a token (possibly one not yet refilled); returns how long to wait before using it."""
+        self.tokens = min(RATE_BURST, self.tokens + (now - self.updated) * RATE_PER_SECOND)
+        self.updated = now
+        self.tokens -= 1
+        return -self.tokens / RATE_PER_SECOND if self.tokens < 0 else 0.0
+
+
+class CircuitBreaker:
+    __slots__ = ("state", "failures", "opened_at", "last_error")
+
+    def __init__(self):
+        self.state = "closed" # closed, open, half_open
+        self.failures = 0
+        self.opened_at = 0.0
+        self.last_error: Optional[str] = None
+
+
+_lock = threading.Lock()
+_buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+_breakers: "OrderedDict[str, CircuitBreaker]" = OrderedDict()
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def _remember(store: OrderedDict, key: str, value):
+    store[key] = value
+    store.move_to_end(key)
+    while len(store) > MAX_TRACKED:
+        store.popitem(last=False)
+
+
+def acquire(url: str) -> float:
+    """
+    Call before delivering to `url`. Returns the seconds to wait first (rate
+    limit); raises DestinationUnavailable when the delivery should be deferred.
+    """
+    now = time.monotonic()
+    with _lock:
+        breaker = _breakers.get(url)
+        probing = False
+        if breaker is not None and breaker.state != "closed":
+            if breaker.state == "half_open" and now - breaker.opened_at < PROBE_TIMEOUT_SECONDS:
+                raise DestinationUnavailable("Circuit half-open: probe in flight", PROBE_RETRY_SECONDS)
+            remaining = breaker.opened_at + CIRCUIT_OPEN_SECONDS - now
+            if breaker.state == "open" and remaining > 0:
+                raise DestinationUnavailable(f"Circuit open after {breaker.failures} consecutive failures", remaining)
+            # Let one probe through (again, if the last one never reported back)
+            breaker.state = "half_open"
+            breaker.opened_at = now
+            probing = True
+
+        if RATE_PER_SECOND <= 0:
+            return 0.0
+        origin = _origin(url)
+        bucket = _buckets.get(origin)
+        if bucket is None:
+            bucket = TokenBucket(now)
+        _remember(_buckets, origin, bucket)
+        wait = bucket.reserve(now)
+        if wait > MAX_RATE_WAIT_SECONDS:
+            bucket.tokens += 1 # give the token back
+            if probing:
+                # Not probed after all: the next delivery may probe right away
+                breaker.state = "open"
+                breaker.opened_at = now - CIRCUIT_OPEN_SECONDS
+            raise DestinationUnavailable(f"Rate limited ({RATE_PER_SECOND:g}/s to {origin})", wait)
+        return wait
+
+
+def record(url: str, status_code: Optional[int], error: Optional[str] = None):
+    """Feeds a delivery outcome to the endpoint's breaker (status_code None = no response)."""
+    failed = status_code is None or status_code == 408 or status_code >= 500
+    with _lock:
+        breaker = _breakers.get(url)
+        if not failed:
+            if breaker is not None:
+                # Only failing endpoints are tracked
+                del _breakers[url]
+            return
+        if breaker is None:
+            breaker = CircuitBreaker()
+        _remember(_breakers, url, breaker)
+        breaker.failures += 1
+        breaker.last_error = error
+        if breaker.state == "half_open" or breaker.failures >= CIRCUIT_FAILURES:
+            if breaker.state != "open":
+                print(f"⚡ Circuit open for {url} after {breaker.failures} consecutive failure(s): {error}")
+            breaker.state = "open"
+            breaker.opened_at = time.monotonic()
+
+
+def destination_state(url: str) -> dict:
+    """This process's view of an endpoint: circuit state and the host's available tokens."""
+    now = time.monotonic()
+    with _lock:
+        breaker = _breakers.get(url)
+        bucket = _buckets.get(_origin(url))
+        circuit = {
+            "state": breaker.state if breaker else "closed",
+            "consecutive_failures": breaker.failures if breaker else 0,
+            "last_error": breaker.last_error if breaker else None,
+            "retry_in_seconds": (
+                round(max(breaker.opened_at + CIRCUIT_OPEN_SECONDS - now, 0), 1)
+                if breaker and breaker.state == "open" else None
+            )
+        }
+        tokens = None
+        if RATE_PER_SECOND > 0:
+            tokens = RATE_BURST if bucket is None else min(RATE_BURST, bucket.tokens + (now - bucket.updated) * RATE_PER_SECOND)
+    return {
+        "circuit": circuit,
+        "rate_limit": {
+            "per_second": RATE_PER_SECOND or None,
+            "burst": RATE_BURST if RATE_PER_SECOND > 0 else None,
+            "available": round(tokens, 1) if tokens is not None else None
+        }
+    }
+
@@ -0,0 +1,107 @@
+import sys
+import os
+import time
+import asyncio
+sys.path.append(os.getcwd())
+sys.path.append(os.path.join(os.getcwd(), "backend"))
+
+from dotenv import load_dotenv
+
+load_dotenv("backend/.env")
+
+import httpx
+from fastapi import FastAPI, Depends
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import database
+from app.database import get_async_db
+
+# Usage: python bench_concurrency.py [slow_seconds] [slow_requests] [fast_requests]
+# Fires a few slow queries (pg_sleep) and, while they are in flight, many fast
+# ones (SELECT 1), then reports the fast requests' latency for each handler style:
+#   blocking   - async def + sync Session (the old pattern: stalls the event loop)
+#   threadpool - def + sync Session (FastAPI runs it in the threadpool)
+#   async      - async def + AsyncSession (asyncpg)
+# With the loop free, fast-request p99 should stay far below the slow query time.
+
+SLOW_SECONDS = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+SLOW_REQUESTS = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+FAST_REQUESTS = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+
+bench = FastAPI()
+
+# The sync handlers open their session inline rather than through get_db: with
+# the loop blocked, get_db's teardown can't run, connections aren't returned and
+# the blocking mode deadlocks on pool checkout instead of measuring the stall.
+
+@bench.get("/blocking/{kind}")
+async def blocking(kind: str):
+    with database.SessionLocal() as db:
+        db.execute(text("SELECT pg_sleep(:s)" if kind == "slow" else "SELECT 1"), {"s": SLOW_SECONDS})
+    return {"ok": True}
+
+@bench.get("/threadpool/{kind}")
+def threadpool(kind: str):
+    with database.SessionLocal() as db:
+        db.execute(text("SELECT pg_sleep(:s)" if kind == "slow" else "SELECT 1"), {"s": SLOW_SECONDS})
+    return {"ok": True}
+
+@bench.get("/async/{kind}")
+async def async_handler(kind: str, db: AsyncSession = Depends(get_async_db)):
+    await db.execute(text("SELECT pg_sleep(:s)" if kind == "slow" else "SELECT 1"), {"s": SLOW_SECONDS})
+    return {"ok": True}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+async def timed_get(client, url, start_at=None):
+    # Open-loop timing: latency counts from the scheduled start, so a stalled
+    # event loop (which also delays the sender) still shows up in the numbers
+    if start_at is not None:
+        await asyncio.sleep(max(0.0, start_at - time.perf_counter()))
+    started = start_at if start_at is not None else time.perf_counter()
+    response = await client.get(url)
+    response.raise_for_status()
+    return time.perf_counter() - started
+
+async def run_mode(client, mode):
+    # Warm up the pool so connection setup isn't measured
+    await asyncio.gather(*[timed_get(client, f"/{mode}/fast") for _ in range(SLOW_REQUESTS + 1)])
+
+    t0 = time.perf_counter()
+    slow = [asyncio.create_task(timed_get(client, f"/{mode}/slow", t0)) for _ in range(SLOW_REQUESTS)]
+    spacing = SLOW_SECONDS / FAST_REQUESTS
+    fast = [
+        asyncio.create_task(timed_get(client, f"/{mode}/fast", t0 + 0.05 + i * spacing))
+        for i in range(FAST_REQUESTS)
+    ]
+    fast_latencies = await asyncio.gather(*fast)
+    await asyncio.gather(*slow)
+    return fast_latencies
+
+async def main():
+    transport = httpx.ASGITransport(app=bench)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        for mode in ("blocking", "threadpool", "async"):
+            try:
+                results[mode] = await run_mode(client, mode)
+            except Exception as e:
+                print(f"⚠️ {mode}: {e}")
+
+    print(f"\n{SLOW_REQUESTS} x pg_sleep({SLOW_SECONDS}) in flight, {FAST_REQUESTS} x SELECT 1")
+    print(f"{'mode':12} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for mode, latencies in results.items():
+        print(f"{mode:12} {percentile(latencies, 50) * 1000:8.1f} {percentile(latencies, 99) * 1000:8.1f} {max(latencies) * 1000:8.1f}")
+
+    tracking = [m for m in ("threadpool", "async") if m in results and percentile(results[m], 99) >= SLOW_SECONDS * 0.5]
+    if tracking:
+        print(f"❌ p99 still tracks the slow query in: {', '.join(tracking)}")
+        return 1
+    print("✅ p99 of fast requests is independent of the slow in-flight queries")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
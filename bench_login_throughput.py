@@ -0,0 +1,134 @@
+import sys
+import os
+import time
+import asyncio
+sys.path.append(os.getcwd())
+sys.path.append(os.path.join(os.getcwd(), "backend"))
+
+from dotenv import load_dotenv
+
+load_dotenv("backend/.env")
+
+import httpx
+from anyio import to_thread
+from fastapi import FastAPI
+from app.services import password_service
+from app.services.password_service import pwd_context, PasswordHashBusy
+
+# Usage: python bench_login_throughput.py [logins] [scheme]
+# Fires a burst of concurrent password verifications (what a login costs, minus
+# the user lookup) and, while it runs, pings a cheap `def` endpoint every 20 ms.
+# Reports login throughput and the pings' latency for each handler style:
+#   blocking   - async def + inline verify (stalls the event loop)
+#   threadpool - def + inline verify (unbounded: every request thread hashing)
+#   pool       - def + password_service.verify (bounded pool, brief wait, then 503)
+# scheme: pbkdf2_sha256 (default) or bcrypt (legacy hashes, rehashed on login).
+
+LOGINS = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+SCHEME = sys.argv[2] if len(sys.argv) > 2 else "pbkdf2_sha256"
+PING_INTERVAL = 0.02
+
+PASSWORD = "Bench@123"
+HASHED = pwd_context.hash(PASSWORD, scheme=SCHEME)
+
+bench = FastAPI()
+
+
+@bench.exception_handler(PasswordHashBusy)
+async def busy(request, exc):
+    from fastapi.responses import JSONResponse
+    return JSONResponse(status_code=503, content={"detail": "busy"}, headers={"Retry-After": "1"})
+
+@bench.post("/blocking/login")
+async def blocking_login():
+    return {"ok": pwd_context.verify(PASSWORD, HASHED)}
+
+@bench.post("/threadpool/login")
+def threadpool_login():
+    return {"ok": pwd_context.verify(PASSWORD, HASHED)}
+
+@bench.post("/pool/login")
+def pool_login():
+    return {"ok": password_service.verify(PASSWORD, HASHED)}
+
+@bench.get("/ping")
+def ping():
+    return {"ok": True}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+async def login(client, mode):
+    response = await client.post(f"/{mode}/login")
+    if response.status_code not in (200, 503):
+        response.raise_for_status()
+    return response.status_code
+
+async def pings(client, done: asyncio.Event):
+    # Open-loop timing: latency counts from the scheduled start, so a stalled
+    # event loop (which also delays the sender) still shows up in the numbers
+    latencies, tasks = [], []
+    t0 = time.perf_counter()
+
+    async def one(start_at):
+        await asyncio.sleep(max(0.0, start_at - time.perf_counter()))
+        (await client.get("/ping")).raise_for_status()
+        latencies.append(time.perf_counter() - start_at)
+
+    i = 0
+    while not done.is_set():
+        tasks.append(asyncio.create_task(one(t0 + i * PING_INTERVAL)))
+        i += 1
+        await asyncio.sleep(PING_INTERVAL)
+    await asyncio.gather(*tasks)
+    return latencies
+
+async def run_mode(client, mode):
+    await login(client, mode)
+    done = asyncio.Event()
+    pinger = asyncio.create_task(pings(client, done))
+    await asyncio.sleep(0)
+    t0 = time.perf_counter()
+    statuses = await asyncio.gather(*[login(client, mode) for _ in range(LOGINS)])
+    elapsed = time.perf_counter() - t0
+    done.set()
+    return statuses, elapsed, await pinger
+
+async def main():
+    to_thread.current_default_thread_limiter().total_tokens = int(os.getenv("THREADPOOL_SIZE", "40"))
+    started = time.perf_counter()
+    pwd_context.verify(PASSWORD, HASHED)
+    single_ms = (time.perf_counter() - started) * 1000
+
+    transport = httpx.ASGITransport(app=bench)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for mode in ("blocking", "threadpool", "pool"):
+            try:
+                results[mode] = await run_mode(client, mode)
+            except Exception as e:
+                print(f"⚠️ {mode}: {e}")
+
+    print(f"\n{LOGINS} concurrent {SCHEME} logins ({single_ms:.1f} ms each), "
+          f"pool: {password_service.HASH_WORKERS} workers + {password_service.HASH_MAX_PENDING} pending "
+          f"+ {password_service.HASH_MAX_WAITING} waiting up to {password_service.HASH_QUEUE_WAIT_SECONDS:g}s")
+    print(f"{'mode':12} {'ok':>5} {'503':>5} {'logins/s':>9} {'ping p50':>9} {'ping p99':>9}")
+    for mode, (statuses, elapsed, latencies) in results.items():
+        ok = statuses.count(200)
+        print(f"{mode:12} {ok:5d} {statuses.count(503):5d} {ok / elapsed:9.1f} "
+              f"{percentile(latencies, 50) * 1000:9.1f} {percentile(latencies, 99) * 1000:9.1f}")
+
+    if "blocking" not in results:
+        return 1
+    baseline = percentile(results["blocking"][2], 99)
+    stalled = [m for m in ("pool",) if m in results and percentile(results[m][2], 99) >= baseline * 0.5]
+    if stalled:
+        print(f"❌ pings still wait behind the login burst in: {', '.join(stalled)}")
+        return 1
+    print("✅ other requests stay responsive during the login burst")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,169 @@
+import sys
+import os
+import time
+import asyncio
+import subprocess
+sys.path.append(os.getcwd())
+sys.path.append(os.path.join(os.getcwd(), "backend"))
+
+from dotenv import load_dotenv
+
+load_dotenv("backend/.env")
+# Measures the client, not the per-host rate limit of webhook_guard_service
+os.environ["WEBHOOK_RATE_PER_SECOND"] = "0"
+
+# Usage: python bench_webhooks.py [webhooks] [server_latency_ms]
+# Starts a local stub webhook receiver (keep-alive HTTP/1.1, in a subprocess so
+# it doesn't share our GIL) and posts the same webhooks two ways:
+#   sequential - one webhook at a time, like trigger_master_automation
+#   batch      - outbox batches of OUTBOX_BATCH_SIZE, OUTBOX_CONCURRENCY in flight
+# "before" opens an httpx.AsyncClient per call (per batch for the outbox), as
+# the code did; "after" goes through http_client_service's shared client.
+# Reports webhooks/s and how many TCP connections the receiver accepted. The
+# stub is plain HTTP on localhost: against real hosts every new connection also
+# pays DNS and a TLS handshake, so the gap only grows.
+
+WEBHOOKS = int(sys.argv[1]) if len(sys.argv) > 1 and not sys.argv[1].startswith("--") else 500
+LATENCY_MS = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+PAYLOAD = {"event": "lead_created", "lead_id": "bench", "name": "Bench Lead", "email": "bench@example.com"}
+
+
+# --- Stub receiver (python bench_webhooks.py --serve <port> <latency_ms>) ---
+
+def serve(port: int, latency: float):
+    connections = 0
+
+    async def handle(reader, writer):
+        nonlocal connections
+        connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                if latency:
+                    await asyncio.sleep(latency)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: text/plain\r\nContent-Length: 2\r\n"
+                    b"X-Connections: " + str(connections).encode() + b"\r\n\r\nok"
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def main():
+        server = await asyncio.start_server(handle, "127.0.0.1", port, backlog=1024)
+        print("ready", flush=True)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(main())
+
+
+def start_stub():
+    import socket
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", str(port), str(LATENCY_MS / 1000)],
+        stdout=subprocess.PIPE, text=True
+    )
+    process.stdout.readline()  # "ready"
+    return process, f"http://localhost:{port}/webhook"
+
+
+# --- Senders ---
+
+async def _before_one(url):
+    # What AutomationService._execute_webhook used to do
+    import httpx
+    async with httpx.AsyncClient() as client:
+        return await client.post(url, json=PAYLOAD, timeout=5.0)
+
+async def _before_batch(url, size, concurrency):
+    # What outbox_service._deliver_all used to do: a client per batch
+    import httpx
+    semaphore = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient() as client:
+        async def one():
+            async with semaphore:
+                return await client.post(url, json=PAYLOAD, timeout=5.0)
+        return await asyncio.gather(*[one() for _ in range(size)])
+
+def before_sequential(url):
+    return [asyncio.run(_before_one(url)) for _ in range(WEBHOOKS)]
+
+def before_batch(url):
+    from app.services import outbox_service
+    responses = []
+    for start in range(0, WEBHOOKS, outbox_service.BATCH_SIZE):
+        size = min(outbox_service.BATCH_SIZE, WEBHOOKS - start)
+        responses += asyncio.run(_before_batch(url, size, outbox_service.CONCURRENCY))
+    return responses
+
+def after_sequential(url):
+    from app.services import http_client_service
+    return [http_client_service.run(http_client_service.post(url, json=PAYLOAD)) for _ in range(WEBHOOKS)]
+
+def after_batch(url):
+    from app.services import http_client_service, outbox_service
+    results = []
+    for start in range(0, WEBHOOKS, outbox_service.BATCH_SIZE):
+        size = min(outbox_service.BATCH_SIZE, WEBHOOKS - start)
+        events = [{"id": str(start + i), "url": url, "payload": PAYLOAD, "event_type": "lead_created"} for i in range(size)]
+        results += http_client_service.run(outbox_service._deliver_all(events))
+    return results
+
+
+def measure(label, func, url, connections_before):
+    started = time.perf_counter()
+    results = func(url)
+    elapsed = time.perf_counter() - started
+    if isinstance(results[0], tuple):
+        # outbox results: (status_code, error, defer_seconds)
+        failed = sum(1 for result in results if result[1])
+    else:
+        failed = sum(1 for r in results if not r.is_success)
+    # A fresh probe connection reads the receiver's connection counter
+    counter = int(asyncio.run(_before_one(url)).headers["X-Connections"])
+    connections = counter - connections_before - 1
+    rate = len(results) / elapsed
+    print(f"   {label:<24} {rate:>7.0f} webhooks/s  {elapsed:6.2f}s  {connections:>5} connections  {failed} failed")
+    return rate, counter, failed
+
+
+def run():
+    from app.services import http_client_service
+    process, url = start_stub()
+    try:
+        print(f"🔌 Stub receiver at {url} ({LATENCY_MS:g} ms per response), HTTP/2: {http_client_service.WEBHOOK_HTTP2} "
+              f"(cleartext stub speaks HTTP/1.1)")
+        connections = int(asyncio.run(_before_one(url)).headers["X-Connections"])
+        failures = 0
+        for name, before, after in (("sequential", before_sequential, after_sequential), ("batch", before_batch, after_batch)):
+            print(f"📨 {name}: {WEBHOOKS} webhooks")
+            before_rate, connections, failed_before = measure("before (client per call)", before, url, connections)
+            after_rate, connections, failed_after = measure("after (shared client)", after, url, connections)
+            failures += failed_before + failed_after
+            print(f"   {'✅' if after_rate > before_rate else '❌'} {after_rate / before_rate:.1f}x")
+        http_client_service.close()
+        if failures:
+            print(f"❌ {failures} webhook(s) failed")
+            return 1
+        return 0
+    finally:
+        process.terminate()
+        process.wait()
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--serve":
+        serve(int(sys.argv[2]), float(sys.argv[3]))
+    else:
+        sys.exit(run())
@@ -0,0 +1,51 @@
+import sys
+import os
+import inspect
+sys.path.append(os.getcwd())
+sys.path.append(os.path.join(os.getcwd(), "backend"))
+
+from dotenv import load_dotenv
+
+load_dotenv("backend/.env")
+
+from fastapi.routing import APIRoute
+from app.main import app
+from app import router_registry
+from app.database import get_db
+
+# Usage: python check_async_handlers.py
+# Fails if an `async def` route depends on the sync Session (get_db): it would
+# run blocking queries on the event loop. Such handlers must be plain `def`
+# (threadpool) or move to get_async_db.
+
+def uses_sync_db(dependant):
+    return any(dep.call is get_db or uses_sync_db(dep) for dep in dependant.dependencies)
+
+def iter_api_routes(routes):
+    # Newer FastAPI keeps included routers nested instead of copying their routes
+    for route in routes:
+        included = getattr(route, "original_router", None)
+        if included is not None:
+            yield from iter_api_routes(included.routes)
+        elif isinstance(route, APIRoute):
+            yield route
+
+def run():
+    router_registry.include_all(app)
+    routes = list(iter_api_routes(app.routes))
+    offenders = [
+        f"{','.join(sorted(route.methods))} {route.path} -> {route.endpoint.__module__}.{route.endpoint.__name__}"
+        for route in routes
+        if inspect.iscoroutinefunction(route.endpoint)
+        and uses_sync_db(route.dependant)
+    ]
+    for line in offenders:
+        print(f"❌ {line}")
+    if offenders:
+        print(f"{len(offenders)} async handler(s) use the sync Session")
+        return 1
+    print(f"✅ No async handler uses the sync Session ({len(routes)} routes checked)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,63 @@
+import sys
+import os
+import json
+sys.path.append(os.getcwd())
+sys.path.append(os.path.join(os.getcwd(), "backend"))
+
+from dotenv import load_dotenv
+
+load_dotenv("backend/.env")
+
+from app.database import SessionLocal, count_queries
+from app.models.schemas import TokenData
+from app.models.sql_models import Tenant
+from app.routers.appointments import get_calendar_bundle, get_appointments
+from fastapi import Response
+from starlette.requests import Request
+
+# Usage: python check_calendar_queries.py <tenant_slug>
+# Runs the calendar endpoints with a small and a large page and fails if the
+# number of SQL statements grows with the number of rows (N+1 regression).
+
+def run(tenant_slug):
+    db = SessionLocal()
+    try:
+        tenant = db.query(Tenant).filter(Tenant.slug == tenant_slug).first()
+        if not tenant:
+            print(f"❌ Tenant '{tenant_slug}' não encontrado")
+            return 1
+
+        user = TokenData(email="check@local", tenant_slug=tenant.slug, tenant_id=str(tenant.id), role_local="admin")
+        window = {"start": "2000-01-01T00:00:00Z", "end": "2100-01-01T00:00:00Z", "professional_id": None, "cursor": None}
+
+        counts = {}
+        for name, call in [
+            ("bundle", lambda limit: get_calendar_bundle(Request({"type": "http", "headers": []}), limit=limit, since=None,
+                                                         current_user=user, db=db, **window)),
+            ("list", lambda limit: get_appointments(Response(), limit=limit, current_user=user, db=db, **window)),
+        ]:
+            for limit in (1, 2000):
+                db.expunge_all()
+                with count_queries() as counter:
+                    result = call(limit)
+                if isinstance(result, Response):
+                    # The bundle answers a JSONResponse (with ETag) on the incremental path
+                    result = json.loads(result.body)
+                rows = len(result["appointments"]) if isinstance(result, dict) else len(result)
+                counts[(name, limit)] = counter.count
+                print(f"{name:7} limit={limit:5} rows={rows:5} statements={counter.count}")
+
+        failed = [n for n in ("bundle", "list") if counts[(n, 2000)] > counts[(n, 1)]]
+        if failed:
+            print(f"❌ Statement count grows with rows in: {', '.join(failed)}")
+            return 1
+        print("✅ Statement count is independent of row count")
+        return 0
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python check_calendar_queries.py <tenant_slug>")
+        sys.exit(2)
+    sys.exit(run(sys.argv[1]))
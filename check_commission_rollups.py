@@ -0,0 +1,66 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+sys.path.append(os.path.join(os.getcwd(), "backend"))
+
+from dotenv import load_dotenv
+
+load_dotenv("backend/.env")
+
+from app.database import SessionLocal
+from app.models.sql_models import Tenant, CommissionRollup
+from app.services import commission_rollup_service
+
+# Usage: python check_commission_rollups.py <tenant_slug> [YYYY-MM] [--rebuild]
+# Compares the tenant's commission_rollups for a month (default: current) with
+# the totals computed straight from commissions (half-open created_at range),
+# and fails on any difference. --rebuild recomputes the tenant's rollups first.
+
+def run(tenant_slug, period=None, rebuild=False):
+    db = SessionLocal()
+    try:
+        tenant = db.query(Tenant).filter(Tenant.slug == tenant_slug).first()
+        if not tenant:
+            print(f"❌ Tenant '{tenant_slug}' não encontrado")
+            return 1
+        month_start = commission_rollup_service.parse_period(period)
+
+        if rebuild:
+            commission_rollup_service.rebuild_rollups(db, tenant.id)
+            print("🔄 Rollups recomputed")
+
+        ledger = {
+            r.professional_id: (r.service_count, r.total_revenue or 0, r.total_commission or 0)
+            for r in commission_rollup_service.ledger_totals(db, tenant.id, month_start)
+        }
+        rollup = {
+            r.professional_id: (r.service_count, r.total_revenue, r.total_commission)
+            for r in db.query(CommissionRollup).filter(
+                CommissionRollup.tenant_id == tenant.id,
+                CommissionRollup.period_start == month_start,
+                CommissionRollup.service_count != 0
+            )
+        }
+
+        mismatches = 0
+        for professional_id in sorted(set(ledger) | set(rollup), key=str):
+            expected = ledger.get(professional_id, (0, 0, 0))
+            actual = rollup.get(professional_id, (0, 0, 0))
+            ok = expected == actual
+            mismatches += not ok
+            print(f"{'✅' if ok else '❌'} {professional_id}: ledger={expected} rollup={actual}")
+
+        if mismatches:
+            print(f"❌ {mismatches} professional(s) differ for {month_start:%Y-%m} (re-run with --rebuild)")
+            return 1
+        print(f"✅ Rollups match the ledger for {month_start:%Y-%m} ({len(ledger)} professionals)")
+        return 0
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if not args:
+        print("Usage: python check_commission_rollups.py <tenant_slug> [YYYY-MM] [--rebuild]")
+        sys.exit(2)
+    sys.exit(run(args[0], args[1] if len(args) > 1 else None, "--rebuild" in sys.argv))
@@ -5,6 +5,15 @@ import {
     completeAppointment
 } from '../services/api';
 
+// Applies an incremental bundle collection: full lists replace, deltas upsert by id.
+const mergeById = (current, incoming, isFull) => {
+    if (isFull !== false) return incoming;
+    if (!incoming.length) return current;
+    const byId = new Map(current.map(item => [item.id, item]));
+    incoming.forEach(item => byId.set(item.id, item));
+    return Array.from(byId.values());
+};
+
 export const useCalendarData = () => {
     const [appointments, setAppointments] = useState([]);
     const [customers, setCustomers] = useState([]);
@@ -13,28 +22,59 @@ export const useCalendarData = () => {
     const [connectionInfo, setConnectionInfo] = useState({ connected: false, email: '' });
     const [loading, setLoading] = useState(true);
     const lastFetch = useRef(0);
+    const syncToken = useRef(null);
+    // Período visível ({ start, end } em ISO); o sync_token só vale para o mesmo período
+    const range = useRef(null);
+    const requestSeq = useRef(0);
 
-    const loadData = useCallback(async (force = false) => {
+    const loadData = useCallback(async (force = false, nextRange = null) => {
+        const rangeChanged = nextRange && (nextRange.start !== range.current?.start || nextRange.end !== range.current?.end);
+        if (rangeChanged) {
+            range.current = nextRange;
+            syncToken.current = null;
+        }
         // Evita múltiplas chamadas redundantes (debounce de 2 segundos)
         const now = Date.now();
-        if (!force && now - lastFetch.current < 2000) {
+        if (!force && !rangeChanged && now - lastFetch.current < 2000) {
             console.log("--- BUNDLE: Ignorando chamada redundante ---");
             return;
         }
         lastFetch.current = now;
+        // Navegação rápida: só a resposta da última chamada é aplicada
+        const seq = ++requestSeq.current;
 
         setLoading(true);
         try {
             console.log("--- BUNDLE: Buscando dados unificados da Agenda ---");
-            const res = await getCalendarBundle();
-            const { appointments, customers, professionals, services, connectionInfo } = res.data;
+            const params = { ...(range.current || {}) };
+            if (syncToken.current) params.since = syncToken.current;
+            const res = await getCalendarBundle(params);
+            if (seq !== requestSeq.current) return;
+            if (res.status === 304) {
+                console.log("--- BUNDLE: Sem alterações desde a última sincronização ---");
+                return;
+            }
+            const { customers, professionals, services, connectionInfo, full = {}, sync_token } = res.data;
+            let { appointments, next_cursor } = res.data;
+            // Agendas grandes vêm paginadas: busca as páginas restantes (só agendamentos;
+            // as demais coleções vêm na primeira) antes de usar o sync_token
+            while (next_cursor) {
+                const page = await getCalendarBundle({ ...(range.current || {}), cursor: next_cursor });
+                if (seq !== requestSeq.current) return;
+                appointments = appointments.concat(page.data.appointments);
+                next_cursor = page.data.next_cursor;
+            }
+            syncToken.current = sync_token || null;
 
-            setAppointments(appointments);
-            localStorage.setItem('cached_appointments', JSON.stringify(appointments));
-            setCustomers(customers);
-            setProfessionals(professionals);
+            setAppointments(prev => {
+                const merged = mergeById(prev, appointments, full.appointments);
+                localStorage.setItem('cached_appointments', JSON.stringify(merged));
+                return merged;
+            });
+            setCustomers(prev => mergeById(prev, customers, full.customers));
+            setProfessionals(prev => mergeById(prev, professionals, full.professionals));
             setConnectionInfo(connectionInfo || { connected: false });
-            setServices(services);
+            setServices(prev => mergeById(prev, services, full.services));
 
             if (connectionInfo?.connected) {
                 localStorage.setItem('google_connected', 'true');
@@ -44,7 +84,7 @@ export const useCalendarData = () => {
         } catch (e) {
             console.error("Erro no Bundle:", e);
         } finally {
-            setLoading(false);
+            if (seq === requestSeq.current) setLoading(false);
         }
     }, []);
 
@@ -33,9 +33,17 @@ const AppointmentsCalendar = () => {
     const [selectedPros, setSelectedPros] = useState([]);
     const [showDatePicker, setShowDatePicker] = useState(false);
 
+    // Busca só a semana visível; navegar para outra semana recarrega
+    const weekStart = new Date(date);
+    weekStart.setHours(0, 0, 0, 0);
+    weekStart.setDate(weekStart.getDate() - weekStart.getDay());
+    const weekKey = weekStart.getTime();
+
     useEffect(() => {
-        loadData();
-    }, [loadData]);
+        const end = new Date(weekKey);
+        end.setDate(end.getDate() + 7);
+        loadData(false, { start: new Date(weekKey).toISOString(), end: end.toISOString() });
+    }, [loadData, weekKey]);
 
     useEffect(() => {
         if (professionals.length > 0 && selectedPros.length === 0) {
@@ -1,5 +1,4 @@
-import React, { useEffect, useState } from 'react';
-import { useDataCache } from '../hooks/useDataCache';
+import React, { useEffect, useState, useCallback } from 'react';
 import { getFinanceEntries, createFinanceEntry, updateFinanceEntryStatus, deleteFinanceEntry, exportFinanceEntries } from '../services/api';
 import { Plus, Search, DollarSign, Download, Settings, Trash2, CheckCircle2, ArrowUpCircle, ArrowDownCircle, XCircle, Activity, TrendingUp, AlertTriangle, Wallet } from 'lucide-react';
 import { Link } from 'react-router-dom';
@@ -10,8 +9,10 @@ import '../styles/tenant-luxury.css';
 import '../components/KpiCarousel.css';
 
 const FinanceExtrato = () => {
-    const { data: entries, isLoading, error, refreshData: loadData } = useDataCache('financeEntries', getFinanceEntries);
     const [filtered, setFiltered] = useState([]);
+    const [totals, setTotals] = useState({ income: 0, expense: 0, balance: 0, count: 0 });
+    const [nextCursor, setNextCursor] = useState(null);
+    const [isLoading, setIsLoading] = useState(true);
     const [showWizard, setShowWizard] = useState(false);
     const [filters, setFilters] = useState({
         type: 'all',
@@ -41,23 +42,39 @@ const FinanceExtrato = () => {
         }
     };
 
-    useEffect(() => {
-        let result = entries || [];
-        if (filters.type !== 'all') result = result.filter(e => e.tipo === filters.type);
-        if (filters.status !== 'all') result = result.filter(e => e.status === filters.status);
-        if (filters.search) {
-            result = result.filter(e => e.descricao?.toLowerCase().includes(filters.search.toLowerCase()) || e.origem?.toLowerCase().includes(filters.search.toLowerCase()));
+    // Filtros, paginação e totais são calculados no servidor
+    const fetchPage = useCallback(async (cursor = null) => {
+        setIsLoading(true);
+        try {
+            const params = {
+                tipo: filters.type !== 'all' ? filters.type : undefined,
+                status: filters.status !== 'all' ? filters.status : undefined,
+                search: filters.search || undefined,
+                start_date: filters.startDate || undefined,
+                end_date: filters.endDate || undefined,
+                cursor: cursor || undefined
+            };
+            const res = await getFinanceEntries(params);
+            const { items, next_cursor, totals } = res.data;
+            setFiltered(prev => cursor ? [...prev, ...items] : items);
+            setNextCursor(next_cursor);
+            setTotals(totals);
+        } catch (e) {
+            console.error("Erro ao carregar lançamentos:", e);
+        } finally {
+            setIsLoading(false);
         }
-        if (filters.startDate) result = result.filter(e => e.data_vencimento >= filters.startDate);
-        if (filters.endDate) result = result.filter(e => e.data_vencimento <= filters.endDate);
-        setFiltered(result);
-    }, [filters, entries]);
+    }, [filters]);
 
-    const stats = {
-        balance: filtered.reduce((acc, current) => acc + (current.tipo === 'receita' ? current.valor : -current.valor), 0),
-        income: filtered.filter(e => e.tipo === 'receita').reduce((acc, e) => acc + e.valor, 0),
-        expense: filtered.filter(e => e.tipo === 'despesa').reduce((acc, e) => acc + e.valor, 0)
-    };
+    const loadData = useCallback(() => fetchPage(null), [fetchPage]);
+
+    useEffect(() => {
+        // Debounce para a busca textual
+        const timer = setTimeout(loadData, filters.search ? 300 : 0);
+        return () => clearTimeout(timer);
+    }, [loadData]);
+
+    const stats = totals;
 
     const getStatusBadge = (status) => {
         const s = {
@@ -261,7 +278,14 @@ const FinanceExtrato = () => {
                             ))}
                         </div>
                     )}
-                    {filtered.length === 0 && (
+                    {nextCursor && (
+                        <div style={{ padding: '1.5rem', textAlign: 'center' }}>
+                            <button className="btn-secondary" disabled={isLoading} onClick={() => fetchPage(nextCursor)}>
+                                {isLoading ? 'Carregando...' : `Carregar mais (${filtered.length} de ${totals.count})`}
+                            </button>
+                        </div>
+                    )}
+                    {!isLoading && filtered.length === 0 && (
                         <div style={{ padding: '5rem', textAlign: 'center', color: 'var(--text-muted)' }}>
                             <DollarSign size={64} style={{ opacity: 0.1, margin: '0 auto 1.5rem' }} />
                             <p style={{ fontWeight: 600 }}>Nenhum lançamento financeiro para os filtros atuais.</p>
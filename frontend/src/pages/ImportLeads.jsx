@@ -1,5 +1,5 @@
 import React, { useState } from 'react';
-import { importLeads } from '../services/api';
+import { importLeads, waitForImportJob } from '../services/api';
 import { Upload, FileText, CheckCircle2, AlertCircle, XCircle, ChevronRight, Search, Download } from 'lucide-react';
 import '../styles/tenant-luxury.css';
 
@@ -7,6 +7,7 @@ const ImportLeads = () => {
     const [file, setFile] = useState(null);
     const [result, setResult] = useState(null);
     const [loading, setLoading] = useState(false);
+    const [progress, setProgress] = useState(null);
 
     const handleFile = (e) => {
         setFile(e.target.files[0]);
@@ -19,8 +20,11 @@ const ImportLeads = () => {
         formData.append('file', file);
         try {
             const res = await importLeads(formData);
-            setResult(res.data);
+            const job = await waitForImportJob(res.data.id, setProgress);
+            if (job.status === 'failed') alert(job.message || "Erro ao importar base de leads.");
+            else setResult(job);
         } catch (e) { alert("Erro ao importar base de leads."); }
+        setProgress(null);
         setLoading(false);
     };
 
@@ -45,7 +49,7 @@ const ImportLeads = () => {
 
                         <label className="btn-primary" style={{ cursor: 'pointer' }}>
                             <FileText size={18} /> {file ? file.name : 'Selecionar Arquivo'}
-                            <input type="file" hidden onChange={handleFile} accept=".xlsx, .xls" />
+                            <input type="file" hidden onChange={handleFile} accept=".xlsx, .csv" />
                         </label>
                     </div>
 
@@ -64,7 +68,9 @@ const ImportLeads = () => {
                         style={{ width: '100%', marginTop: '3rem' }}
                         onClick={handleUpload}
                     >
-                        {loading ? 'Processando dados...' : 'Executar Sincronização em Massa'}
+                        {loading
+                            ? `Processando dados...${progress ? ` ${progress.progress != null ? `${progress.progress}%` : `${progress.processed_rows} linhas`}` : ''}`
+                            : 'Executar Sincronização em Massa'}
                     </button>
                 </div>
 
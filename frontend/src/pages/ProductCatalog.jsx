@@ -1,5 +1,5 @@
 import React, { useState } from 'react';
-import { getItems, createItem, deleteItem, updateItem, exportItems, importItems } from '../services/api';
+import { getItems, createItem, deleteItem, updateItem, exportItems, importItems, waitForImportJob } from '../services/api';
 import { useDataCache } from '../hooks/useDataCache';
 import { useOptimistic } from '../hooks/useOptimistic';
 import { showToast } from '../components/Toast';
@@ -86,8 +86,10 @@ const ProductCatalog = () => {
         const formData = new FormData();
         formData.append('file', file);
         try {
-            await importItems(formData);
-            showToast('Catálogo atualizado via Excel!', 'success');
+            const res = await importItems(formData);
+            const job = await waitForImportJob(res.data.id);
+            if (job.status === 'failed') throw new Error(job.message);
+            showToast(`Catálogo atualizado via Excel! ${job.created} criados, ${job.updated} atualizados${job.errors ? `, ${job.errors} com erro` : ''}.`, 'success');
             // Force full refetch from server
             mutate(null);
         } catch (e) { showToast('Erro na importação: Verifique as colunas do arquivo.', 'error'); }
@@ -108,7 +110,7 @@ const ProductCatalog = () => {
                     </button>
                     <label className="btn-primary" style={{ cursor: 'pointer' }}>
                         <Upload size={18} /> Importar Excel
-                        <input type="file" hidden onChange={handleImport} accept=".xlsx, .xls" />
+                        <input type="file" hidden onChange={handleImport} accept=".xlsx, .csv" />
                     </label>
                     <button className="btn-primary" onClick={() => { setEditingItem(null); setShowForm(true); }}>
                         <Plus size={20} /> Novo Item
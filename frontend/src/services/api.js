@@ -91,6 +91,21 @@ export const importLeads = (formData) => {
   });
 };
 
+// Import jobs: uploads return a job; poll it until it finishes.
+export const getImportJob = (jobId) => api.get(`/tenant/imports/${jobId}`);
+export const resumeImportJob = (jobId) => api.post(`/tenant/imports/${jobId}/resume`);
+
+export const waitForImportJob = async (jobId, onProgress, intervalMs = 1500) => {
+  for (;;) {
+    const { data: job } = await getImportJob(jobId);
+    if (onProgress) onProgress(job);
+    if (job.status === 'completed' || job.status === 'failed') return job;
+    // The worker handling it died; pick it up from the last committed chunk
+    if (job.stale) await resumeImportJob(jobId).catch(() => {});
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+};
+
 export const getTenantStats = () => {
   return api.get('/tenant/stats');
 };
@@ -197,12 +212,17 @@ export const deleteTeamMember = (id) => {
 
 export const inviteMember = createTeamMember; // Keep as alias
 
-export const getAppointments = () => {
-  return api.get('/tenant/appointments/');
+// params: { start, end, professional_id, cursor, limit } (all optional)
+export const getAppointments = (params = {}) => {
+  return api.get('/tenant/appointments/', { params });
 };
 
-export const getCalendarBundle = () => {
-  return api.get('/tenant/appointments/bundle');
+// Pass { since: sync_token } for an incremental bundle; 304 means nothing changed.
+export const getCalendarBundle = (params = {}) => {
+  return api.get('/tenant/appointments/bundle', {
+    params,
+    validateStatus: (status) => (status >= 200 && status < 300) || status === 304
+  });
 };
 
 export const createAppointment = (data) => {
@@ -238,8 +258,10 @@ export const deleteAmbiente = (slug) => {
 };
 
 // Finance Module
-export const getFinances = () => {
-  return api.get('/tenant/finances');
+// params: { tipo, status, start_date, end_date, categoria, customer_id, supplier_id, search, sort, cursor, limit }
+// Returns { items, next_cursor, totals, page_totals }
+export const getFinances = (params = {}) => {
+  return api.get('/tenant/finances', { params });
 };
 
 export const getFinanceEntries = getFinances; // Alias for FinanceExtrato.jsx